@@ -6,6 +6,10 @@ from .models import (
     SystemHealth,
     ActivityLog,
     APIUsageLog,
+    APILatencyHistogram,
+    APIUsageDailySummary,
+    ActivityDailySummary,
+    OutboxEvent,
 )
 
 
@@ -57,3 +61,30 @@ class APIUsageLogAdmin(admin.ModelAdmin):
     list_filter = ("method", "status_code", "tenant")
     search_fields = ("endpoint", "user__email", "tenant__name")
     readonly_fields = ("timestamp", "response_time")
+
+
+@admin.register(APILatencyHistogram)
+class APILatencyHistogramAdmin(admin.ModelAdmin):
+    list_display = ("endpoint", "method", "tenant", "minute", "count", "max_time")
+    list_filter = ("method", "tenant")
+    search_fields = ("endpoint", "tenant__name")
+
+
+@admin.register(APIUsageDailySummary)
+class APIUsageDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ("date", "route", "method", "tenant", "total_calls", "error_calls")
+    list_filter = ("method", "tenant")
+    search_fields = ("route", "tenant__name")
+
+
+@admin.register(ActivityDailySummary)
+class ActivityDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ("date", "tenant", "role", "count")
+    list_filter = ("role", "tenant")
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "created_at", "attempts")
+    list_filter = ("kind", "attempts")
+    readonly_fields = ("kind", "payload", "created_at", "last_error")
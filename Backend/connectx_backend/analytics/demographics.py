@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, DateField, Q, Value, When
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+
+DEFAULT_AGE_GROUPS = [
+    (18, 24),
+    (25, 34),
+    (35, 44),
+    (45, 54),
+    (55, None),  # 55 and above
+]
+
+GENDERS = ["male", "female"]
+
+PERIOD_FUNCTIONS = {
+    "daily": TruncDate,
+    "weekly": TruncWeek,
+    "monthly": TruncMonth,
+}
+
+# Bucket for users without a recorded age
+MISSING = "missing"
+
+
+def get_age_groups():
+    """Return the configured (min, max) age groups; max None means open ended."""
+    return getattr(settings, "DEMOGRAPHIC_AGE_GROUPS", DEFAULT_AGE_GROUPS)
+
+
+def age_group_key(age_min, age_max):
+    return f"{age_min}_{age_max}" if age_max else f"{age_min}_plus"
+
+
+def age_bucket(age_groups):
+    """A Case expression labelling each user with their age group key."""
+    whens = [When(age__isnull=True, then=Value(MISSING))]
+    for age_min, age_max in age_groups:
+        condition = Q(age__gte=age_min)
+        if age_max:
+            condition &= Q(age__lte=age_max)
+        whens.append(When(condition, then=Value(age_group_key(age_min, age_max))))
+    return Case(*whens, default=Value(None), output_field=CharField())
+
+
+def demographic_histogram(users, age_groups, interval=None):
+    """
+    Count ``users`` per gender and age group in one grouped query.
+
+    Returns (totals, periods): ``totals`` maps (gender, age key) to a count,
+    and ``periods`` maps each ``interval`` period start to its own counts
+    (empty without an interval).
+    """
+    columns = ["gender", "age_bucket"]
+    users = users.annotate(age_bucket=age_bucket(age_groups))
+    if interval:
+        users = users.annotate(
+            period=PERIOD_FUNCTIONS[interval]("created_at", output_field=DateField())
+        )
+        columns.append("period")
+
+    totals = defaultdict(int)
+    periods = defaultdict(lambda: defaultdict(int))
+    rows = users.values(*columns).annotate(count=Count("id")).order_by()
+    for row in rows:
+        key = (row["gender"], row["age_bucket"])
+        totals[key] += row["count"]
+        if interval:
+            periods[row["period"]][key] += row["count"]
+    return totals, periods
+
+
+def gender_age_distribution(counts, age_groups):
+    """Turn histogram counts into the percentage distribution the API returns."""
+    total_users = sum(counts.values())
+
+    def percentage(count):
+        return round(count / total_users * 100, 1) if total_users > 0 else 0
+
+    distribution = {}
+    for gender in GENDERS:
+        for age_min, age_max in age_groups:
+            age_key = age_group_key(age_min, age_max)
+            distribution[f"{gender}_{age_key}"] = percentage(
+                counts.get((gender, age_key), 0)
+            )
+
+    # Users with missing demographic data
+    missing = sum(
+        count
+        for (gender, age_key), count in counts.items()
+        if not gender or age_key == MISSING
+    )
+    distribution["others"] = percentage(missing)
+    return total_users, distribution
@@ -0,0 +1,217 @@
+import logging
+import math
+import os
+import threading
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+
+from .log_writer import get_logging_config
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_endpoint(path):
+    """Drop the trailing slash so /api/x and /api/x/ share a histogram."""
+    if path != "/" and path.endswith("/"):
+        return path[:-1]
+    return path
+
+
+class LatencyHistogram:
+    """
+    Fixed log-scale latency histogram in milliseconds.
+
+    Bucket 0 holds values up to ``LOWEST``; bucket i holds values up to
+    ``LOWEST * GROWTH**i``, so percentiles are accurate to within 5%.
+    Histograms merge by adding bucket counts, which is what makes
+    per-minute sketches combinable over any window.
+    """
+
+    LOWEST = 0.1
+    GROWTH = 1.05
+
+    def __init__(self, buckets=None, count=0, total=0.0, max_value=0.0):
+        self.buckets = defaultdict(int)
+        for index, bucket_count in (buckets or {}).items():
+            self.buckets[int(index)] += bucket_count
+        self.count = count
+        self.total = total
+        self.max_value = max_value
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.buckets, row.count, row.total_time, row.max_time)
+
+    @classmethod
+    def bucket_index(cls, value):
+        if value <= cls.LOWEST:
+            return 0
+        return int(math.log(value / cls.LOWEST) / math.log(cls.GROWTH)) + 1
+
+    @classmethod
+    def bucket_upper_bound(cls, index):
+        return cls.LOWEST * cls.GROWTH**index
+
+    def record(self, value):
+        self.buckets[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max_value = max(self.max_value, value)
+
+    def merge(self, other):
+        for index, bucket_count in other.buckets.items():
+            self.buckets[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.max_value = max(self.max_value, other.max_value)
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.bucket_upper_bound(index), self.max_value)
+        return self.max_value
+
+    def serialized_buckets(self):
+        # JSON object keys are strings
+        return {str(index): count for index, count in self.buckets.items() if count}
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0,
+            "p50": round(self.percentile(50), 3),
+            "p90": round(self.percentile(90), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max_value, 3),
+        }
+
+
+def merge_histograms(rows, group_by):
+    """
+    Merge APILatencyHistogram rows into one summary per ``group_by`` key.
+
+    ``rows`` is an iterable of histogram rows and ``group_by`` a list of
+    row attribute names (empty for a single overall summary).
+    """
+    merged = {}
+    for row in rows:
+        key = tuple(getattr(row, field) for field in group_by)
+        histogram = merged.setdefault(key, LatencyHistogram())
+        histogram.merge(LatencyHistogram.from_row(row))
+    return [
+        {**dict(zip(group_by, key)), **histogram.summary()}
+        for key, histogram in merged.items()
+    ]
+
+
+class LatencyRecorder:
+    """
+    Accumulate request latencies into per-minute histograms in memory and
+    merge them into APILatencyHistogram rows on ``flush``.
+
+    The API usage log writer's worker flushes the recorder on every cycle;
+    when not running asynchronously each ``record`` is flushed immediately.
+    """
+
+    def __init__(self, run_async=True):
+        self.run_async = run_async
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._pid = os.getpid()
+
+        self.recorded = 0
+        self.flushed_rows = 0
+        self.failed = 0
+
+    def record(self, endpoint, method, tenant_id, response_time_ms, timestamp):
+        minute = timestamp.replace(second=0, microsecond=0)
+        key = (minute, normalize_endpoint(endpoint), method, tenant_id)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Entries inherited across a fork belong to the parent
+                self._pending = {}
+                self._pid = os.getpid()
+            histogram = self._pending.get(key)
+            if histogram is None:
+                histogram = self._pending[key] = LatencyHistogram()
+            histogram.record(response_time_ms)
+            self.recorded += 1
+        if not self.run_async:
+            self.flush()
+
+    def flush(self):
+        """Merge every pending histogram into the database."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        with self._flush_lock:
+            for key, histogram in pending.items():
+                try:
+                    self._save(key, histogram)
+                    self.flushed_rows += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Error writing API latency histogram: {str(e)}")
+
+    def stats(self):
+        return {
+            "pending_histograms": len(self._pending),
+            "recorded": self.recorded,
+            "flushed_rows": self.flushed_rows,
+            "failed": self.failed,
+        }
+
+    def _save(self, key, histogram):
+        from .models import APILatencyHistogram
+
+        minute, endpoint, method, tenant_id = key
+        rows = APILatencyHistogram.objects.filter(
+            minute=minute, endpoint=endpoint, method=method, tenant_id=tenant_id
+        )
+        with transaction.atomic():
+            row = rows.select_for_update().first()
+            if row is None:
+                try:
+                    with transaction.atomic():
+                        APILatencyHistogram.objects.create(
+                            minute=minute,
+                            endpoint=endpoint,
+                            method=method,
+                            tenant_id=tenant_id,
+                            count=histogram.count,
+                            total_time=histogram.total,
+                            max_time=histogram.max_value,
+                            buckets=histogram.serialized_buckets(),
+                        )
+                    return
+                except IntegrityError:
+                    # Another process created the row first
+                    row = rows.select_for_update().get()
+
+            merged = LatencyHistogram.from_row(row)
+            merged.merge(histogram)
+            row.count = merged.count
+            row.total_time = merged.total
+            row.max_time = merged.max_value
+            row.buckets = merged.serialized_buckets()
+            row.save(update_fields=["count", "total_time", "max_time", "buckets"])
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_latency_recorder():
+    """Return the process-wide API latency recorder."""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = LatencyRecorder(run_async=get_logging_config()["ASYNC"])
+    return _recorder
@@ -0,0 +1,273 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LOGGING_CONFIG = {
+    "ASYNC": True,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 2.0,
+    "MAX_QUEUE_SIZE": 10000,
+    "OVERFLOW_POLICY": "drop",
+    "OVERFLOW_HIGH_WATER": 0.8,
+    "OVERFLOW_SAMPLE_RATE": 0.1,
+}
+
+
+def get_logging_config():
+    """Return the API usage logging config merged over the defaults."""
+    config = dict(DEFAULT_LOGGING_CONFIG)
+    config.update(getattr(settings, "API_USAGE_LOGGING", {}))
+    return config
+
+
+class APIUsageLogWriter:
+    """
+    Buffer API usage log entries in a bounded queue and write them in batches.
+
+    Entries are plain dicts of APIUsageLog field values. A daemon worker
+    drains the queue and bulk inserts up to ``batch_size`` rows at a time,
+    at least every ``flush_interval`` seconds. When the queue is full the
+    entry is dropped; with the "sample" overflow policy, entries are also
+    admitted only at ``overflow_sample_rate`` once the queue passes the
+    high-water mark. Callers never block on the database.
+    """
+
+    def __init__(
+        self,
+        batch_size=200,
+        flush_interval=2.0,
+        max_queue_size=10000,
+        overflow_policy="drop",
+        overflow_high_water=0.8,
+        overflow_sample_rate=0.1,
+        run_async=True,
+    ):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.overflow_policy = overflow_policy
+        self.overflow_high_water = float(overflow_high_water)
+        self.overflow_sample_rate = float(overflow_sample_rate)
+        self.run_async = run_async
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._thread = None
+        self._pid = None
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.failed = 0
+
+    @classmethod
+    def from_settings(cls):
+        config = get_logging_config()
+        return cls(
+            batch_size=config["BATCH_SIZE"],
+            flush_interval=config["FLUSH_INTERVAL"],
+            max_queue_size=config["MAX_QUEUE_SIZE"],
+            overflow_policy=config["OVERFLOW_POLICY"],
+            overflow_high_water=config["OVERFLOW_HIGH_WATER"],
+            overflow_sample_rate=config["OVERFLOW_SAMPLE_RATE"],
+            run_async=config["ASYNC"],
+        )
+
+    def enqueue(self, entry):
+        """Queue a log entry. Returns False if it was dropped or sampled out."""
+        if not self.run_async:
+            self.enqueued += 1
+            self._write([entry])
+            return True
+
+        self._ensure_worker()
+
+        if self.overflow_policy == "sample":
+            fill = self._queue.qsize() / self.max_queue_size
+            if (
+                fill >= self.overflow_high_water
+                and random.random() >= self.overflow_sample_rate
+            ):
+                self.sampled_out += 1
+                return False
+
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        self.enqueued += 1
+        return True
+
+    def flush(self):
+        """Synchronously write everything currently in the queue."""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the worker and write out any remaining entries."""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+
+        from .latency import get_latency_recorder
+
+        get_latency_recorder().flush()
+
+    def stats(self):
+        return {
+            "async": self.run_async,
+            "queue_size": self._queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "failed": self.failed,
+        }
+
+    def _ensure_worker(self):
+        # Worker threads do not survive a fork (e.g. gunicorn pre-loading),
+        # so (re)start lazily in whichever process is enqueueing.
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != pid:
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+            if self._thread is None or self._pid != pid or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._pid = pid
+                self._thread = threading.Thread(
+                    target=self._run, name="api-usage-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        from .latency import get_latency_recorder
+        from .outbox import get_outbox, get_outbox_config
+        from payments.webhooks import get_webhook_config, get_webhook_queue
+
+        recorder = get_latency_recorder()
+        outbox = get_outbox()
+        drain_outbox = (
+            get_outbox_config()["DRAIN_IN_LOG_WRITER"] and not outbox.inline
+        )
+        webhooks = get_webhook_queue()
+        drain_webhooks = (
+            get_webhook_config()["DRAIN_IN_LOG_WRITER"] and not webhooks.inline
+        )
+        try:
+            while not self._stop_event.is_set():
+                batch = self._collect_batch()
+                if batch:
+                    self._write(batch)
+                # Latency histograms, outbox events and Chapa webhooks ride
+                # along on the same flush cycle
+                recorder.flush()
+                if drain_outbox:
+                    self._drain_outbox(outbox)
+                if drain_webhooks:
+                    self._drain_webhooks(webhooks)
+        finally:
+            connection.close()
+
+    def _drain_outbox(self, outbox):
+        try:
+            close_old_connections()
+            outbox.drain(limit=outbox.batch_size)
+        except Exception as e:
+            logger.error(f"Error draining analytics outbox: {str(e)}")
+
+    def _drain_webhooks(self, webhooks):
+        try:
+            close_old_connections()
+            webhooks.drain(limit=webhooks.batch_size)
+        except Exception as e:
+            logger.error(f"Error applying Chapa webhooks: {str(e)}")
+
+    def _collect_batch(self):
+        """Block until a full batch is available or the flush interval elapses."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from .models import APIUsageLog
+
+        with self._flush_lock:
+            close_old_connections()
+            rows = [APIUsageLog(**entry) for entry in batch]
+            # Savepoints keep a failed write from breaking a caller's
+            # transaction when writing synchronously.
+            try:
+                with transaction.atomic():
+                    APIUsageLog.objects.bulk_create(rows, batch_size=self.batch_size)
+                self.flushed += len(rows)
+                return
+            except Exception as e:
+                logger.warning(f"Bulk API usage log write failed, retrying rows: {e}")
+
+            # A single bad row (e.g. a user deleted since the request) must not
+            # take the rest of the batch down with it.
+            for row in rows:
+                try:
+                    with transaction.atomic():
+                        row.save(force_insert=True)
+                    self.flushed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Error writing API usage log: {str(e)}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """Return the process-wide API usage log writer."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = APIUsageLogWriter.from_settings()
+                atexit.register(_writer.stop)
+    return _writer
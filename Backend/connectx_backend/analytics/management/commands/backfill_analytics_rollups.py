@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from analytics.models import Analytics
+from analytics.rollups import ROLLUP_METRICS, compute_daily_facts
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily analytics rollups from the order tables. Limit the "
+        "range with --start/--end; use --verify to report drift without writing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD).")
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report rollup rows that differ from the order tables.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rollup rows to insert per query.",
+        )
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"]) if options["start"] else None
+        end = parse_date(options["end"]) if options["end"] else None
+
+        expected = compute_daily_facts(start, end)
+
+        existing = Analytics.objects.filter(metric_type__in=ROLLUP_METRICS)
+        if start:
+            existing = existing.filter(date__gte=start)
+        if end:
+            existing = existing.filter(date__lte=end)
+
+        if options["verify"]:
+            stored = {
+                (row.tenant_id, row.product_id, row.metric_type, row.date): row.value
+                for row in existing.iterator()
+            }
+            drifted = [
+                key
+                for key in expected.keys() | stored.keys()
+                if expected.get(key, 0) != stored.get(key, 0)
+            ]
+            for tenant_id, product_id, metric_type, day in drifted:
+                self.stdout.write(
+                    f"Drift: tenant {tenant_id} product {product_id} "
+                    f"{metric_type} on {day}"
+                )
+            style = self.style.WARNING if drifted else self.style.SUCCESS
+            self.stdout.write(style(f"{len(drifted)} rollup rows have drifted."))
+            return
+
+        rows = [
+            Analytics(
+                tenant_id=tenant_id,
+                product_id=product_id,
+                metric_type=metric_type,
+                date=day,
+                value=value,
+            )
+            for (tenant_id, product_id, metric_type, day), value in expected.items()
+            if value
+        ]
+        with transaction.atomic():
+            existing.delete()
+            Analytics.objects.bulk_create(rows, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(rows)} rollup rows."))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from analytics.outbox import AnalyticsOutbox, get_outbox_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Handle pending analytics outbox events (activity logs and order "
+        "rollups). Runs until stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the pending events once and exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when there is nothing to handle.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Events to handle per transaction (default: ANALYTICS_OUTBOX).",
+        )
+
+    def handle(self, *args, **options):
+        config = get_outbox_config()
+        # Always queue-draining here, whatever INLINE says for this process
+        outbox = AnalyticsOutbox(
+            batch_size=options["batch_size"] or config["BATCH_SIZE"],
+            max_attempts=config["MAX_ATTEMPTS"],
+        )
+        if options["once"]:
+            handled = outbox.drain()
+            self.stdout.write(
+                f"Handled {handled} outbox events; {outbox.pending()} pending."
+            )
+            return
+
+        try:
+            while True:
+                close_old_connections()
+                if not outbox.drain(limit=outbox.batch_size):
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
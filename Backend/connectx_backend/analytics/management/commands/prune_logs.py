@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+
+from analytics.retention import (
+    LOG_TABLES,
+    create_partitions,
+    partition_ddl,
+    prune_table,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll up and remove log rows older than each table's retention period "
+        "(LOG_RETENTION). Drops whole partitions on partitioned PostgreSQL "
+        "tables and deletes in batches elsewhere."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--table",
+            action="append",
+            choices=sorted(LOG_TABLES),
+            help="Only prune this table (repeatable). Defaults to all log tables.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be removed without writing.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows to delete per query.",
+        )
+        parser.add_argument(
+            "--create-partitions",
+            type=int,
+            metavar="MONTHS",
+            help="Also create monthly partitions this many months ahead "
+            "(partitioned PostgreSQL tables only).",
+        )
+        parser.add_argument(
+            "--print-ddl",
+            action="store_true",
+            help="Print the SQL that converts each table to monthly partitions "
+            "and exit.",
+        )
+
+    def handle(self, *args, **options):
+        tables = options["table"] or sorted(LOG_TABLES)
+
+        if options["print_ddl"]:
+            for table in tables:
+                self.stdout.write(partition_ddl(LOG_TABLES[table][0]))
+            return
+
+        for table in tables:
+            if options["create_partitions"] is not None:
+                created = create_partitions(
+                    LOG_TABLES[table][0], options["create_partitions"]
+                )
+                if created:
+                    self.stdout.write(f"{table}: partitions {', '.join(created)}")
+
+            result = prune_table(
+                table,
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+            )
+            verb = "Would remove" if options["dry_run"] else "Removed"
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{table}: {verb} {result['deleted']} rows and "
+                    f"{len(result['partitions'])} partitions older than "
+                    f"{result['cutoff']:%Y-%m-%d}."
+                )
+            )
@@ -1,29 +1,40 @@
+import re
 import time
 import json
 from django.utils import timezone
-from .models import APIUsageLog
-from django.conf import settings
+from .latency import get_latency_recorder
+from .log_writer import get_log_writer, get_logging_config
+from .payloads import DEFAULT_SENSITIVE_KEYS, BodyPolicies, SensitiveDataFilter
 import logging
-import uuid
 
 logger = logging.getLogger(__name__)
 
+ROUTE_GROUP = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+
+
+def route_template(resolver_match):
+    """
+    Turn a resolved URL pattern into a readable template, e.g.
+    ``api/products/(?P<pk>[^/.]+)/$`` becomes ``/api/products/<pk>/``.
+    """
+    if resolver_match is None or not resolver_match.route:
+        return ""
+    route = ROUTE_GROUP.sub(r"<\1>", resolver_match.route)
+    route = route.replace("^", "").replace("$", "").replace("\\.", ".")
+    route = route.replace("/?", "/")
+    return ("/" + route.lstrip("/"))[:255]
+
 
 class APIUsageLoggingMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.log_writer = get_log_writer()
+        self.latency_recorder = get_latency_recorder()
+        self.body_policies = BodyPolicies.from_settings()
         # Fields to exclude from logging
-        self.sensitive_fields = {
-            "password",
-            "token",
-            "api_key",
-            "secret",
-            "authorization",
-            "credit_card",
-            "cvv",
-            "ssn",
-            "social_security",
-        }
+        self.sensitive_filter = SensitiveDataFilter(
+            get_logging_config().get("SENSITIVE_KEYS", DEFAULT_SENSITIVE_KEYS)
+        )
 
     def __call__(self, request):
         # Start timing the request
@@ -36,62 +47,51 @@ class APIUsageLoggingMiddleware:
         response_time = time.time() - start_time
 
         # Only log API requests
-        request_data = None
         if request.path.startswith("/api/"):
             try:
-                # Get request data safely
-                request_data = {}
-                if (
-                    request.content_type
-                    and "multipart/form-data" in request.content_type
-                ):
-                    # For multipart form data, get form data and files separately
-                    form_data = dict(request.POST.items())
-                    # Filter sensitive data from form data
-                    form_data = self._filter_sensitive_data(form_data)
-                    request_data = {
-                        "form_data": form_data,
-                        "files": (
-                            [f.name for f in request.FILES.values()]
-                            if request.FILES
-                            else []
+                user = getattr(request, "user", None)
+                tenant = getattr(request, "tenant", None)
+                resolver_match = getattr(request, "resolver_match", None)
+                route = route_template(resolver_match)
+                view_name = resolver_match.view_name[:255] if resolver_match else ""
+                timestamp = timezone.now()
+                self.latency_recorder.record(
+                    route or request.path,
+                    request.method,
+                    tenant.pk if tenant is not None else None,
+                    response_time * 1000,
+                    timestamp,
+                )
+
+                # Bodies are only parsed, filtered and sized when the route's
+                # policy captures them.
+                request_data = response_data = None
+                policy = self.body_policies.for_route(route, view_name)
+                if policy.should_capture(response.status_code):
+                    request_data = policy.cap(self._get_request_data(request))
+                    response_data = policy.cap(self._get_response_data(response))
+
+                # Hand the entry to the background writer; it is bulk
+                # inserted off the request path.
+                self.log_writer.enqueue(
+                    {
+                        "endpoint": request.path,
+                        "route": route,
+                        "view_name": view_name,
+                        "method": request.method,
+                        "status_code": response.status_code,
+                        "response_time": response_time,
+                        "user_id": (
+                            user.pk
+                            if user is not None and user.is_authenticated
+                            else None
                         ),
+                        "tenant_id": tenant.pk if tenant is not None else None,
+                        "request_data": request_data,
+                        "response_data": response_data,
+                        "timestamp": timestamp,
+                        "ip_address": self.get_client_ip(request),
                     }
-                elif request.body:
-                    try:
-                        # Try to parse JSON body
-                        request_data = json.loads(request.body)
-                        # Filter sensitive data from JSON
-                        request_data = self._filter_sensitive_data(request_data)
-                    except (json.JSONDecodeError, UnicodeDecodeError):
-                        # If not JSON, store as raw string
-                        request_data = {"raw_body": str(request.body)}
-
-                # Get response data safely
-                response_data = None
-                if hasattr(response, "data"):
-                    try:
-                        response_data = self._filter_sensitive_data(response.data)
-                    except Exception as e:
-                        logger.warning(f"Error processing response data: {str(e)}")
-                        response_data = {"error": "Could not process response data"}
-
-                # Create API usage log
-                APIUsageLog.objects.create(
-                    endpoint=request.path,
-                    method=request.method,
-                    status_code=response.status_code,
-                    response_time=response_time,
-                    user=(
-                        request.user
-                        if hasattr(request, "user") and request.user.is_authenticated
-                        else None
-                    ),
-                    tenant=request.tenant if hasattr(request, "tenant") else None,
-                    request_data=request_data,
-                    response_data=response_data,
-                    timestamp=timezone.now(),
-                    ip_address=self.get_client_ip(request),
                 )
             except Exception as e:
                 # Log the error but don't interrupt the request
@@ -99,6 +99,36 @@ class APIUsageLoggingMiddleware:
 
         return response
 
+    def _get_request_data(self, request):
+        """Get request data safely."""
+        if request.content_type and "multipart/form-data" in request.content_type:
+            # For multipart form data, get form data and files separately
+            form_data = dict(request.POST.items())
+            return {
+                "form_data": self._filter_sensitive_data(form_data),
+                "files": (
+                    [f.name for f in request.FILES.values()] if request.FILES else []
+                ),
+            }
+        if not request.body:
+            return {}
+        try:
+            # Try to parse JSON body
+            return self._filter_sensitive_data(json.loads(request.body))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # If not JSON, store as raw string
+            return {"raw_body": str(request.body)}
+
+    def _get_response_data(self, response):
+        """Get response data safely."""
+        if not hasattr(response, "data"):
+            return None
+        try:
+            return self._filter_sensitive_data(response.data)
+        except Exception as e:
+            logger.warning(f"Error processing response data: {str(e)}")
+            return {"error": "Could not process response data"}
+
     def get_client_ip(self, request):
         """Get the client's IP address from the request."""
         x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
@@ -110,19 +140,4 @@ class APIUsageLoggingMiddleware:
 
     def _filter_sensitive_data(self, data):
         """Filter out sensitive data from request/response data."""
-        if isinstance(data, dict):
-            return {
-                k: (
-                    "***FILTERED***"
-                    if any(
-                        sensitive in k.lower() for sensitive in self.sensitive_fields
-                    )
-                    else self._filter_sensitive_data(v)
-                )
-                for k, v in data.items()
-            }
-        elif isinstance(data, list):
-            return [self._filter_sensitive_data(item) for item in data]
-        elif isinstance(data, uuid.UUID):
-            return str(data)
-        return data
+        return self.sensitive_filter.filter(data)
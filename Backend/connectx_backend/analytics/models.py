@@ -1,11 +1,20 @@
 import uuid
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from tenants.models import Tenant
 from products.models import Product
 from users.models import User
 
 
 class Analytics(models.Model):
+    """
+    Daily rollup fact maintained by analytics.rollups.
+
+    Rows with no product are per-tenant totals; rows with a product are that
+    product's share of the selling tenant's orders for the day.
+    """
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     tenant = models.ForeignKey(
         Tenant, on_delete=models.CASCADE, related_name="analytics"
@@ -23,12 +32,30 @@ class Analytics(models.Model):
             ("sales", "Sales"),
             ("orders", "Orders"),
             ("revenue", "Revenue"),
+            ("placed", "Placed orders"),
         ],
     )
     value = models.DecimalField(max_digits=15, decimal_places=2)
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "metric_type", "date"],
+                condition=models.Q(product__isnull=True),
+                name="unique_tenant_daily_metric",
+            ),
+            models.UniqueConstraint(
+                fields=["tenant", "product", "metric_type", "date"],
+                condition=models.Q(product__isnull=False),
+                name="unique_product_daily_metric",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["metric_type", "date"]),
+        ]
+
     def __str__(self):
         return f"{self.metric_type} - {self.value} for {self.tenant.name}"
 
@@ -52,7 +79,8 @@ class ActivityLog(models.Model):
     )
     action = models.CharField(max_length=255)
     details = models.JSONField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the activity happens; rows are written later from the outbox.
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     class Meta:
@@ -68,6 +96,26 @@ class ActivityLog(models.Model):
         return f"{self.role} - {self.action} at {self.timestamp}"
 
 
+class OutboxEvent(models.Model):
+    """
+    Pending analytics side effect (analytics.outbox), e.g. an activity log
+    entry or an order's rollup change. Handled events are deleted; failing
+    ones are retried up to the configured number of attempts.
+    """
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.kind} event {self.pk} ({self.attempts} attempts)"
+
+
 class APIUsageLog(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
@@ -77,12 +125,17 @@ class APIUsageLog(models.Model):
         Tenant, on_delete=models.SET_NULL, null=True, related_name="api_logs"
     )
     endpoint = models.CharField(max_length=255)
+    # URL pattern and name the request resolved to, e.g. /api/products/<pk>/
+    # and product-detail; empty for unresolved paths and older rows.
+    route = models.CharField(max_length=255, blank=True, default="")
+    view_name = models.CharField(max_length=255, blank=True, default="")
     method = models.CharField(max_length=10)
     status_code = models.IntegerField()
     response_time = models.FloatField()  # in milliseconds
-    request_data = models.JSONField(null=True, blank=True)
-    response_data = models.JSONField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    request_data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    response_data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    # Set at request time; rows are written later by the batched log writer.
+    timestamp = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     class Meta:
@@ -92,12 +145,134 @@ class APIUsageLog(models.Model):
             models.Index(fields=["user"]),
             models.Index(fields=["tenant"]),
             models.Index(fields=["endpoint"]),
+            models.Index(fields=["route", "timestamp"]),
         ]
 
     def __str__(self):
         return f"{self.method} {self.endpoint} - {self.status_code} at {self.timestamp}"
 
 
+class APILatencyHistogram(models.Model):
+    """
+    Per-minute latency sketch for one endpoint, method and tenant.
+
+    ``endpoint`` is the request's route template when it resolved to one,
+    otherwise its path without the trailing slash.
+
+    ``buckets`` maps log-scale bucket indexes to request counts (see
+    analytics.latency.LatencyHistogram); times are in milliseconds.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    minute = models.DateTimeField()
+    endpoint = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="api_latency_histograms",
+    )
+    count = models.BigIntegerField(default=0)
+    total_time = models.FloatField(default=0)
+    max_time = models.FloatField(default=0)
+    buckets = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ["-minute"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["minute", "endpoint", "method", "tenant"],
+                condition=models.Q(tenant__isnull=False),
+                name="unique_tenant_latency_minute",
+            ),
+            models.UniqueConstraint(
+                fields=["minute", "endpoint", "method"],
+                condition=models.Q(tenant__isnull=True),
+                name="unique_latency_minute",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["minute"]),
+            models.Index(fields=["endpoint", "minute"]),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.endpoint} at {self.minute} ({self.count} calls)"
+
+
+class APIUsageDailySummary(models.Model):
+    """Daily per-route API usage kept after raw logs expire (analytics.retention)."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    date = models.DateField()
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="api_usage_summaries",
+    )
+    route = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    total_calls = models.BigIntegerField(default=0)
+    error_calls = models.BigIntegerField(default=0)
+    total_response_time = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "tenant", "route", "method"],
+                condition=models.Q(tenant__isnull=False),
+                name="unique_tenant_api_usage_day",
+            ),
+            models.UniqueConstraint(
+                fields=["date", "route", "method"],
+                condition=models.Q(tenant__isnull=True),
+                name="unique_api_usage_day",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.route} on {self.date}: {self.total_calls} calls"
+
+
+class ActivityDailySummary(models.Model):
+    """Daily activity counts kept after raw activity logs expire."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    date = models.DateField()
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="activity_summaries",
+    )
+    role = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "tenant", "role"],
+                condition=models.Q(tenant__isnull=False),
+                name="unique_tenant_activity_day",
+            ),
+            models.UniqueConstraint(
+                fields=["date", "role"],
+                condition=models.Q(tenant__isnull=True),
+                name="unique_activity_day",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.role} activity on {self.date}: {self.count}"
+
+
 class SystemMetrics(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     cpu_usage = models.FloatField()
@@ -0,0 +1,226 @@
+"""
+Transactional outbox for analytics side effects.
+
+Model signal handlers record events (activity log entries, order rollup
+changes) instead of writing ActivityLog and Analytics rows themselves:
+
+- Inside a transaction an event is inserted right away, so it commits or
+  rolls back with the change that caused it.
+- Outside one, the change is already committed; events are buffered until
+  the end of the request (OutboxMiddleware) and inserted together.
+
+``drain`` hands pending events to their handlers in the order they were
+recorded. It runs on the API usage log writer's flush cycle and from the
+process_outbox command.
+"""
+
+import itertools
+import json
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import ActivityLog, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_OUTBOX_CONFIG = {
+    # Handle events as they are recorded instead of queueing them (tests)
+    "INLINE": False,
+    "BATCH_SIZE": 500,
+    "MAX_ATTEMPTS": 5,
+    # Drain on the API usage log writer's flush cycle (analytics.log_writer)
+    "DRAIN_IN_LOG_WRITER": True,
+}
+
+
+def get_outbox_config():
+    """Return the analytics outbox config merged over the defaults."""
+    config = dict(DEFAULT_OUTBOX_CONFIG)
+    config.update(getattr(settings, "ANALYTICS_OUTBOX", {}))
+    return config
+
+
+# Handlers take the payloads of a run of consecutive events of their kind
+
+
+def handle_activity(payloads):
+    rows = []
+    for payload in payloads:
+        payload = dict(payload)
+        payload["timestamp"] = parse_datetime(payload["timestamp"])
+        rows.append(ActivityLog(**payload))
+    ActivityLog.objects.bulk_create(rows)
+
+
+def handle_order_saved(payloads):
+    from .rollups import apply_order_saved
+
+    for payload in payloads:
+        apply_order_saved(payload)
+
+
+def handle_order_deleted(payloads):
+    from .rollups import apply_order_deleted
+
+    for payload in payloads:
+        apply_order_deleted(payload)
+
+
+HANDLERS = {
+    "activity": handle_activity,
+    "order_saved": handle_order_saved,
+    "order_deleted": handle_order_deleted,
+}
+
+
+class AnalyticsOutbox:
+    """Record analytics events and hand them to their handlers."""
+
+    def __init__(self, inline=False, batch_size=500, max_attempts=5):
+        self.inline = inline
+        self.batch_size = max(1, int(batch_size))
+        self.max_attempts = max(1, int(max_attempts))
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls):
+        config = get_outbox_config()
+        return cls(
+            inline=config["INLINE"],
+            batch_size=config["BATCH_SIZE"],
+            max_attempts=config["MAX_ATTEMPTS"],
+        )
+
+    def record(self, kind, payload):
+        """Record an event of ``kind``; ``payload`` must be JSON-serializable."""
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown outbox event kind: {kind}")
+        # Handlers see the same JSON values whether the event was queued or not
+        payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+        if self.inline:
+            HANDLERS[kind]([payload])
+            return
+
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None and not connection.in_atomic_block:
+            buffer.append(OutboxEvent(kind=kind, payload=payload))
+        else:
+            OutboxEvent.objects.create(kind=kind, payload=payload)
+
+    @contextmanager
+    def batch(self):
+        """Buffer events recorded outside transactions and insert them at exit."""
+        if getattr(self._local, "buffer", None) is not None:
+            # Nested: the outermost batch writes
+            yield
+            return
+        self._local.buffer = []
+        try:
+            yield
+        finally:
+            buffer, self._local.buffer = self._local.buffer, None
+            if buffer:
+                try:
+                    OutboxEvent.objects.bulk_create(buffer)
+                except Exception as e:
+                    logger.error(f"Error writing {len(buffer)} outbox events: {e}")
+
+    def drain(self, limit=None):
+        """Handle pending events, oldest first. Returns how many were handled."""
+        handled = 0
+        failed = set()
+        while limit is None or handled < limit:
+            size = self.batch_size
+            if limit is not None:
+                size = min(size, limit - handled)
+            # Concurrent drainers skip each other's rows (PostgreSQL)
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    # Check foreign keys per event rather than at commit, so
+                    # a bad event fails on its own savepoint.
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                events = list(
+                    OutboxEvent.objects.select_for_update(skip_locked=True)
+                    .filter(attempts__lt=self.max_attempts)
+                    .exclude(pk__in=failed)
+                    .order_by("id")[:size]
+                )
+                if not events:
+                    break
+                failed.update(self._process(events))
+            handled += len(events)
+        return handled - len(failed)
+
+    def pending(self):
+        return OutboxEvent.objects.filter(attempts__lt=self.max_attempts).count()
+
+    def _process(self, events):
+        """Handle ``events``; delete the handled ones and return the failed ids."""
+        handled, failed = [], []
+        for kind, group in itertools.groupby(events, key=lambda event: event.kind):
+            group = list(group)
+            try:
+                with transaction.atomic():
+                    self._handle(kind, group)
+                handled.extend(group)
+                continue
+            except Exception as e:
+                logger.warning(f"Outbox {kind} batch failed, retrying events: {e}")
+
+            # One bad event (e.g. its user was deleted since) must not hold
+            # back the rest of the run.
+            for event in group:
+                try:
+                    with transaction.atomic():
+                        self._handle(kind, [event])
+                    handled.append(event)
+                except Exception as e:
+                    logger.error(f"Error handling outbox event {event.pk}: {e}")
+                    event.attempts += 1
+                    event.last_error = str(e)
+                    failed.append(event)
+
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in handled]).delete()
+        if failed:
+            OutboxEvent.objects.bulk_update(failed, ["attempts", "last_error"])
+        return [event.pk for event in failed]
+
+    def _handle(self, kind, events):
+        handler = HANDLERS.get(kind)
+        if handler is None:
+            raise ValueError(f"Unknown outbox event kind: {kind}")
+        handler([event.payload for event in events])
+
+
+class OutboxMiddleware:
+    """Insert the outbox events a request records outside transactions at once."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.outbox = get_outbox()
+
+    def __call__(self, request):
+        with self.outbox.batch():
+            return self.get_response(request)
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Return the process-wide analytics outbox."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = AnalyticsOutbox.from_settings()
+    return _outbox
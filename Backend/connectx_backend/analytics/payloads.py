@@ -0,0 +1,139 @@
+import json
+import random
+import re
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .log_writer import get_logging_config
+
+DEFAULT_BODY_POLICY = {
+    # "full" logs every body, "sample" logs SAMPLE_RATE of them and
+    # "metadata" logs none (method, route, status and timing only).
+    "MODE": "full",
+    "SAMPLE_RATE": 1.0,
+    # Bodies whose JSON is larger are replaced by a truncated preview
+    "MAX_BYTES": 8192,
+    # Log bodies of 4xx/5xx responses whatever the mode
+    "ALWAYS_ON_ERROR": True,
+}
+
+DEFAULT_SENSITIVE_KEYS = [
+    "password",
+    "token",
+    "api_key",
+    "secret",
+    "authorization",
+    "credit_card",
+    "cvv",
+    "ssn",
+    "social_security",
+]
+
+FILTERED = "***FILTERED***"
+
+
+class SensitiveDataFilter:
+    """
+    Mask values whose key contains any sensitive word. The words are
+    compiled into one regex and each distinct key is only matched once.
+    """
+
+    def __init__(self, sensitive_keys):
+        self._pattern = re.compile(
+            "|".join(re.escape(key) for key in sensitive_keys), re.IGNORECASE
+        )
+        self._decisions = {}
+
+    def is_sensitive(self, key):
+        decision = self._decisions.get(key)
+        if decision is None:
+            decision = self._pattern.search(str(key)) is not None
+            # Keys come from our own serializers, so this stays small; the
+            # bound only guards against clients sending arbitrary keys.
+            if len(self._decisions) < 10000:
+                self._decisions[key] = decision
+        return decision
+
+    def filter(self, data):
+        if isinstance(data, dict):
+            return {
+                k: FILTERED if self.is_sensitive(k) else self.filter(v)
+                for k, v in data.items()
+            }
+        elif isinstance(data, list):
+            return [self.filter(item) for item in data]
+        elif isinstance(data, uuid.UUID):
+            return str(data)
+        return data
+
+
+class BodyPolicy:
+    """Whether and how much of a request/response body to log."""
+
+    def __init__(
+        self, mode="full", sample_rate=1.0, max_bytes=8192, always_on_error=True
+    ):
+        self.mode = mode
+        self.sample_rate = float(sample_rate)
+        self.max_bytes = int(max_bytes)
+        self.always_on_error = always_on_error
+
+    @classmethod
+    def from_config(cls, config):
+        merged = dict(DEFAULT_BODY_POLICY)
+        merged.update(config)
+        return cls(
+            mode=merged["MODE"],
+            sample_rate=merged["SAMPLE_RATE"],
+            max_bytes=merged["MAX_BYTES"],
+            always_on_error=merged["ALWAYS_ON_ERROR"],
+        )
+
+    def should_capture(self, status_code):
+        if self.always_on_error and status_code >= 400:
+            return True
+        if self.mode == "metadata":
+            return False
+        if self.mode == "sample":
+            return random.random() < self.sample_rate
+        return True
+
+    def cap(self, data):
+        """Return ``data``, or a truncated preview if its JSON is too large."""
+        if data is None:
+            return None
+        encoded = json.dumps(data, cls=DjangoJSONEncoder)
+        if len(encoded) <= self.max_bytes:
+            return data
+        return {
+            "truncated": True,
+            "size": len(encoded),
+            "preview": encoded[: self.max_bytes],
+        }
+
+
+class BodyPolicies:
+    """
+    Default body policy plus per-route overrides, keyed by route template
+    (e.g. "/api/products/") or view name (e.g. "product-list").
+    """
+
+    def __init__(self, default, routes=None):
+        self.default = default
+        self.routes = routes or {}
+
+    @classmethod
+    def from_settings(cls):
+        config = get_logging_config()
+        default_config = config.get("BODY_POLICY", {})
+        return cls(
+            BodyPolicy.from_config(default_config),
+            {
+                key: BodyPolicy.from_config({**default_config, **route_config})
+                for key, route_config in config.get("ROUTE_BODY_POLICIES", {}).items()
+            },
+        )
+
+    def for_route(self, route, view_name):
+        return self.routes.get(route) or self.routes.get(view_name) or self.default
@@ -0,0 +1,268 @@
+"""
+Retention for the append-only log tables.
+
+Each table has a policy (see the LOG_RETENTION setting): rows older than
+``DAYS`` are pruned, after being rolled up into a daily summary table when
+``ROLLUP`` is set.
+
+On PostgreSQL a table may be converted to one partitioned by month on its
+timestamp column (``partition_ddl`` prints the one-off conversion; foreign
+keys are not recreated, Django enforces on_delete itself). Pruning
+then rolls up and drops whole partitions that lie before the cutoff, and
+``create_partitions`` adds upcoming ones. Rows before the cutoff that are
+not in a droppable partition, and every row on other databases, are
+deleted a day at a time in primary-key batches.
+"""
+
+import re
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    ActivityDailySummary,
+    ActivityLog,
+    APILatencyHistogram,
+    APIUsageDailySummary,
+    APIUsageLog,
+)
+from .utils import endpoint_group, increment_or_create
+
+DEFAULT_RETENTION = {
+    "api_usage_log": {"DAYS": 90, "ROLLUP": True},
+    "activity_log": {"DAYS": 365, "ROLLUP": True},
+    "api_latency_histogram": {"DAYS": 30, "ROLLUP": False},
+}
+
+PARTITION_BOUNDS = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \('([^']+)'\)")
+
+
+def rollup_api_usage(day, rows):
+    grouped = (
+        rows.annotate(route_group=endpoint_group())
+        .values("tenant_id", "route_group", "method")
+        .annotate(
+            total_calls=Count("id"),
+            error_calls=Count("id", filter=Q(status_code__gte=400)),
+            total_response_time=Sum("response_time"),
+        )
+        .order_by()
+    )
+    for row in grouped:
+        increment_or_create(
+            APIUsageDailySummary,
+            {
+                "date": day,
+                "tenant_id": row["tenant_id"],
+                "route": row["route_group"][:255],
+                "method": row["method"],
+            },
+            {
+                "total_calls": row["total_calls"],
+                "error_calls": row["error_calls"],
+                "total_response_time": row["total_response_time"] or 0,
+            },
+        )
+
+
+def rollup_activity(day, rows):
+    grouped = rows.values("tenant_id", "role").annotate(count=Count("id")).order_by()
+    for row in grouped:
+        increment_or_create(
+            ActivityDailySummary,
+            {"date": day, "tenant_id": row["tenant_id"], "role": row["role"]},
+            {"count": row["count"]},
+        )
+
+
+# table name -> (model, timestamp field, rollup function)
+LOG_TABLES = {
+    "api_usage_log": (APIUsageLog, "timestamp", rollup_api_usage),
+    "activity_log": (ActivityLog, "timestamp", rollup_activity),
+    "api_latency_histogram": (APILatencyHistogram, "minute", None),
+}
+
+
+def get_retention_policy(table):
+    """Return the retention policy for ``table`` merged over the defaults."""
+    policy = dict(DEFAULT_RETENTION[table])
+    policy.update(getattr(settings, "LOG_RETENTION", {}).get(table, {}))
+    return policy
+
+
+def retention_cutoff(table, now=None):
+    """Start of the oldest day that ``table`` keeps."""
+    days = get_retention_policy(table)["DAYS"]
+    day = timezone.localdate(now or timezone.now()) - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def is_partitioned(model):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c "
+            "ON c.oid = p.partrelid WHERE c.relname = %s",
+            [model._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_bounds(model):
+    """
+    Return (name, start, end) for each range partition of ``model``'s table.
+    ``start`` is None for a partition that starts at MINVALUE; the default
+    partition has no bounds and is left out.
+    """
+    if not is_partitioned(model):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [model._meta.db_table],
+        )
+        partitions = cursor.fetchall()
+
+    bounds = []
+    for name, bound in partitions:
+        match = PARTITION_BOUNDS.search(bound or "")
+        if match:
+            start = parse_datetime(match.group(1)) if match.group(1) else None
+            bounds.append((name, start, parse_datetime(match.group(2))))
+    return sorted(bounds, key=lambda partition: partition[2])
+
+
+def expired_partitions(model, cutoff):
+    """Partitions (see ``partition_bounds``) that end at or before ``cutoff``."""
+    return [
+        partition for partition in partition_bounds(model) if partition[2] <= cutoff
+    ]
+
+
+def create_partitions(model, months_ahead=2, now=None):
+    """
+    Create monthly partitions from this month through ``months_ahead``,
+    skipping months an existing partition already covers.
+    """
+    if not is_partitioned(model):
+        return []
+    table = model._meta.db_table
+    existing = partition_bounds(model)
+    month = timezone.localdate(now or timezone.now()).replace(day=1)
+    created = []
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            next_month = month + relativedelta(months=1)
+            month_start = timezone.make_aware(datetime.combine(month, time.min))
+            covered = any(
+                (start is None or start <= month_start) and month_start < end
+                for _, start, end in existing
+            )
+            if not covered:
+                name = f"{table}_p{month:%Y%m}"
+                cursor.execute(
+                    f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [month.isoformat(), next_month.isoformat()],
+                )
+                created.append(name)
+            month = next_month
+    return created
+
+
+def partition_ddl(model, now=None):
+    """
+    SQL that converts ``model``'s table to one partitioned by month. The
+    existing table is attached as the partition for everything before next
+    month, so no rows are copied; run ``create_partitions`` right after.
+    """
+    table = model._meta.db_table
+    field = next(f for m, f, _ in LOG_TABLES.values() if m is model)
+    column = model._meta.get_field(field).column
+    next_month = timezone.localdate(now or timezone.now()).replace(
+        day=1
+    ) + relativedelta(months=1)
+
+    statements = [
+        "BEGIN;",
+        f'ALTER TABLE "{table}" RENAME TO "{table}_legacy";',
+        f'CREATE TABLE "{table}" (LIKE "{table}_legacy" INCLUDING DEFAULTS) '
+        f'PARTITION BY RANGE ("{column}");',
+        # Unique keys on a partitioned table must include the partition key
+        f'ALTER TABLE "{table}" ADD PRIMARY KEY ("id", "{column}");',
+    ]
+    for index in model._meta.indexes:
+        columns = ", ".join(
+            f'"{model._meta.get_field(name.lstrip("-")).column}"'
+            for name in index.fields
+        )
+        statements.append(f'CREATE INDEX ON "{table}" ({columns});')
+    statements += [
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{table}_legacy" '
+        f"FOR VALUES FROM (MINVALUE) TO ('{next_month.isoformat()}');",
+        "COMMIT;",
+    ]
+    return "\n".join(statements)
+
+
+def prune_table(table, now=None, batch_size=5000, dry_run=False):
+    """
+    Roll up and remove ``table`` rows older than its retention period.
+
+    Returns a dict with the cutoff, dropped partitions and deleted rows.
+    """
+    model, field, rollup = LOG_TABLES[table]
+    policy = get_retention_policy(table)
+    if not policy["ROLLUP"]:
+        rollup = None
+    cutoff = retention_cutoff(table, now)
+    result = {"table": table, "cutoff": cutoff, "partitions": [], "deleted": 0}
+
+    for name, start, end in expired_partitions(model, cutoff):
+        result["partitions"].append(name)
+        if dry_run:
+            continue
+        with transaction.atomic():
+            if rollup:
+                rows = model.objects.filter(**{f"{field}__lt": end})
+                if start is not None:
+                    rows = rows.filter(**{f"{field}__gte": start})
+                for day in rows.dates(field, "day"):
+                    rollup(day, rows.filter(**{f"{field}__date": day}))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'ALTER TABLE "{model._meta.db_table}" DETACH PARTITION "{name}"'
+                )
+                cursor.execute(f'DROP TABLE "{name}"')
+
+    expired = model.objects.filter(**{f"{field}__lt": cutoff})
+    for day in expired.dates(field, "day"):
+        day_rows = expired.filter(**{f"{field}__date": day})
+        if dry_run:
+            result["deleted"] += day_rows.count()
+            continue
+        with transaction.atomic():
+            if rollup:
+                rollup(day, day_rows)
+            result["deleted"] += delete_in_batches(day_rows, batch_size)
+    return result
+
+
+def delete_in_batches(rows, batch_size):
+    """Delete ``rows`` with one DELETE per batch of primary keys."""
+    deleted = 0
+    while True:
+        batch = list(rows.order_by().values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += rows.model.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,210 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Analytics
+from .utils import increment_or_create
+
+# Orders in these statuses count towards revenue and order totals
+REVENUE_STATUSES = ("confirmed", "shipped", "delivered")
+
+ROLLUP_METRICS = ("placed", "orders", "revenue", "sales")
+
+
+def tenant_rollups():
+    """Per-tenant daily totals (rows without a product)."""
+    return Analytics.objects.filter(product__isnull=True)
+
+
+def order_day(order):
+    """The rollup day an order's facts are filed under."""
+    return timezone.localdate(order.created_at)
+
+
+def recognized_facts(order_id, total_amount):
+    """
+    Facts an order contributes while it is in a revenue status, keyed by
+    (product_id, metric_type). Tenant totals use a product_id of None.
+    """
+    from orders.models import OrderProductItem
+
+    facts = defaultdict(Decimal)
+    facts[(None, "orders")] += 1
+    facts[(None, "revenue")] += Decimal(total_amount)
+
+    items = OrderProductItem.objects.filter(order_id=order_id).values_list(
+        "product_id", "quantity", "price"
+    )
+    for product_id, quantity, price in items:
+        facts[(product_id, "sales")] += quantity
+        facts[(product_id, "revenue")] += quantity * price
+        facts[(product_id, "orders")] = Decimal(1)
+    return facts
+
+
+def add_to_rollup(tenant_id, product_id, metric_type, day, amount):
+    """Add ``amount`` to one daily fact, creating the row if needed."""
+    if not amount:
+        return
+    increment_or_create(
+        Analytics,
+        {
+            "tenant_id": tenant_id,
+            "product_id": product_id,
+            "metric_type": metric_type,
+            "date": day,
+        },
+        {"value": amount},
+    )
+
+
+def apply_facts(tenant_id, day, facts, sign=1):
+    for (product_id, metric_type), amount in facts.items():
+        add_to_rollup(tenant_id, product_id, metric_type, day, sign * amount)
+
+
+# Order changes reach the rollups as analytics.outbox events. Payloads hold
+# the signed fact changes, taken from the order and its items when it is
+# saved or deleted: by the time the outbox handles them the items may have
+# changed or be gone. They only hold JSON values.
+
+
+def order_saved_event(order, created):
+    """Outbox payload for an order that has just been saved."""
+    total = order.total_amount
+    is_recognized = order.status in REVENUE_STATUSES
+    facts = defaultdict(Decimal)
+    if created:
+        facts[(None, "placed")] += 1
+        if is_recognized:
+            _merge_facts(facts, recognized_facts(order.pk, total))
+    else:
+        was_recognized = order.get_original("status") in REVENUE_STATUSES
+        old_total = order.get_original("total_amount")
+        # Unknown if the total was deferred when the order was loaded
+        if old_total is None:
+            old_total = total
+        if was_recognized != is_recognized:
+            _merge_facts(
+                facts,
+                recognized_facts(order.pk, total),
+                1 if is_recognized else -1,
+            )
+        elif is_recognized and total != old_total:
+            facts[(None, "revenue")] += Decimal(total) - Decimal(old_total)
+    return {
+        "tenant_id": order.tenant_id,
+        "day": order_day(order),
+        "facts": _fact_rows(facts),
+    }
+
+
+def apply_order_saved(event):
+    """Update the rollups for an ``order_saved`` event."""
+    apply_facts(event["tenant_id"], parse_date(event["day"]), _parse_facts(event))
+
+
+def order_deleted_event(order):
+    """
+    Outbox payload removing an order's facts. Build it before the order's
+    items are deleted: the facts are taken from them now.
+    """
+    facts = {(None, "placed"): Decimal(1)}
+    if order.get_original("status") in REVENUE_STATUSES:
+        old_total = order.get_original("total_amount")
+        facts.update(recognized_facts(order.pk, old_total))
+        facts[(None, "revenue")] = old_total
+    return {
+        "tenant_id": order.tenant_id,
+        "day": order_day(order),
+        "facts": _fact_rows(facts),
+    }
+
+
+def apply_order_deleted(event):
+    """Remove the facts of an ``order_deleted`` event from the rollups."""
+    apply_facts(
+        event["tenant_id"], parse_date(event["day"]), _parse_facts(event), -1
+    )
+
+
+def _merge_facts(facts, other, sign=1):
+    for key, amount in other.items():
+        facts[key] += sign * amount
+
+
+def _fact_rows(facts):
+    return [
+        [product_id, metric_type, amount]
+        for (product_id, metric_type), amount in facts.items()
+    ]
+
+
+def _parse_facts(event):
+    return {
+        (product_id, metric_type): Decimal(amount)
+        for product_id, metric_type, amount in event["facts"]
+    }
+
+
+def compute_daily_facts(start=None, end=None):
+    """
+    Recompute every rollup fact from the order tables with grouped queries.
+
+    Returns {(tenant_id, product_id, metric_type, date): value} for orders
+    created between ``start`` and ``end`` (inclusive dates).
+    """
+    from orders.models import Order, OrderProductItem
+
+    orders = Order.objects.order_by()
+    items = OrderProductItem.objects.filter(order__status__in=REVENUE_STATUSES)
+    if start:
+        orders = orders.filter(created_at__date__gte=start)
+        items = items.filter(order__created_at__date__gte=start)
+    if end:
+        orders = orders.filter(created_at__date__lte=end)
+        items = items.filter(order__created_at__date__lte=end)
+
+    facts = {}
+    placed = (
+        orders.annotate(day=TruncDate("created_at"))
+        .values("tenant_id", "day")
+        .annotate(count=Count("id"))
+    )
+    for row in placed:
+        facts[(row["tenant_id"], None, "placed", row["day"])] = Decimal(row["count"])
+
+    recognized = (
+        orders.filter(status__in=REVENUE_STATUSES)
+        .annotate(day=TruncDate("created_at"))
+        .values("tenant_id", "day")
+        .annotate(count=Count("id"), revenue=Sum("total_amount"))
+    )
+    for row in recognized:
+        key = (row["tenant_id"], None)
+        facts[key + ("orders", row["day"])] = Decimal(row["count"])
+        facts[key + ("revenue", row["day"])] = row["revenue"]
+
+    per_product = (
+        items.annotate(day=TruncDate("order__created_at"))
+        .values("order__tenant_id", "product_id", "day")
+        .annotate(
+            orders=Count("order", distinct=True),
+            sales=Sum("quantity"),
+            revenue=Sum(
+                F("quantity") * F("price"),
+                output_field=DecimalField(max_digits=15, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+    for row in per_product:
+        key = (row["order__tenant_id"], row["product_id"])
+        facts[key + ("orders", row["day"])] = Decimal(row["orders"])
+        facts[key + ("sales", row["day"])] = Decimal(row["sales"])
+        facts[key + ("revenue", row["day"])] = row["revenue"]
+    return facts
@@ -191,6 +191,14 @@ class ReviewAnalyticsSerializer(serializers.Serializer):
         }
 
 
+class DemographicPeriodSerializer(serializers.Serializer):
+    """Serializer for one signup period of the demographic breakdown"""
+
+    period = serializers.DateField()
+    total_users = serializers.IntegerField()
+    gender_age_distribution = serializers.DictField(child=serializers.FloatField())
+
+
 class DemographicAnalyticsSerializer(serializers.Serializer):
     """Serializer for demographic analytics data"""
 
@@ -199,6 +207,11 @@ class DemographicAnalyticsSerializer(serializers.Serializer):
         child=serializers.FloatField(),
         help_text="Percentage distribution of users by gender and age group",
     )
+    breakdown = DemographicPeriodSerializer(
+        many=True,
+        required=False,
+        help_text="Distribution per signup period, when an interval is requested",
+    )
 
     class Meta:
         swagger_schema_fields = {
@@ -1,11 +1,12 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_init, post_save, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from orders.models import Order
 from products.models import Product
 from tenants.models import Tenant
-from analytics.models import ActivityLog
-from .utils import log_activity
+from .outbox import get_outbox
+from .rollups import order_deleted_event, order_saved_event
+from .utils import log_activity, record_activity
 
 User = get_user_model()
 
@@ -29,13 +30,25 @@ def log_order_activity(sender, instance, created, **kwargs):
             action=f"Updated order {instance.order_number}",
             details={
                 "order_id": str(instance.id),
-                "old_status": instance._original_status,
+                "old_status": instance.get_original("status"),
                 "new_status": instance.status,
             },
             tenant=instance.tenant,
         )
 
 
+@receiver(post_save, sender=Order)
+def update_order_rollups(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        get_outbox().record("order_saved", order_saved_event(instance, created))
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    # pre_delete, while the order's items still exist
+    get_outbox().record("order_deleted", order_deleted_event(instance))
+
+
 @receiver(post_save, sender=Product)
 def log_product_activity(sender, instance, created, **kwargs):
     # Try to get the user who performed the action, fallback to None
@@ -68,10 +81,10 @@ def log_product_activity(sender, instance, created, **kwargs):
 def track_tenant_creation(sender, instance, created, **kwargs):
     """Track tenant creation and updates."""
     if created:
-        ActivityLog.objects.create(
+        record_activity(
+            "tenant_created",
+            "owner",  # Default role for tenant creation
             tenant=instance,
-            role="owner",  # Default role for tenant creation
-            action="tenant_created",
             details={
                 "tenant_id": str(instance.id),
                 "tenant_name": instance.name,
@@ -85,45 +98,42 @@ def track_tenant_creation(sender, instance, created, **kwargs):
                 ),
             },
         )
-    else:
-        # Track tenant verification
-        if (
-            hasattr(instance, "_original_is_verified")
-            and instance.is_verified
-            and not instance._original_is_verified
-        ):
-            ActivityLog.objects.create(
-                tenant=instance,
-                role="admin",  # Only admins can verify tenants
-                action="tenant_verified",
-                details={
-                    "tenant_id": str(instance.id),
-                    "tenant_name": instance.name,
-                    "verified_by": (
-                        str(instance.verified_by.id)
-                        if hasattr(instance, "verified_by") and instance.verified_by
-                        else None
-                    ),
-                },
-            )
+    # Track tenant verification
+    elif instance.is_verified and instance._original_is_verified is False:
+        record_activity(
+            "tenant_verified",
+            "admin",  # Only admins can verify tenants
+            tenant=instance,
+            details={
+                "tenant_id": str(instance.id),
+                "tenant_name": instance.name,
+                "verified_by": (
+                    str(instance.verified_by.id)
+                    if hasattr(instance, "verified_by") and instance.verified_by
+                    else None
+                ),
+            },
+        )
+    instance._original_is_verified = instance.is_verified
 
 
 @receiver(post_save, sender=User)
 def track_user_changes(sender, instance, created, **kwargs):
     """Track user creation and role changes."""
+    tenant = instance.tenant if instance.tenant_id else None
     if created:
-        ActivityLog.objects.create(
-            tenant=instance.tenant if hasattr(instance, "tenant") else None,
+        record_activity(
+            "user_created",
+            instance.role,
             user=instance,
-            role=instance.role,
-            action="user_created",
+            tenant=tenant,
             details={
                 "user_id": str(instance.id),
                 "user_email": instance.email,
                 "user_name": instance.name,
                 "user_role": instance.role,
-                "tenant_id": str(instance.tenant.id) if instance.tenant else None,
-                "tenant_name": instance.tenant.name if instance.tenant else None,
+                "tenant_id": str(tenant.id) if tenant else None,
+                "tenant_name": tenant.name if tenant else None,
                 "created_by": (
                     str(instance.created_by.id)
                     if hasattr(instance, "created_by") and instance.created_by
@@ -131,51 +141,46 @@ def track_user_changes(sender, instance, created, **kwargs):
                 ),
             },
         )
-    else:
-        # Track role changes
-        if (
-            hasattr(instance, "_original_role")
-            and instance._original_role != instance.role
-        ):
-            ActivityLog.objects.create(
-                tenant=instance.tenant if hasattr(instance, "tenant") else None,
-                user=instance,
-                role=instance.role,
-                action="user_role_changed",
-                details={
-                    "user_id": str(instance.id),
-                    "user_email": instance.email,
-                    "user_name": instance.name,
-                    "old_role": instance._original_role,
-                    "new_role": instance.role,
-                    "tenant_id": str(instance.tenant.id) if instance.tenant else None,
-                    "tenant_name": instance.tenant.name if instance.tenant else None,
-                    "changed_by": (
-                        str(instance.created_by.id)
-                        if hasattr(instance, "created_by") and instance.created_by
-                        else None
-                    ),
-                },
-            )
-
-
-@receiver(pre_save, sender=Tenant)
+    # Track role changes
+    elif (
+        instance._original_role is not None
+        and instance._original_role != instance.role
+    ):
+        record_activity(
+            "user_role_changed",
+            instance.role,
+            user=instance,
+            tenant=tenant,
+            details={
+                "user_id": str(instance.id),
+                "user_email": instance.email,
+                "user_name": instance.name,
+                "old_role": instance._original_role,
+                "new_role": instance.role,
+                "tenant_id": str(tenant.id) if tenant else None,
+                "tenant_name": tenant.name if tenant else None,
+                "changed_by": (
+                    str(instance.created_by.id)
+                    if hasattr(instance, "created_by") and instance.created_by
+                    else None
+                ),
+            },
+        )
+    instance._original_role = instance.role
+
+
+# Original values come from the loaded instance rather than a re-read of
+# the row before each save. Deferred fields are missing from __dict__ and
+# are not tracked: reading them here would query.
+
+
+@receiver(post_init, sender=Tenant)
 def store_tenant_original_values(sender, instance, **kwargs):
     """Store original tenant values for comparison."""
-    if instance.pk:
-        try:
-            original = Tenant.objects.get(pk=instance.pk)
-            instance._original_is_verified = original.is_verified
-        except Tenant.DoesNotExist:
-            pass
+    instance._original_is_verified = instance.__dict__.get("is_verified")
 
 
-@receiver(pre_save, sender=User)
+@receiver(post_init, sender=User)
 def store_user_original_values(sender, instance, **kwargs):
     """Store original user values for comparison."""
-    if instance.pk:
-        try:
-            original = User.objects.get(pk=instance.pk)
-            instance._original_role = original.role
-        except User.DoesNotExist:
-            pass
+    instance._original_role = instance.__dict__.get("role")
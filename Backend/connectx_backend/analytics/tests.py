@@ -1,3 +1,680 @@
-from django.test import TestCase
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from analytics.latency import LatencyHistogram, LatencyRecorder
+from analytics.log_writer import APIUsageLogWriter
+from analytics.outbox import AnalyticsOutbox
+from analytics.middleware import APIUsageLoggingMiddleware
+from analytics.models import (
+    ActivityDailySummary,
+    ActivityLog,
+    Analytics,
+    APILatencyHistogram,
+    APIUsageDailySummary,
+    APIUsageLog,
+    OutboxEvent,
+)
+from analytics.payloads import FILTERED, BodyPolicy, SensitiveDataFilter
+from categories.models import Category
+from orders.models import Order, OrderProductItem
+from products.models import Product
+from tenants.models import Tenant
+from users.models import User
+
+
+def make_entry(endpoint="/api/products/"):
+    return {
+        "endpoint": endpoint,
+        "method": "GET",
+        "status_code": 200,
+        "response_time": 0.01,
+    }
+
+
+class APIUsageLogWriterTestCase(TestCase):
+    def test_sync_writer_inserts_immediately(self):
+        writer = APIUsageLogWriter(run_async=False)
+        self.assertTrue(writer.enqueue(make_entry()))
+        self.assertEqual(APIUsageLog.objects.count(), 1)
+        self.assertEqual(writer.stats()["flushed"], 1)
+
+    def test_flush_writes_queued_entries_in_batches(self):
+        writer = APIUsageLogWriter(batch_size=2)
+        for i in range(5):
+            writer._queue.put_nowait(make_entry(f"/api/products/{i}/"))
+
+        with CaptureQueriesContext(connection) as context:
+            writer.flush()
+
+        inserts = [q for q in context.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)
+
+        self.assertEqual(APIUsageLog.objects.count(), 5)
+        self.assertEqual(writer.flushed, 5)
+
+    def test_full_queue_drops_entries(self):
+        writer = APIUsageLogWriter(max_queue_size=2, flush_interval=60)
+        # Keep the worker from draining the queue during the test.
+        writer._ensure_worker = lambda: None
+        results = [writer.enqueue(make_entry()) for _ in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(writer.dropped, 1)
+        self.assertEqual(writer.stats()["queue_size"], 2)
+
+    def test_sample_policy_sheds_load_above_high_water(self):
+        writer = APIUsageLogWriter(
+            max_queue_size=4,
+            overflow_policy="sample",
+            overflow_high_water=0.5,
+            overflow_sample_rate=0.0,
+        )
+        writer._ensure_worker = lambda: None
+        results = [writer.enqueue(make_entry()) for _ in range(4)]
+
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(writer.sampled_out, 2)
+        self.assertEqual(writer.dropped, 0)
+
+    def test_stop_flushes_remaining_entries(self):
+        writer = APIUsageLogWriter()
+        writer._ensure_worker = lambda: None
+        writer.enqueue(make_entry())
+        writer.enqueue(make_entry())
+
+        writer.stop()
+
+        self.assertEqual(APIUsageLog.objects.count(), 2)
+        self.assertEqual(writer.stats()["queue_size"], 0)
+
+
+class AnalyticsRollupTestCase(APITestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.owner = User.objects.create_user(
+            email="owner@example.com",
+            password="ownerpass",
+            name="Owner",
+            tenant=self.tenant,
+            role=User.OWNER,
+        )
+        category = Category.objects.create(tenant=self.tenant, name="Electronics")
+        self.product = Product.objects.create(
+            owner=self.tenant, category=category, name="Phone", base_price=10
+        )
+        self.today = timezone.localdate()
+
+    def create_order(self, total, status="pending"):
+        order = Order.objects.create(
+            tenant=self.tenant,
+            order_number=f"ORD-{uuid.uuid4()}",
+            status=status,
+            subtotal=total,
+            taxes=0,
+            shipping=0,
+            discount=0,
+        )
+        OrderProductItem.objects.create(
+            order=order, product=self.product, quantity=2, price=10
+        )
+        return order
+
+    def rollup(self, metric_type, product=None):
+        row = Analytics.objects.filter(
+            tenant=self.tenant, product=product, metric_type=metric_type
+        ).first()
+        return row.value if row else 0
+
+    def test_status_changes_update_rollups(self):
+        order = self.create_order(25)
+        self.assertEqual(self.rollup("placed"), 1)
+        self.assertEqual(self.rollup("revenue"), 0)
+
+        order.status = "confirmed"
+        order.save()
+        self.assertEqual(self.rollup("orders"), 1)
+        self.assertEqual(self.rollup("revenue"), 25)
+        self.assertEqual(self.rollup("sales", self.product), 2)
+        self.assertEqual(self.rollup("revenue", self.product), 20)
+
+        order.status = "shipped"
+        order.save()
+        self.assertEqual(self.rollup("revenue"), 25)
+
+        order.status = "cancelled"
+        order.save()
+        self.assertEqual(self.rollup("orders"), 0)
+        self.assertEqual(self.rollup("revenue"), 0)
+        self.assertEqual(self.rollup("sales", self.product), 0)
+
+        order.delete()
+        self.assertEqual(self.rollup("placed"), 0)
+
+    def test_backfill_rebuilds_drifted_rollups(self):
+        for total in (10, 20):
+            order = self.create_order(total)
+            order.status = "delivered"
+            order.save()
+        self.create_order(40)
+
+        out = StringIO()
+        call_command("backfill_analytics_rollups", "--verify", stdout=out)
+        self.assertIn("0 rollup rows have drifted", out.getvalue())
+
+        Analytics.objects.all().delete()
+        out = StringIO()
+        call_command("backfill_analytics_rollups", "--verify", stdout=out)
+        self.assertIn("6 rollup rows have drifted", out.getvalue())
+
+        call_command("backfill_analytics_rollups", stdout=StringIO())
+        self.assertEqual(self.rollup("placed"), 3)
+        self.assertEqual(self.rollup("orders"), 2)
+        self.assertEqual(self.rollup("revenue"), 30)
+        self.assertEqual(self.rollup("revenue", self.product), 40)
+
+    def test_dashboards_read_rollups(self):
+        order = self.create_order(25)
+        order.status = "confirmed"
+        order.save()
+        self.client.force_authenticate(user=self.owner)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse("tenant-analytics-sales-overview"),
+                {"start_date": self.today, "end_date": self.today},
+            )
+        self.assertFalse(
+            any("orders_order" in q["sql"] for q in context.captured_queries)
+        )
+        self.assertEqual(response.data["results"][0]["order_count"], 1)
+        self.assertEqual(float(response.data["results"][0]["total_sales"]), 25.0)
+
+        response = self.client.get(reverse("tenant-analytics-revenue-overview"))
+        self.assertEqual(response.data["total_revenue"], 25.0)
+
+
+class DemographicAnalyticsTestCase(APITestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.owner = User.objects.create_user(
+            email="owner@example.com",
+            password="ownerpass",
+            name="Owner",
+            tenant=self.tenant,
+            role=User.OWNER,
+        )
+        customers = [
+            ("male", 20),
+            ("male", 22),
+            ("female", 30),
+            ("female", 60),
+            ("male", None),
+            (None, 40),
+            ("none", 40),
+            ("female", 16),
+        ]
+        for i, (gender, age) in enumerate(customers):
+            User.objects.create_user(
+                email=f"customer{i}@example.com",
+                password="customerpass",
+                name="Customer",
+                tenant=self.tenant,
+                role=User.CUSTOMER,
+                gender=gender,
+                age=age,
+            )
+        self.url = reverse("tenant-analytics-demographic-analytics")
+        self.client.force_authenticate(user=self.owner)
+
+    def test_histogram_in_one_grouped_query(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        user_queries = [
+            q for q in context.captured_queries if 'FROM "users"' in q["sql"]
+        ]
+        self.assertEqual(len(user_queries), 1)
+
+        self.assertEqual(response.data["total_users"], 8)
+        distribution = response.data["gender_age_distribution"]
+        self.assertEqual(distribution["male_18_24"], 25.0)
+        self.assertEqual(distribution["female_25_34"], 12.5)
+        self.assertEqual(distribution["female_55_plus"], 12.5)
+        self.assertEqual(distribution["others"], 25.0)
+        self.assertNotIn("breakdown", response.data)
+
+    def test_breakdown_by_period(self):
+        response = self.client.get(self.url, {"interval": "monthly"})
+
+        breakdown = response.data["breakdown"]
+        self.assertEqual(len(breakdown), 1)
+        self.assertEqual(
+            breakdown[0]["period"], timezone.localdate().replace(day=1).isoformat()
+        )
+        self.assertEqual(breakdown[0]["total_users"], 8)
+        self.assertEqual(
+            breakdown[0]["gender_age_distribution"],
+            response.data["gender_age_distribution"],
+        )
+
+
+class LatencyHistogramTestCase(APITestCase):
+    def setUp(self):
+        self.recorder = LatencyRecorder(run_async=False)
+        self.now = timezone.now()
+
+    def test_percentiles_are_within_bucket_error(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.record(float(value))
+
+        self.assertAlmostEqual(histogram.percentile(50), 500, delta=25)
+        self.assertAlmostEqual(histogram.percentile(99), 990, delta=50)
+        self.assertEqual(histogram.percentile(100), 1000)
+        self.assertEqual(histogram.summary()["avg"], 500.5)
+
+    def test_recorder_merges_into_one_row_per_minute(self):
+        for value in (10, 20, 30):
+            self.recorder.record("/api/products/", "GET", None, value, self.now)
+        self.recorder.record("/api/products", "GET", None, 400, self.now)
+
+        row = APILatencyHistogram.objects.get()
+        self.assertEqual(row.endpoint, "/api/products")
+        self.assertEqual(row.count, 4)
+        self.assertEqual(row.max_time, 400)
+
+    def test_percentile_endpoint_merges_minutes(self):
+        admin = User.objects.create_user(
+            email="admin@example.com",
+            password="adminpass",
+            name="Admin",
+            role="admin",
+            is_staff=True,
+        )
+        for minutes_ago in range(3):
+            at = self.now - timedelta(minutes=minutes_ago)
+            for value in range(1, 101):
+                self.recorder.record("/api/orders/", "GET", None, value, at)
+
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse("api-logs-latency-percentiles"))
+
+        result = next(
+            r for r in response.data["results"] if r["endpoint"] == "/api/orders"
+        )
+        self.assertEqual(result["count"], 300)
+        self.assertAlmostEqual(result["p90"], 90, delta=5)
+        self.assertEqual(result["max"], 100)
+
+
+class APIUsageRouteTestCase(APITestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.admin = User.objects.create_user(
+            email="admin@example.com",
+            password="adminpass",
+            name="Admin",
+            role="admin",
+            is_staff=True,
+        )
+        category = Category.objects.create(tenant=self.tenant, name="Electronics")
+        self.products = [
+            Product.objects.create(
+                owner=self.tenant,
+                category=category,
+                name=f"Product {i}",
+                base_price=10,
+                is_public=True,
+            )
+            for i in range(2)
+        ]
+        self.client.force_authenticate(user=self.admin)
+
+    def test_logs_record_route_template(self):
+        self.client.get(reverse("product-detail", args=[self.products[0].id]))
+
+        log = APIUsageLog.objects.get()
+        self.assertEqual(log.route, "/api/products/<pk>/")
+        self.assertEqual(log.view_name, "product-detail")
+
+    def test_api_usage_groups_by_route(self):
+        for product in self.products:
+            self.client.get(reverse("product-detail", args=[product.id]))
+        APIUsageLog.objects.create(
+            endpoint="/api/legacy/",
+            method="GET",
+            status_code=200,
+            response_time=0.01,
+        )
+
+        response = self.client.get(
+            reverse("admin-analytics-api-usage"), {"method": "GET"}
+        )
+
+        results = response.data["results"]
+        calls = {row["endpoint"]: row["total_calls"] for row in results}
+        self.assertEqual(calls["/api/products/<pk>/"], 2)
+        self.assertEqual(calls["/api/legacy"], 1)
+
+        response = self.client.get(reverse("admin-analytics-api-endpoints-graph"))
+        values = dict(zip(response.data["labels"], response.data["values"]))
+        self.assertEqual(values["products"], 2)
+
+    def test_endpoint_graph_categories_from_settings(self):
+        self.client.get(reverse("product-detail", args=[self.products[0].id]))
+        for endpoint in ("/api/legacy/", "/api/orders/", "/unknown/"):
+            APIUsageLog.objects.create(
+                endpoint=endpoint, method="GET", status_code=200, response_time=0.01
+            )
+
+        categories = {
+            "catalog": ["/api/products", "/api/legacy"],
+            "orders": ["/api/orders"],
+        }
+        with self.settings(API_ENDPOINT_CATEGORIES=categories):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(
+                    reverse("admin-analytics-api-endpoints-graph")
+                )
+
+        self.assertEqual(response.data["labels"], ["catalog", "orders"])
+        self.assertEqual(response.data["values"], [2, 1])
+        log_reads = [
+            q
+            for q in context.captured_queries
+            if 'FROM "analytics_apiusagelog"' in q["sql"]
+        ]
+        self.assertEqual(len(log_reads), 1)
+
+    def test_logs_cursor_pages(self):
+        for _ in range(3):
+            self.client.get(reverse("product-detail", args=[self.products[0].id]))
+        expected = [
+            str(pk)
+            for pk in APIUsageLog.objects.order_by("-timestamp", "-id").values_list(
+                "id", flat=True
+            )
+        ]
+
+        response = self.client.get(
+            reverse("api-logs-logs"), {"cursor": "", "page_size": 2}
+        )
+        first_page = [log["id"] for log in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        second_page = [log["id"] for log in response.data["results"]]
+
+        # Later pages are unaffected by the logs requests being logged too
+        self.assertEqual(first_page + second_page, expected)
+
+
+class PayloadPolicyTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def log_request(self, status_code=200, data=None, **logging):
+        def get_response(request):
+            response = JsonResponse(data or {"id": 1}, status=status_code)
+            response.data = data or {"id": 1}
+            return response
+
+        with self.settings(API_USAGE_LOGGING={"ASYNC": False, **logging}):
+            middleware = APIUsageLoggingMiddleware(get_response)
+        request = self.factory.post(
+            "/api/products/",
+            {"name": "Phone", "password": "secret"},
+            content_type="application/json",
+        )
+        request.resolver_match = resolve("/api/products/")
+        middleware(request)
+        return APIUsageLog.objects.latest("timestamp")
+
+    def test_policy_modes(self):
+        self.assertFalse(BodyPolicy(mode="metadata").should_capture(200))
+        self.assertTrue(BodyPolicy(mode="metadata").should_capture(500))
+        self.assertFalse(
+            BodyPolicy(mode="metadata", always_on_error=False).should_capture(500)
+        )
+        self.assertFalse(BodyPolicy(mode="sample", sample_rate=0).should_capture(200))
+        self.assertTrue(BodyPolicy(mode="sample", sample_rate=1).should_capture(200))
+
+    def test_large_bodies_are_truncated(self):
+        capped = BodyPolicy(max_bytes=50).cap({"description": "x" * 100})
+
+        self.assertTrue(capped["truncated"])
+        self.assertEqual(len(capped["preview"]), 50)
+        self.assertGreater(capped["size"], 100)
+
+    def test_filter_masks_nested_sensitive_keys(self):
+        data = SensitiveDataFilter(["password", "token"]).filter(
+            {"user": {"Password": "x", "name": "A"}, "items": [{"access_token": 1}]}
+        )
+
+        self.assertEqual(data["user"], {"Password": FILTERED, "name": "A"})
+        self.assertEqual(data["items"], [{"access_token": FILTERED}])
+
+    def test_middleware_applies_route_policy(self):
+        log = self.log_request()
+        self.assertEqual(log.request_data, {"name": "Phone", "password": FILTERED})
+        self.assertEqual(log.response_data, {"id": 1})
+
+        metadata_only = {
+            "ROUTE_BODY_POLICIES": {"/api/products/": {"MODE": "metadata"}}
+        }
+        log = self.log_request(**metadata_only)
+        self.assertIsNone(log.request_data)
+        self.assertIsNone(log.response_data)
+
+        log = self.log_request(400, {"name": ["Required."]}, **metadata_only)
+        self.assertEqual(log.response_data, {"name": ["Required."]})
+
+
+class LogRetentionTestCase(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.old = timezone.now() - timedelta(days=120)
+        for status_code in (200, 200, 500):
+            APIUsageLog.objects.create(
+                endpoint="/api/products/1/",
+                route="/api/products/<pk>/",
+                method="GET",
+                status_code=status_code,
+                response_time=0.5,
+                tenant=self.tenant,
+                timestamp=self.old,
+            )
+        APIUsageLog.objects.create(
+            endpoint="/api/products/", method="GET", status_code=200, response_time=0.1
+        )
+        ActivityLog.objects.all().delete()
+        for _ in range(2):
+            ActivityLog.objects.create(
+                tenant=self.tenant, role="owner", action="Updated product"
+            )
+        ActivityLog.objects.update(timestamp=timezone.now() - timedelta(days=400))
+
+    def test_prune_rolls_up_and_deletes_expired_rows(self):
+        out = StringIO()
+        call_command("prune_logs", "--batch-size", "2", stdout=out)
+
+        self.assertIn("api_usage_log: Removed 3 rows", out.getvalue())
+        self.assertEqual(APIUsageLog.objects.count(), 1)
+        self.assertEqual(ActivityLog.objects.count(), 0)
+
+        summary = APIUsageDailySummary.objects.get()
+        self.assertEqual(summary.date, timezone.localdate(self.old))
+        self.assertEqual(summary.route, "/api/products/<pk>/")
+        self.assertEqual(summary.total_calls, 3)
+        self.assertEqual(summary.error_calls, 1)
+        self.assertEqual(summary.total_response_time, 1.5)
+        self.assertEqual(ActivityDailySummary.objects.get(role="owner").count, 2)
+
+    def test_dry_run_and_per_table_policy(self):
+        out = StringIO()
+        call_command("prune_logs", "--dry-run", stdout=out)
+        self.assertIn("api_usage_log: Would remove 3 rows", out.getvalue())
+        self.assertEqual(APIUsageLog.objects.count(), 4)
+
+        with self.settings(LOG_RETENTION={"api_usage_log": {"DAYS": 365}}):
+            call_command("prune_logs", "--table", "api_usage_log", stdout=StringIO())
+        self.assertEqual(APIUsageLog.objects.count(), 4)
+        self.assertEqual(ActivityLog.objects.count(), 2)
+
+
+class AnalyticsOutboxTestCase(TestCase):
+    def setUp(self):
+        # Queue events as in production; tests otherwise handle them inline
+        self.outbox = AnalyticsOutbox(inline=False)
+        patcher = patch("analytics.outbox._outbox", self.outbox)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.owner = User.objects.create_user(
+            email="owner@example.com",
+            password="ownerpass",
+            name="Owner",
+            tenant=self.tenant,
+            role=User.OWNER,
+        )
+        category = Category.objects.create(tenant=self.tenant, name="Electronics")
+        self.product = Product.objects.create(
+            owner=self.tenant, category=category, name="Phone", base_price=10
+        )
+
+    def test_events_are_handled_when_drained(self):
+        order = Order.objects.create(
+            tenant=self.tenant,
+            order_number=f"ORD-{uuid.uuid4()}",
+            status="pending",
+            subtotal=25,
+        )
+        OrderProductItem.objects.create(
+            order=order, product=self.product, quantity=2, price=10
+        )
+        order.status = "confirmed"
+        order.save()
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertFalse(Analytics.objects.exists())
+
+        pending = OutboxEvent.objects.count()
+        self.assertEqual(self.outbox.drain(), pending)
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertTrue(
+            ActivityLog.objects.filter(action="order_status_change").exists()
+        )
+        self.assertTrue(ActivityLog.objects.filter(action="user_created").exists())
+        revenue = Analytics.objects.get(
+            tenant=self.tenant, product=None, metric_type="revenue"
+        )
+        self.assertEqual(revenue.value, 25)
+        self.assertEqual(
+            Analytics.objects.get(product=self.product, metric_type="sales").value, 2
+        )
+
+        order.delete()
+        self.outbox.drain()
+        self.assertFalse(
+            Analytics.objects.filter(tenant=self.tenant).exclude(value=0).exists()
+        )
+
+    def test_order_deleted_before_drain_leaves_no_rollups(self):
+        order = Order.objects.create(
+            tenant=self.tenant,
+            order_number=f"ORD-{uuid.uuid4()}",
+            status="pending",
+            subtotal=20,
+        )
+        OrderProductItem.objects.create(
+            order=order, product=self.product, quantity=2, price=10
+        )
+        order.status = "confirmed"
+        order.save()
+        order.delete()
+
+        self.outbox.drain()
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertFalse(
+            Analytics.objects.filter(tenant=self.tenant).exclude(value=0).exists()
+        )
+
+    def test_original_values_come_from_loaded_instance(self):
+        user = User.objects.get(pk=self.owner.pk)
+        user.role = User.MEMBER
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+        self.assertFalse(
+            any(
+                q["sql"].startswith("SELECT") and "users_user" in q["sql"]
+                for q in context.captured_queries
+            )
+        )
+        self.outbox.drain()
+        change = ActivityLog.objects.get(action="user_role_changed")
+        self.assertEqual(change.details["old_role"], User.OWNER)
+
+        # Saving again without a change records nothing more
+        user.save()
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failing_event_is_retried_without_blocking_others(self):
+        OutboxEvent.objects.all().delete()
+        bad = OutboxEvent.objects.create(kind="activity", payload={"role": "admin"})
+        self.outbox.record(
+            "activity",
+            {
+                "role": "admin",
+                "action": "ok",
+                "user_id": None,
+                "tenant_id": None,
+                "details": None,
+                "timestamp": timezone.now(),
+            },
+        )
+
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertTrue(ActivityLog.objects.filter(action="ok").exists())
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 1)
+        self.assertTrue(bad.last_error)
+
+
+class OutboxBatchTestCase(TransactionTestCase):
+    def test_events_outside_transactions_are_inserted_together(self):
+        outbox = AnalyticsOutbox(inline=False)
+        with patch("analytics.outbox._outbox", outbox):
+            with CaptureQueriesContext(connection) as context:
+                with outbox.batch():
+                    for i in range(3):
+                        Tenant.objects.create(
+                            name=f"Tenant{i}",
+                            email=f"owner{i}@example.com",
+                            password="ownerpass",
+                        )
+                    self.assertFalse(OutboxEvent.objects.exists())
+        inserts = [
+            q
+            for q in context.captured_queries
+            if q["sql"].startswith("INSERT") and "analytics_outboxevent" in q["sql"]
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(OutboxEvent.objects.filter(kind="activity").count(), 3)
@@ -1,4 +1,44 @@
-from .models import ActivityLog
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Length, Substr
+from django.utils import timezone
+
+from .outbox import get_outbox
+
+# Dashboard category -> endpoint prefixes; the first matching category wins
+DEFAULT_ENDPOINT_CATEGORIES = {
+    "products": ["/api/products", "/products"],
+    "tenants": ["/api/tenants", "/tenants"],
+    "analytics": ["/api/analytics", "/analytics"],
+    "orders": ["/api/orders", "/orders"],
+    "users": ["/api/users", "/users"],
+    "auth": ["/api/auth", "/auth"],
+}
+
+
+def activity_event(action, role, user=None, tenant=None, details=None):
+    """
+    Outbox payload for one ActivityLog row, stamped with the current time.
+    ``tenant`` defaults to the user's.
+    """
+    return {
+        "user_id": getattr(user, "pk", None),
+        "tenant_id": (
+            tenant.pk if tenant is not None else getattr(user, "tenant_id", None)
+        ),
+        "role": role,
+        "action": action,
+        "details": details,
+        "timestamp": timezone.now(),
+    }
+
+
+def record_activity(action, role, user=None, tenant=None, details=None):
+    """Queue an ActivityLog row on the analytics outbox."""
+    get_outbox().record(
+        "activity", activity_event(action, role, user, tenant, details)
+    )
 
 
 def log_activity(user, action, details=None, tenant=None):
@@ -17,10 +57,57 @@ def log_activity(user, action, details=None, tenant=None):
         role = user.role
     else:
         role = 'admin'  # fallback to admin if user is None or has no role
-    ActivityLog.objects.create(
-        user=user,
-        tenant=tenant or getattr(user, "tenant", None),
-        role=role,
-        action=action,
-        details=details,
+    record_activity(action, role, user=user, tenant=tenant, details=details)
+
+
+def increment_or_create(model, lookup, increments):
+    """
+    Add ``increments`` (field -> amount) to the row matching ``lookup``,
+    creating it with those amounts if it does not exist yet. Safe against
+    concurrent writers when ``lookup`` is covered by a unique constraint.
+    """
+    rows = model.objects.filter(**lookup)
+    updates = {field: F(field) + amount for field, amount in increments.items()}
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments)
+    except IntegrityError:
+        # Another transaction created the row first
+        rows.update(**updates)
+
+
+def endpoint_group():
+    """
+    Low-cardinality grouping key for API usage logs: the resolved route
+    template, or for rows logged without one, the path minus its trailing
+    slash.
+    """
+    return Case(
+        When(~Q(route=""), then=F("route")),
+        When(endpoint="/", then=Value("/")),
+        When(
+            endpoint__endswith="/",
+            then=Substr(F("endpoint"), 1, Length(F("endpoint")) - 1),
+        ),
+        default=F("endpoint"),
     )
+
+
+def get_endpoint_categories():
+    """Return the configured API endpoint categories (API_ENDPOINT_CATEGORIES)."""
+    return getattr(settings, "API_ENDPOINT_CATEGORIES", DEFAULT_ENDPOINT_CATEGORIES)
+
+
+def endpoint_category(categories, field="route_group"):
+    """
+    A Case expression labelling each log with the first category whose
+    prefixes ``field`` starts with, or NULL if none match.
+    """
+    whens = [
+        When(**{f"{field}__startswith": prefix}, then=Value(category))
+        for category, prefixes in categories.items()
+        for prefix in prefixes
+    ]
+    return Case(*whens, default=Value(None), output_field=CharField())
@@ -26,7 +26,6 @@ from django.db.models.functions import (
 )
 from django.utils import timezone
 from datetime import timedelta
-from rest_framework.pagination import PageNumberPagination
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import (
@@ -36,7 +35,18 @@ from .models import (
     SystemHealth,
     ActivityLog,
     APIUsageLog,
+    APILatencyHistogram,
 )
+from .latency import get_latency_recorder, merge_histograms, normalize_endpoint
+from .log_writer import get_log_writer
+from .demographics import (
+    PERIOD_FUNCTIONS,
+    demographic_histogram,
+    gender_age_distribution,
+    get_age_groups,
+)
+from .rollups import tenant_rollups
+from .utils import endpoint_category, endpoint_group, get_endpoint_categories
 from .serializers import (
     AnalyticsSerializer,
     SystemMetricsSerializer,
@@ -63,19 +73,20 @@ from users.models import User
 from products.models import Product
 from dateutil.relativedelta import relativedelta
 
+from core.pagination import CustomPagination as BasePagination
 from users.permissions import IsTenantMember
 from django.db.models.functions import Coalesce
 
 
-class CustomPagination(PageNumberPagination):
-    page_size = 10
+class CustomPagination(BasePagination):
     page_size_query_param = "page_size"
-    max_page_size = 100
 
 
 class AdminAnalyticsViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
     pagination_class = CustomPagination
+    # Keyset order for feeds that accept ?cursor=
+    keyset_fields = ("-timestamp", "-id")
 
     @swagger_auto_schema(
         operation_description="Get analytics overview",
@@ -104,41 +115,36 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
         end_date = request.query_params.get("end_date")
 
         # Base queryset
-        orders_qs = Order.objects.all()
+        rollups_qs = tenant_rollups()
         users_qs = User.objects.filter(Q(role="owner") | Q(role="member"))
-        tenants_qs = Tenant.objects.all()
+        active_qs = tenant_rollups().filter(
+            metric_type="placed",
+            date__gte=(timezone.now() - timedelta(days=30)).date(),
+        )
 
         # Apply date filters if provided
         if start_date:
-            orders_qs = orders_qs.filter(created_at__gte=start_date)
+            rollups_qs = rollups_qs.filter(date__gte=start_date)
             users_qs = users_qs.filter(created_at__gte=start_date)
-            tenants_qs = tenants_qs.filter(created_at__gte=start_date)
+            active_qs = active_qs.filter(tenant__created_at__gte=start_date)
         if end_date:
-            orders_qs = orders_qs.filter(created_at__lte=end_date)
+            rollups_qs = rollups_qs.filter(date__lte=end_date)
             users_qs = users_qs.filter(created_at__lte=end_date)
-            tenants_qs = tenants_qs.filter(created_at__lte=end_date)
+            active_qs = active_qs.filter(tenant__created_at__lte=end_date)
 
         # Get total merchants
         total_merchants = users_qs.count()
 
-        # Get total revenue from confirmed orders
-        total_revenue = (
-            orders_qs.filter(
-                status__in=["confirmed", "shipped", "delivered"]
-            ).aggregate(total=Sum("total_amount"))["total"]
-            or 0
+        # Get total revenue and orders from the daily rollups
+        totals = rollups_qs.aggregate(
+            total_revenue=Sum("value", filter=Q(metric_type="revenue")),
+            total_orders=Sum("value", filter=Q(metric_type="placed")),
         )
+        total_revenue = totals["total_revenue"] or 0
+        total_orders = int(totals["total_orders"] or 0)
 
-        # Get total orders
-        total_orders = orders_qs.count()
-
-        # Get active tenants
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        active_tenants = (
-            tenants_qs.filter(orders__created_at__gte=thirty_days_ago)
-            .distinct()
-            .count()
-        )
+        # Get active tenants (placed an order in the last 30 days)
+        active_tenants = active_qs.values("tenant").distinct().count()
 
         data = {
             "total_merchants": total_merchants,
@@ -221,22 +227,20 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
         order_by_str = f"{'-' if order_direction == 'desc' else ''}{order_by}"
 
         # Base queryset
-        orders_qs = Order.objects.filter(
-            status__in=["confirmed", "shipped", "delivered"]
-        )
+        rollups_qs = tenant_rollups().filter(metric_type__in=["revenue", "orders"])
 
         # Apply date filters if provided
         if start_date:
-            orders_qs = orders_qs.filter(created_at__gte=start_date)
+            rollups_qs = rollups_qs.filter(date__gte=start_date)
         if end_date:
-            orders_qs = orders_qs.filter(created_at__lte=end_date)
+            rollups_qs = rollups_qs.filter(date__lte=end_date)
 
         top_tenants = (
-            orders_qs.values("tenant__name")
+            rollups_qs.values("tenant__name")
             .annotate(
                 tenant_name=F("tenant__name"),
-                total_revenue=Sum("total_amount"),
-                total_orders=Count("id", distinct=True),
+                total_revenue=Sum("value", filter=Q(metric_type="revenue")),
+                total_orders=Sum("value", filter=Q(metric_type="orders")),
             )
             .order_by(order_by_str)
         )
@@ -357,17 +361,7 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
         api_stats = (
             api_stats_qs.values("method")
             .annotate(
-                endpoint=Case(
-                    When(
-                        endpoint="/",
-                        then=Value("/"),
-                    ),
-                    When(
-                        endpoint__endswith="/",
-                        then=Substr(F("endpoint"), 1, Length(F("endpoint")) - 1),
-                    ),
-                    default=F("endpoint"),
-                ),
+                endpoint=endpoint_group(),
             )
             .values("endpoint", "method")
             .annotate(
@@ -445,6 +439,20 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Keyset page cursor from next/previous; empty for the first page",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "count",
+                openapi.IN_QUERY,
+                description="Set to false to skip the total count",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
         ],
         responses={200: RecentActivitySerializer(many=True)},
     )
@@ -490,7 +498,9 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
 
         # Apply pagination
         paginator = self.pagination_class()
-        paginated_activities = paginator.paginate_queryset(activities, request)
+        paginated_activities = paginator.paginate_queryset(
+            activities, request, view=self
+        )
         serializer = RecentActivitySerializer(paginated_activities, many=True)
         return paginator.get_paginated_response(serializer.data)
 
@@ -519,14 +529,15 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
 
         # Query revenue per month
         monthly_revenue = (
-            Order.objects.filter(
-                created_at__gte=months[0],
-                created_at__lt=months[-1] + relativedelta(months=1),
-                status__in=["confirmed", "shipped", "delivered"],
+            tenant_rollups()
+            .filter(
+                metric_type="revenue",
+                date__gte=months[0].date(),
+                date__lt=(months[-1] + relativedelta(months=1)).date(),
             )
-            .annotate(month=TruncMonth("created_at"))
+            .annotate(month=TruncMonth("date"))
             .values("month")
-            .annotate(revenue=Sum("total_amount"))
+            .annotate(revenue=Sum("value"))
         )
 
         # Normalize month keys to (year, month) tuple for matching
@@ -593,15 +604,16 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
         )  # Last 30 days for better distribution
 
         weekday_transactions = (
-            Order.objects.filter(
-                created_at__range=[start_date, end_date],
-                status__in=["confirmed", "shipped", "delivered"],
+            tenant_rollups()
+            .filter(
+                date__range=[start_date.date(), end_date.date()],
+                metric_type__in=["orders", "revenue"],
             )
-            .annotate(weekday=ExtractWeekDay("created_at"))
+            .annotate(weekday=ExtractWeekDay("date"))
             .values("weekday")
             .annotate(
-                count=Count("id"),
-                revenue=Sum("total_amount"),
+                count=Sum("value", filter=Q(metric_type="orders")),
+                revenue=Sum("value", filter=Q(metric_type="revenue")),
             )
             .order_by("weekday")
         )
@@ -620,7 +632,7 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
         # Build a map from weekday number to (count, revenue)
         weekday_map = {
             item["weekday"]: {
-                "count": item["count"],
+                "count": int(item["count"] or 0),
                 "revenue": float(item["revenue"] or 0),
             }
             for item in weekday_transactions
@@ -652,25 +664,19 @@ class AdminAnalyticsViewSet(viewsets.ViewSet):
             endpoint__isnull=False,
         ).exclude(endpoint="")
 
-        # Define main endpoint categories
-        endpoint_categories = {
-            "products": ["/api/products", "/products"],
-            "tenants": ["/api/tenants", "/tenants"],
-            "analytics": ["/api/analytics", "/analytics"],
-            "orders": ["/api/orders", "/orders"],
-            "users": ["/api/users", "/users"],
-            "auth": ["/api/auth", "/auth"],
-        }
-
-        # Initialize category counts
-        category_stats = {category: 0 for category in endpoint_categories.keys()}
-
-        # Count requests for each category
-        for log in logs:
-            for category, patterns in endpoint_categories.items():
-                if any(log.endpoint.startswith(pattern) for pattern in patterns):
-                    category_stats[category] += 1
-                    break
+        # Count requests per category in one grouped query
+        endpoint_categories = get_endpoint_categories()
+        category_stats = {category: 0 for category in endpoint_categories}
+        category_counts = (
+            logs.alias(route_group=endpoint_group())
+            .annotate(category=endpoint_category(endpoint_categories))
+            .filter(category__isnull=False)
+            .values("category")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        for row in category_counts:
+            category_stats[row["category"]] = row["count"]
 
         data = {
             "labels": list(category_stats.keys()),
@@ -697,9 +703,9 @@ class AnalyticsViewSet(viewsets.ViewSet):
 
         # Get total revenue
         total_revenue = (
-            Analytics.objects.filter(metric_type="revenue").aggregate(
-                total=Sum("value")
-            )["total"]
+            tenant_rollups()
+            .filter(metric_type="revenue")
+            .aggregate(total=Sum("value"))["total"]
             or 0
         )
 
@@ -714,7 +720,8 @@ class AnalyticsViewSet(viewsets.ViewSet):
 
         # Get top tenants by revenue
         top_tenants = (
-            Analytics.objects.filter(metric_type="revenue")
+            tenant_rollups()
+            .filter(metric_type="revenue")
             .values("tenant__name")
             .annotate(total_revenue=Sum("value"))
             .order_by("-total_revenue")[:5]
@@ -859,11 +866,12 @@ class AnalyticsViewSet(viewsets.ViewSet):
     def top_performing_tenants(self, request):
         # Get top performing tenants based on revenue
         top_tenants = (
-            Analytics.objects.filter(metric_type="revenue")
+            tenant_rollups()
+            .filter(metric_type__in=["revenue", "orders"])
             .values("tenant__name")
             .annotate(
-                total_revenue=Sum("value"),
-                total_orders=Count("id", filter=Q(metric_type="orders")),
+                total_revenue=Sum("value", filter=Q(metric_type="revenue")),
+                total_orders=Sum("value", filter=Q(metric_type="orders")),
             )
             .order_by("-total_revenue")
         )
@@ -877,6 +885,8 @@ class AnalyticsViewSet(viewsets.ViewSet):
 class TenantAnalyticsViewSet(viewsets.ViewSet):
     permission_classes = [IsTenantMember]
     pagination_class = CustomPagination
+    # Keyset order for feeds that accept ?cursor=
+    keyset_fields = ("-timestamp", "-id")
 
     def get_tenant(self, request):
         return request.user.tenant
@@ -1086,6 +1096,11 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
         if order_direction not in ["asc", "desc"]:
             order_direction = "asc"
 
+        # The period column is named after the interval
+        period = {"daily": "date", "weekly": "week"}.get(interval, "month")
+        if order_by == "date":
+            order_by = period
+
         # Build order_by string
         order_by_str = f"{'-' if order_direction == 'desc' else ''}{order_by}"
 
@@ -1101,34 +1116,23 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
                 start_date = end_date - timedelta(days=365)
 
         # Base queryset
-        orders = Order.objects.filter(
+        rollups = tenant_rollups().filter(
             tenant=tenant,
-            status__in=["confirmed", "shipped", "delivered"],
-            created_at__range=[start_date, end_date],
+            metric_type__in=["revenue", "orders"],
+            date__range=[start_date, end_date],
         )
 
         # Group by interval
         if interval == "daily":
-            orders = (
-                orders.annotate(date=TruncDate("created_at"))
-                .values("date")
-                .annotate(total_sales=Sum("total_amount"), order_count=Count("id"))
-                .order_by(order_by_str)
-            )
+            rollups = rollups.values("date")
         elif interval == "weekly":
-            orders = (
-                orders.annotate(week=TruncWeek("created_at"))
-                .values("week")
-                .annotate(total_sales=Sum("total_amount"), order_count=Count("id"))
-                .order_by(order_by_str)
-            )
+            rollups = rollups.annotate(week=TruncWeek("date")).values("week")
         else:  # monthly
-            orders = (
-                orders.annotate(month=TruncMonth("created_at"))
-                .values("month")
-                .annotate(total_sales=Sum("total_amount"), order_count=Count("id"))
-                .order_by(order_by_str)
-            )
+            rollups = rollups.annotate(month=TruncMonth("date")).values("month")
+        orders = rollups.annotate(
+            total_sales=Sum("value", filter=Q(metric_type="revenue")),
+            order_count=Sum("value", filter=Q(metric_type="orders")),
+        ).order_by(order_by_str)
 
         # Apply pagination
         paginator = self.pagination_class()
@@ -1277,6 +1281,20 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Keyset page cursor from next/previous; empty for the first page",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "count",
+                openapi.IN_QUERY,
+                description="Set to false to skip the total count",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
         ],
         responses={200: RecentActivitySerializer(many=True)},
     )
@@ -1299,7 +1317,9 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
 
         # Apply pagination
         paginator = self.pagination_class()
-        paginated_activities = paginator.paginate_queryset(activities, request)
+        paginated_activities = paginator.paginate_queryset(
+            activities, request, view=self
+        )
         serializer = RecentActivitySerializer(paginated_activities, many=True)
         return paginator.get_paginated_response(serializer.data)
 
@@ -1384,14 +1404,15 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
 
         # Get monthly revenue data
         monthly_revenue = (
-            Order.objects.filter(
+            tenant_rollups()
+            .filter(
                 tenant=tenant,
-                status__in=["confirmed", "shipped", "delivered"],
-                created_at__date__range=[start_date, end_date],
+                metric_type="revenue",
+                date__range=[start_date, end_date],
             )
-            .annotate(month=TruncMonth("created_at"))
+            .annotate(month=TruncMonth("date"))
             .values("month")
-            .annotate(revenue=Sum("total_amount"))
+            .annotate(revenue=Sum("value"))
             .order_by("month")
         )
 
@@ -1518,6 +1539,13 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "interval",
+                openapi.IN_QUERY,
+                description="Also break down by signup period (daily, weekly, monthly)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
         ],
         responses={200: DemographicAnalyticsSerializer()},
     )
@@ -1539,58 +1567,31 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
         if end_date:
             users = users.filter(created_at__lte=end_date)
 
-        # Calculate total users
-        total_users = users.count()
-
-        # Define age groups
-        age_groups = [
-            (18, 24),
-            (25, 34),
-            (35, 44),
-            (45, 54),
-            (55, None),  # 55 and above
-        ]
-
-        # Calculate gender-age distribution
-        gender_age_distribution = {}
-
-        # First, handle users with complete demographic data
-        for gender in ["male", "female"]:
-            for age_min, age_max in age_groups:
-                # Build the query for this gender-age group
-                query = Q(gender=gender)
-                if age_max:
-                    query &= Q(age__gte=age_min, age__lte=age_max)
-                else:
-                    query &= Q(age__gte=age_min)
-
-                # Count users in this group
-                count = users.filter(query).count()
-
-                # Calculate percentage
-                percentage = (count / total_users * 100) if total_users > 0 else 0
-
-                # Create the key for this group
-                age_key = f"{age_min}_{age_max}" if age_max else f"{age_min}_plus"
-                key = f"{gender}_{age_key}"
-
-                gender_age_distribution[key] = round(percentage, 1)
-
-        # Handle users with missing demographic data
-        users_with_missing_data = users.filter(
-            Q(gender__isnull=True) | Q(gender="") | Q(age__isnull=True)
-        ).count()
-
-        # Calculate percentage for users with missing data
-        others_percentage = (
-            (users_with_missing_data / total_users * 100) if total_users > 0 else 0
-        )
-        gender_age_distribution["others"] = round(others_percentage, 1)
+        # Gender x age-group histogram (and per-period breakdown) in one query
+        interval = request.query_params.get("interval")
+        if interval not in PERIOD_FUNCTIONS:
+            interval = None
+        age_groups = get_age_groups()
+        counts, periods = demographic_histogram(users, age_groups, interval)
 
+        total_users, distribution = gender_age_distribution(counts, age_groups)
         data = {
             "total_users": total_users,
-            "gender_age_distribution": gender_age_distribution,
+            "gender_age_distribution": distribution,
         }
+        if interval:
+            data["breakdown"] = []
+            for period in sorted(periods):
+                period_total, period_distribution = gender_age_distribution(
+                    periods[period], age_groups
+                )
+                data["breakdown"].append(
+                    {
+                        "period": period,
+                        "total_users": period_total,
+                        "gender_age_distribution": period_distribution,
+                    }
+                )
 
         serializer = DemographicAnalyticsSerializer(data)
         return Response(serializer.data)
@@ -1599,6 +1600,8 @@ class TenantAnalyticsViewSet(viewsets.ViewSet):
 class APIUsageLogViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
     pagination_class = CustomPagination
+    # Keyset order for feeds that accept ?cursor=
+    keyset_fields = ("-timestamp", "-id")
 
     @swagger_auto_schema(
         operation_description="Get detailed API usage logs",
@@ -1666,6 +1669,20 @@ class APIUsageLogViewSet(viewsets.ViewSet):
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Keyset page cursor from next/previous; empty for the first page",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "count",
+                openapi.IN_QUERY,
+                description="Set to false to skip the total count",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
         ],
         responses={200: APIUsageLogSerializer(many=True)},
     )
@@ -1705,10 +1722,121 @@ class APIUsageLogViewSet(viewsets.ViewSet):
 
         # Apply pagination
         paginator = self.pagination_class()
-        paginated_logs = paginator.paginate_queryset(logs, request)
+        paginated_logs = paginator.paginate_queryset(
+            logs, request, view=self
+        )
         serializer = APIUsageLogSerializer(paginated_logs, many=True)
         return paginator.get_paginated_response(serializer.data)
 
+    @swagger_auto_schema(
+        operation_description="Get API usage log writer queue statistics",
+        responses={200: "Log writer queue depth and write/drop counters"},
+    )
+    @action(detail=False, methods=["get"])
+    def writer_stats(self, request):
+        """Get queue depth and counters of the batched API usage log writer."""
+        stats = get_log_writer().stats()
+        stats["latency"] = get_latency_recorder().stats()
+        return Response(stats)
+
+    @swagger_auto_schema(
+        operation_description="Get latency percentiles from the per-minute histograms",
+        manual_parameters=[
+            openapi.Parameter(
+                "start_date",
+                openapi.IN_QUERY,
+                description="Window start (YYYY-MM-DD or ISO datetime, default 24 hours ago)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "end_date",
+                openapi.IN_QUERY,
+                description="Window end (YYYY-MM-DD or ISO datetime, default now)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "endpoint",
+                openapi.IN_QUERY,
+                description="API endpoint path",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "method",
+                openapi.IN_QUERY,
+                description="HTTP method (GET, POST, PUT, DELETE)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "tenant",
+                openapi.IN_QUERY,
+                description="Tenant ID",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "group_by",
+                openapi.IN_QUERY,
+                description="Group results by endpoint (default), tenant or none",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+        ],
+        responses={200: "count, avg, p50, p90, p99 and max latency in milliseconds"},
+    )
+    @action(detail=False, methods=["get"])
+    def latency_percentiles(self, request):
+        """Merge per-minute latency histograms into percentiles over a window."""
+        start_date = request.query_params.get("start_date")
+        end_date = request.query_params.get("end_date")
+        endpoint = request.query_params.get("endpoint")
+        method = request.query_params.get("method")
+        tenant_id = request.query_params.get("tenant")
+        group_by = request.query_params.get("group_by", "endpoint")
+
+        group_fields = {
+            "endpoint": ["endpoint", "method"],
+            "tenant": ["tenant_id"],
+            "none": [],
+        }.get(group_by, ["endpoint", "method"])
+
+        if not end_date:
+            end_date = timezone.now()
+        if not start_date:
+            start_date = timezone.now() - timedelta(hours=24)
+
+        histograms = APILatencyHistogram.objects.filter(
+            minute__gte=start_date, minute__lte=end_date
+        )
+        if endpoint:
+            histograms = histograms.filter(endpoint=normalize_endpoint(endpoint))
+        if method:
+            histograms = histograms.filter(method=method.upper())
+        if tenant_id:
+            histograms = histograms.filter(tenant_id=tenant_id)
+
+        rows = histograms.only(
+            "endpoint",
+            "method",
+            "tenant_id",
+            "count",
+            "total_time",
+            "max_time",
+            "buckets",
+        ).order_by()
+        results = merge_histograms(rows.iterator(), group_fields)
+        results.sort(key=lambda result: result["count"], reverse=True)
+        return Response(
+            {
+                "start_date": start_date,
+                "end_date": end_date,
+                "results": results,
+            }
+        )
+
     @swagger_auto_schema(
         operation_description="Get API usage statistics by endpoint",
         manual_parameters=[
@@ -1826,17 +1954,7 @@ class APIUsageLogViewSet(viewsets.ViewSet):
         stats = (
             logs.values("method")
             .annotate(
-                endpoint=Case(
-                    When(
-                        endpoint="/",
-                        then=Value("/"),
-                    ),
-                    When(
-                        endpoint__endswith="/",
-                        then=Substr(F("endpoint"), 1, Length(F("endpoint")) - 1),
-                    ),
-                    default=F("endpoint"),
-                ),
+                endpoint=endpoint_group(),
                 period=F("period"),
             )
             .values("endpoint", "method", "period")
@@ -1958,7 +2076,7 @@ class APIUsageLogViewSet(viewsets.ViewSet):
                 error_rate=Count("status_code", filter=Q(status_code__gte=400))
                 * 100.0
                 / Count("id"),
-                unique_endpoints=Count("endpoint", distinct=True),
+                unique_endpoints=Count(endpoint_group(), distinct=True),
             )
             .order_by(order_by_str)
         )
@@ -2068,7 +2186,7 @@ class APIUsageLogViewSet(viewsets.ViewSet):
                 error_rate=Count("status_code", filter=Q(status_code__gte=400))
                 * 100.0
                 / Count("id"),
-                unique_endpoints=Count("endpoint", distinct=True),
+                unique_endpoints=Count(endpoint_group(), distinct=True),
             )
             .order_by(order_by_str)
         )
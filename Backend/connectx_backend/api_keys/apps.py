@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ApiKeysConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "api_keys"
+    verbose_name = "API Keys"
+
+    def ready(self):
+        import api_keys.signals  # noqa
@@ -1,7 +1,6 @@
 from rest_framework import authentication
 from rest_framework import exceptions
-from django.utils import timezone
-from .models import ApiKey
+from .resolver import get_api_key_resolver
 from django.contrib.auth.models import AnonymousUser
 
 
@@ -12,11 +11,11 @@ class ApiKeyAuthentication(authentication.BaseAuthentication):
             request._request.tenant = None
             return None
 
-        try:
-            api_key_obj = ApiKey.objects.select_related("tenant").get(
-                key=api_key, is_active=True, revoked_at__isnull=True
-            )
-        except ApiKey.DoesNotExist:
+        # Reuse the middleware's lookup when it resolved the same key.
+        api_key_obj = getattr(request._request, "api_key", None)
+        if api_key_obj is None or api_key_obj.key != api_key:
+            api_key_obj = get_api_key_resolver().resolve(api_key)
+        if api_key_obj is None:
             raise exceptions.AuthenticationFailed("Invalid or inactive API key")
 
         # Only set tenant if not already set
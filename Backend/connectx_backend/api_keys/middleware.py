@@ -1,15 +1,10 @@
 from django.utils.deprecation import MiddlewareMixin
-from .models import ApiKey
+from .resolver import get_api_key_resolver
 
 
 class APIKeyTenantMiddleware(MiddlewareMixin):
     def process_request(self, request):
         api_key = request.headers.get('X-API-KEY') or request.GET.get('api_key')
-        if api_key:
-            try:
-                key = ApiKey.objects.select_related('tenant').get(key=api_key, is_active=True)
-                request.tenant = key.tenant
-            except ApiKey.DoesNotExist:
-                request.tenant = None
-        else:
-            request.tenant = None
+        key = get_api_key_resolver().resolve(api_key) if api_key else None
+        request.api_key = key
+        request.tenant = key.tenant if key is not None else None
@@ -0,0 +1,173 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import ApiKey
+
+
+DEFAULT_API_KEY_CACHE_CONFIG = {
+    "TTL": 60,
+    "MAX_ENTRIES": 1024,
+    "USE_SHARED_CACHE": False,
+    "SHARED_CACHE_ALIAS": "default",
+}
+
+
+def get_api_key_cache_config():
+    """Return the API key cache config merged over the defaults."""
+    config = dict(DEFAULT_API_KEY_CACHE_CONFIG)
+    config.update(getattr(settings, "API_KEY_CACHE", {}))
+    return config
+
+
+class ApiKeyResolver:
+    """
+    Resolve an API key string to its active ApiKey (with tenant loaded).
+
+    Lookups go through a process-local LRU cache with a TTL and, if enabled,
+    a shared Django cache tier before falling back to the database. Only
+    valid keys are cached. Signal handlers and ApiKeyViewSet.revoke call
+    ``invalidate``/``invalidate_tenant``; other processes' local entries
+    expire after ``ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        ttl=60,
+        max_entries=1024,
+        use_shared_cache=False,
+        shared_cache_alias="default",
+    ):
+        self.ttl = float(ttl)
+        self.max_entries = max(1, int(max_entries))
+        self.use_shared_cache = use_shared_cache
+        self.shared_cache_alias = shared_cache_alias
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        config = get_api_key_cache_config()
+        return cls(
+            ttl=config["TTL"],
+            max_entries=config["MAX_ENTRIES"],
+            use_shared_cache=config["USE_SHARED_CACHE"],
+            shared_cache_alias=config["SHARED_CACHE_ALIAS"],
+        )
+
+    def resolve(self, key):
+        """Return the active, unrevoked ApiKey for ``key``, or None."""
+        if not key:
+            return None
+
+        api_key = self._get_local(key)
+        if api_key is not None:
+            self.hits += 1
+            return api_key
+
+        if self.use_shared_cache:
+            api_key = self._shared_cache.get(self._shared_cache_key(key))
+            if api_key is not None:
+                self.hits += 1
+                self._set_local(key, api_key)
+                return api_key
+
+        self.misses += 1
+        try:
+            api_key = ApiKey.objects.select_related("tenant").get(
+                key=key, is_active=True, revoked_at__isnull=True
+            )
+        except ApiKey.DoesNotExist:
+            return None
+
+        self._set_local(key, api_key)
+        if self.use_shared_cache:
+            self._shared_cache.set(self._shared_cache_key(key), api_key, self.ttl)
+        return api_key
+
+    def invalidate(self, key):
+        """Drop a single key from every cache tier."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.use_shared_cache:
+            self._shared_cache.delete(self._shared_cache_key(key))
+
+    def invalidate_tenant(self, tenant_id):
+        """Drop every cached key that belongs to ``tenant_id``."""
+        with self._lock:
+            stale = [
+                key
+                for key, (api_key, _) in self._entries.items()
+                if api_key.tenant_id == tenant_id
+            ]
+            for key in stale:
+                del self._entries[key]
+        if self.use_shared_cache:
+            keys = ApiKey.objects.filter(tenant_id=tenant_id).values_list(
+                "key", flat=True
+            )
+            self._shared_cache.delete_many(
+                [self._shared_cache_key(key) for key in keys]
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    @property
+    def _shared_cache(self):
+        return caches[self.shared_cache_alias]
+
+    def _shared_cache_key(self, key):
+        # Keep raw key material out of the shared cache's key space.
+        return "api_key:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            api_key, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return api_key
+
+    def _set_local(self, key, api_key):
+        with self._lock:
+            self._entries[key] = (api_key, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_api_key_resolver():
+    """Return the process-wide API key resolver."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = ApiKeyResolver.from_settings()
+    return _resolver
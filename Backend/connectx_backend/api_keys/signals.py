@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from tenants.models import Tenant
+from .models import ApiKey
+from .resolver import get_api_key_resolver
+
+
+@receiver(post_save, sender=ApiKey)
+@receiver(post_delete, sender=ApiKey)
+def invalidate_api_key(sender, instance, **kwargs):
+    get_api_key_resolver().invalidate(instance.key)
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_api_keys(sender, instance, **kwargs):
+    # Cached keys carry a copy of the tenant row.
+    get_api_key_resolver().invalidate_tenant(instance.pk)
@@ -0,0 +1,63 @@
+from django.test import TestCase, RequestFactory
+from rest_framework.request import Request
+from rest_framework.exceptions import AuthenticationFailed
+from tenants.models import Tenant
+from api_keys.models import ApiKey
+from api_keys.authentication import ApiKeyAuthentication
+from api_keys.middleware import APIKeyTenantMiddleware
+from api_keys.resolver import get_api_key_resolver
+
+
+class ApiKeyResolverTestCase(TestCase):
+    def setUp(self):
+        self.resolver = get_api_key_resolver()
+        self.resolver.clear()
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.api_key = ApiKey.objects.create(tenant=self.tenant, name="Storefront")
+        self.factory = RequestFactory()
+        self.middleware = APIKeyTenantMiddleware(lambda request: None)
+
+    def test_resolves_from_cache_after_first_lookup(self):
+        with self.assertNumQueries(1):
+            self.resolver.resolve(self.api_key.key)
+        with self.assertNumQueries(0):
+            resolved = self.resolver.resolve(self.api_key.key)
+        self.assertEqual(resolved.tenant, self.tenant)
+
+    def test_middleware_and_authentication_share_one_lookup(self):
+        self.resolver.resolve(self.api_key.key)
+        request = self.factory.get("/api/products/", HTTP_X_API_KEY=self.api_key.key)
+
+        with self.assertNumQueries(0):
+            self.middleware.process_request(request)
+            user, auth = ApiKeyAuthentication().authenticate(Request(request))
+
+        self.assertEqual(request.tenant, self.tenant)
+        self.assertEqual(auth.pk, self.api_key.pk)
+
+    def test_revoked_key_is_rejected_by_middleware_and_authentication(self):
+        self.resolver.resolve(self.api_key.key)
+        self.api_key.is_active = False
+        self.api_key.save()
+
+        request = self.factory.get("/api/products/", HTTP_X_API_KEY=self.api_key.key)
+        self.middleware.process_request(request)
+        self.assertIsNone(request.tenant)
+        with self.assertRaises(AuthenticationFailed):
+            ApiKeyAuthentication().authenticate(Request(request))
+
+    def test_deleted_key_is_invalidated(self):
+        key = self.api_key.key
+        self.resolver.resolve(key)
+        self.api_key.delete()
+        self.assertIsNone(self.resolver.resolve(key))
+
+    def test_tenant_update_refreshes_cached_tenant(self):
+        self.resolver.resolve(self.api_key.key)
+        self.tenant.name = "Renamed"
+        self.tenant.save()
+
+        resolved = self.resolver.resolve(self.api_key.key)
+        self.assertEqual(resolved.tenant.name, "Renamed")
@@ -6,6 +6,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from users.permissions import IsTenantMember
+from .resolver import get_api_key_resolver
 
 class ApiKeyViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete']  
@@ -48,6 +49,7 @@ class ApiKeyViewSet(viewsets.ModelViewSet):
         api_key.is_active = False
         api_key.revoked_at = timezone.now()
         api_key.save()
+        get_api_key_resolver().invalidate(api_key.key)
 
         return Response(
             {"detail": "API key revoked successfully."}
@@ -108,6 +108,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "analytics.middleware.APIUsageLoggingMiddleware",
+    "analytics.outbox.OutboxMiddleware",
 ]
 
 ROOT_URLCONF = "connectx.urls"
@@ -258,6 +259,152 @@ LOGGING = {
     },
 }
 
+# Order numbers reserved per counter update (orders.numbering). Values above
+# 1 let each worker hand out numbers from memory at the cost of gaps.
+ORDER_NUMBER_BLOCK_SIZE = int(os.environ.get("ORDER_NUMBER_BLOCK_SIZE", 1))
+
+# Minutes stock stays reserved for an unpaid order (orders.inventory). Run
+# the release_expired_reservations command periodically to return it.
+INVENTORY_RESERVATION_TTL_MINUTES = int(
+    os.environ.get("INVENTORY_RESERVATION_TTL_MINUTES", 30)
+)
+
+# Customer age groups for demographic analytics (analytics.demographics):
+# (min, max) pairs, with max None for an open-ended last group.
+DEMOGRAPHIC_AGE_GROUPS = [(18, 24), (25, 34), (35, 44), (45, 54), (55, None)]
+
+# Storefront (API key) product response cache (products.cache). Entries are
+# invalidated per tenant by model signals and expire after TTL seconds; set
+# CACHE_ALIAS to a shared cache (e.g. Redis) when running several workers.
+STOREFRONT_CACHE = {
+    "ENABLED": os.environ.get("STOREFRONT_CACHE_ENABLED", "True") == "True",
+    "TTL": int(os.environ.get("STOREFRONT_CACHE_TTL", 300)),
+    "CACHE_ALIAS": os.environ.get("STOREFRONT_CACHE_ALIAS", "default"),
+}
+
+# Product search backend (products.search): PostgreSQL full-text search in
+# production, an in-process inverted index for SQLite.
+PRODUCT_SEARCH = {
+    "BACKEND": os.environ.get(
+        "PRODUCT_SEARCH_BACKEND", "products.search.PostgresSearchBackend"
+    ),
+    "CONFIG": os.environ.get("PRODUCT_SEARCH_CONFIG", "english"),
+}
+
+# Categories for the admin API endpoints graph: label -> endpoint prefixes,
+# matched in order against the logged route (or path).
+API_ENDPOINT_CATEGORIES = {
+    "products": ["/api/products", "/products"],
+    "tenants": ["/api/tenants", "/tenants"],
+    "analytics": ["/api/analytics", "/analytics"],
+    "orders": ["/api/orders", "/orders"],
+    "users": ["/api/users", "/users"],
+    "auth": ["/api/auth", "/auth"],
+}
+
+# API key -> tenant resolution cache (api_keys.resolver)
+# Process-local TTL/LRU cache; set USE_SHARED_CACHE to add the Django cache
+# named by SHARED_CACHE_ALIAS as a second tier shared between workers.
+API_KEY_CACHE = {
+    "TTL": int(os.environ.get("API_KEY_CACHE_TTL", 60)),
+    "MAX_ENTRIES": int(os.environ.get("API_KEY_CACHE_MAX_ENTRIES", 1024)),
+    "USE_SHARED_CACHE": os.environ.get("API_KEY_SHARED_CACHE", "False") == "True",
+    "SHARED_CACHE_ALIAS": "default",
+}
+
+# API usage logging (analytics.middleware.APIUsageLoggingMiddleware)
+# Log entries are queued in-process and bulk inserted by a background writer,
+# which also flushes the per-minute latency histograms (analytics.latency).
+API_USAGE_LOGGING = {
+    "ASYNC": os.environ.get("API_USAGE_LOG_ASYNC", "True") == "True",
+    "BATCH_SIZE": int(os.environ.get("API_USAGE_LOG_BATCH_SIZE", 200)),
+    "FLUSH_INTERVAL": float(os.environ.get("API_USAGE_LOG_FLUSH_INTERVAL", 2.0)),
+    "MAX_QUEUE_SIZE": int(os.environ.get("API_USAGE_LOG_MAX_QUEUE_SIZE", 10000)),
+    # "drop" discards entries once the queue is full; "sample" additionally
+    # keeps only OVERFLOW_SAMPLE_RATE of entries above the high-water mark.
+    "OVERFLOW_POLICY": os.environ.get("API_USAGE_LOG_OVERFLOW_POLICY", "drop"),
+    "OVERFLOW_HIGH_WATER": 0.8,
+    "OVERFLOW_SAMPLE_RATE": float(
+        os.environ.get("API_USAGE_LOG_OVERFLOW_SAMPLE_RATE", 0.1)
+    ),
+    # Values under keys containing any of these words are masked
+    "SENSITIVE_KEYS": [
+        "password",
+        "token",
+        "api_key",
+        "secret",
+        "authorization",
+        "credit_card",
+        "cvv",
+        "ssn",
+        "social_security",
+    ],
+    # Request/response body capture (analytics.payloads): MODE is "full",
+    # "sample" (SAMPLE_RATE of requests) or "metadata" (no bodies). Bodies
+    # over MAX_BYTES of JSON are stored as a truncated preview.
+    "BODY_POLICY": {
+        "MODE": os.environ.get("API_USAGE_LOG_BODY_MODE", "full"),
+        "SAMPLE_RATE": float(os.environ.get("API_USAGE_LOG_BODY_SAMPLE_RATE", 1.0)),
+        "MAX_BYTES": int(os.environ.get("API_USAGE_LOG_BODY_MAX_BYTES", 8192)),
+        "ALWAYS_ON_ERROR": True,
+    },
+    # Overrides keyed by route template or URL name; high-volume list
+    # endpoints only need metadata.
+    "ROUTE_BODY_POLICIES": {
+        "product-list": {"MODE": "metadata"},
+        "order-list": {"MODE": "metadata"},
+    },
+}
+
+# Analytics side effects of model saves (activity logs, order rollups) are
+# recorded as outbox events (analytics.outbox) and handled on the API usage
+# log writer's flush cycle; run the process_outbox command as well (or
+# instead, with DRAIN_IN_LOG_WRITER off) to drain them from a worker.
+ANALYTICS_OUTBOX = {
+    "INLINE": os.environ.get("ANALYTICS_OUTBOX_INLINE", "False") == "True",
+    "BATCH_SIZE": int(os.environ.get("ANALYTICS_OUTBOX_BATCH_SIZE", 500)),
+    "MAX_ATTEMPTS": int(os.environ.get("ANALYTICS_OUTBOX_MAX_ATTEMPTS", 5)),
+    "DRAIN_IN_LOG_WRITER": os.environ.get("ANALYTICS_OUTBOX_IN_LOG_WRITER", "True")
+    == "True",
+}
+
+# Chapa webhooks are stored on receipt and applied to their payments by the
+# webhook queue (payments.webhooks) on the API usage log writer's flush cycle;
+# run the process_webhooks command as well (or instead, with
+# DRAIN_IN_LOG_WRITER off) to apply them from a worker.
+CHAPA_WEBHOOKS = {
+    "INLINE": os.environ.get("CHAPA_WEBHOOKS_INLINE", "False") == "True",
+    "BATCH_SIZE": int(os.environ.get("CHAPA_WEBHOOKS_BATCH_SIZE", 200)),
+    "MAX_ATTEMPTS": int(os.environ.get("CHAPA_WEBHOOKS_MAX_ATTEMPTS", 5)),
+    "DRAIN_IN_LOG_WRITER": os.environ.get("CHAPA_WEBHOOKS_IN_LOG_WRITER", "True")
+    == "True",
+}
+
+# Retention per log table (analytics.retention); run the prune_logs command
+# daily. Rows older than DAYS are removed, after being rolled up into daily
+# summary tables when ROLLUP is set.
+LOG_RETENTION = {
+    "api_usage_log": {
+        "DAYS": int(os.environ.get("API_USAGE_LOG_RETENTION_DAYS", 90)),
+        "ROLLUP": True,
+    },
+    "activity_log": {
+        "DAYS": int(os.environ.get("ACTIVITY_LOG_RETENTION_DAYS", 365)),
+        "ROLLUP": True,
+    },
+    "api_latency_histogram": {
+        "DAYS": int(os.environ.get("API_LATENCY_RETENTION_DAYS", 30)),
+        "ROLLUP": False,
+    },
+}
+
+if "test" in sys.argv or "pytest" in sys.modules:
+    # Tests run inside transactions; write log entries inline.
+    API_USAGE_LOGGING["ASYNC"] = False
+    ANALYTICS_OUTBOX["INLINE"] = True
+    CHAPA_WEBHOOKS["INLINE"] = True
+    PRODUCT_SEARCH["BACKEND"] = "products.search.InMemorySearchBackend"
+
 # Chapa Payment Integration
 CHAPA_API_KEY = os.environ.get("CHAPA_API_KEY", "YOUR_TEST_API_KEY_HERE")
 CHAPA_API_URL = "https://api.chapa.co/v1/transaction/initialize"
@@ -1,6 +1,175 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'size'   # allows ?size=20
     max_page_size = 100              # optional: limit max to prevent abuse
     page_size = 10                   # fallback default
+
+    # ?cursor= switches views that set ``keyset_fields`` (e.g.
+    # ("-created_at", "-id")) to keyset pagination; an empty cursor is the
+    # first page.
+    cursor_query_param = 'cursor'
+    # ?count=false skips the COUNT(*) on page number pages; cursor pages
+    # only count with ?count=true.
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset_fields = getattr(view, 'keyset_fields', None)
+        self.use_keyset = bool(
+            self.keyset_fields and self.cursor_query_param in request.query_params
+        )
+        self.include_count = self.get_include_count(request)
+
+        if self.use_keyset:
+            return self.paginate_keyset(queryset, request)
+        if not self.include_count:
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset and self.include_count:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count if self.include_count else None),
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+    def get_include_count(self, request):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return not self.use_keyset
+        return value.lower() not in ('false', '0', 'no')
+
+    def paginate_without_count(self, queryset, request):
+        """Page numbers without COUNT(*): fetch one extra row to spot a next page."""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        url = request.build_absolute_uri()
+        self.count = None
+        self.next_link = (
+            replace_query_param(url, self.page_query_param, page_number + 1)
+            if len(results) > page_size else None
+        )
+        if page_number == 1:
+            self.previous_link = None
+        elif page_number == 2:
+            self.previous_link = remove_query_param(url, self.page_query_param)
+        else:
+            self.previous_link = replace_query_param(
+                url, self.page_query_param, page_number - 1
+            )
+        return results[:page_size]
+
+    def paginate_keyset(self, queryset, request):
+        """
+        Seek to the position in the cursor with a WHERE on ``keyset_fields``
+        instead of an OFFSET, so every page costs the same. The last field
+        must be unique (the primary key); the view's own ordering is replaced.
+        """
+        page_size = self.get_page_size(request) or self.page_size
+        position, reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        if self.include_count:
+            self.count = queryset.count()
+
+        ordering = list(self.keyset_fields)
+        if reverse:
+            ordering = [self._flip(field) for field in ordering]
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        try:
+            results = list(queryset.order_by(*ordering)[:page_size + 1])
+        except (DjangoValidationError, ValueError):
+            # Cursor values that don't parse for their field
+            raise NotFound(self.invalid_cursor_message)
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        url = request.build_absolute_uri()
+        # Walking backwards there is always a next page and a previous one
+        # only if we fetched past this page; forwards it is the other way.
+        has_next = has_more if not reverse else True
+        has_previous = position is not None and (has_more if reverse else True)
+        self.next_link = (
+            self.encode_link(url, results[-1], False)
+            if has_next and results else None
+        )
+        self.previous_link = (
+            self.encode_link(url, results[0], True)
+            if has_previous and results else None
+        )
+        return results
+
+    def encode_link(self, url, obj, reverse):
+        values = [
+            self._cursor_value(getattr(obj, field.lstrip('-')))
+            for field in self.keyset_fields
+        ]
+        payload = json.dumps({'v': values, 'r': reverse})
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, cursor):
+        """Return (field values, reverse) for ``cursor``; (None, False) if empty."""
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = payload['v']
+            if len(values) != len(self.keyset_fields):
+                raise ValueError
+            return values, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, ordering, position):
+        """Rows strictly after ``position`` in ``ordering``, as a row comparison."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _cursor_value(value):
+        # Full isoformat: DjangoJSONEncoder drops microseconds, which would
+        # make the cursor skip or repeat rows.
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (int, float, str)) or value is None:
+            return value
+        return str(value)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
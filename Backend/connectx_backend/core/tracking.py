@@ -0,0 +1,63 @@
+class TrackedFieldsMixin:
+    """
+    Remember the values of ``tracked_fields`` as they were loaded from the
+    database (or constructed, for new instances), so saves can tell what
+    changed without reading the row again. The snapshot is taken again
+    after every save and refresh_from_db.
+
+    Fields deferred at load time are not tracked until they are loaded.
+    JSON values are compared as objects: reassign them rather than mutating
+    them in place.
+    """
+
+    # Attribute names (e.g. "status", "order_id") to track
+    tracked_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracked_values = {}
+        self.mark_clean()
+
+    def get_original(self, field):
+        """The value of ``field`` as loaded, or None if it is not tracked."""
+        return self._tracked_values.get(field)
+
+    def has_changed(self, field):
+        return field in self._tracked_values and (
+            self._tracked_values[field] != getattr(self, field)
+        )
+
+    def get_dirty_fields(self):
+        """Tracked fields whose value differs from the loaded one."""
+        return [field for field in self._tracked_values if self.has_changed(field)]
+
+    def mark_clean(self, fields=None):
+        """Take the current values of ``fields`` (default all) as the originals."""
+        for field in fields or self.tracked_fields:
+            # Deferred fields are not in __dict__; reading them would query
+            if field in self.tracked_fields and field in self.__dict__:
+                self._tracked_values[field] = self.__dict__[field]
+
+    def load_originals(self):
+        """
+        Read the stored values of tracked fields that were deferred at load
+        and have been assigned since, so their changes can be told.
+        """
+        fields = [
+            field
+            for field in self.tracked_fields
+            if field not in self._tracked_values and field in self.__dict__
+        ]
+        if fields and not self._state.adding:
+            self._tracked_values.update(
+                type(self)._base_manager.filter(pk=self.pk).values(*fields).get()
+            )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        self.mark_clean(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self.mark_clean(fields)
@@ -0,0 +1,224 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from products.models import Product
+from .models import StockReservation
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(
+            f"Insufficient stock for product {product_id} (requested {requested})"
+        )
+
+
+def _take_stock(product_id, quantity):
+    """Decrement stock only if enough is left; returns False otherwise."""
+    return bool(
+        Product.objects.filter(pk=product_id, quantity__gte=quantity).update(
+            quantity=F("quantity") - quantity
+        )
+    )
+
+
+def _return_stock(product_id, quantity):
+    Product.objects.filter(pk=product_id).update(quantity=F("quantity") + quantity)
+
+
+def reserve_order_stock(order, items):
+    """
+    Hold stock for every item of an unpaid order.
+
+    All products are decremented by a single conditional UPDATE that only
+    matches rows with enough stock left. If fewer rows match than products
+    ordered, the savepoint rolls the decrement back and InsufficientStock is
+    raised; callers run this inside the order's transaction so the whole
+    checkout rolls back with it.
+    """
+    quantities = defaultdict(int)
+    for item in items:
+        quantities[item.product_id] += item.quantity
+    return _hold_stock(order, quantities)
+
+
+def _hold_stock(order, quantities):
+    """Reserve ``quantities`` ({product_id: quantity}) for ``order``."""
+    if not quantities:
+        return []
+
+    requested = Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+    expires_at = timezone.now() + timedelta(
+        minutes=getattr(settings, "INVENTORY_RESERVATION_TTL_MINUTES", 30)
+    )
+    try:
+        with transaction.atomic():
+            updated = Product.objects.filter(
+                pk__in=quantities, quantity__gte=requested
+            ).update(quantity=F("quantity") - requested)
+            if updated != len(quantities):
+                raise InsufficientStock(None, None)
+            return StockReservation.objects.bulk_create(
+                [
+                    StockReservation(
+                        order=order,
+                        product_id=product_id,
+                        quantity=quantity,
+                        expires_at=expires_at,
+                    )
+                    for product_id, quantity in quantities.items()
+                ]
+            )
+    except InsufficientStock:
+        # Name the first product that is short now that the update is undone
+        available = dict(
+            Product.objects.filter(pk__in=quantities).values_list("pk", "quantity")
+        )
+        for product_id, quantity in quantities.items():
+            if available.get(product_id, 0) < quantity:
+                raise InsufficientStock(product_id, quantity)
+        raise
+
+
+def adjust_order_stock(order, quantities):
+    """
+    Change the stock an unpaid order holds to ``quantities`` ({product_id:
+    quantity}) after its items are edited.
+
+    A product's held reservation is resized in place: extra stock is taken
+    with a conditional UPDATE that only matches if enough is left, surplus
+    is returned, and no reservation is replaced (so a later payment cannot
+    count an old one again). Products without exactly one held reservation
+    (new items, expired holds) have any others cancelled and are held
+    afresh. Raises InsufficientStock, undoing the savepoint, if a product
+    is short.
+    """
+    with transaction.atomic():
+        held = defaultdict(list)
+        reservations = order.stock_reservations.select_for_update().filter(
+            status="held", product_id__in=quantities
+        )
+        for reservation in reservations:
+            held[reservation.product_id].append(reservation)
+
+        now = timezone.now()
+        fresh = {}
+        for product_id, quantity in quantities.items():
+            if len(held[product_id]) != 1:
+                release_order_stock(order, product_ids=[product_id])
+                if quantity:
+                    fresh[product_id] = quantity
+                continue
+            reservation = held[product_id][0]
+            delta = quantity - reservation.quantity
+            if delta > 0 and not _take_stock(product_id, delta):
+                raise InsufficientStock(product_id, quantity)
+            if delta < 0:
+                _return_stock(product_id, -delta)
+            reservation_row = StockReservation.objects.filter(pk=reservation.pk)
+            if quantity:
+                reservation_row.update(quantity=quantity, updated_at=now)
+            else:
+                reservation_row.update(status="cancelled", updated_at=now)
+        _hold_stock(order, fresh)
+
+
+def commit_order_stock(order):
+    """
+    Turn an order's reservations into a sale once it is paid.
+
+    Safe to call more than once (e.g. repeated webhooks): each reservation
+    is claimed with a conditional status UPDATE, and only the caller that
+    claims it counts the sale. Released reservations (expired, or after a
+    failed payment) take their stock again if it is still available;
+    cancelled ones are left alone.
+    """
+    if not order.stock_reservations.exists():
+        # Orders placed before reservations existed only count the sale
+        for item in order.items.all():
+            Product.objects.filter(pk=item.product_id).update(
+                total_sold=F("total_sold") + item.quantity
+            )
+        return
+
+    reservations = list(
+        order.stock_reservations.filter(status__in=["held", "released"])
+    )
+    for reservation in reservations:
+        with transaction.atomic():
+            claimed = StockReservation.objects.filter(
+                pk=reservation.pk, status=reservation.status
+            ).update(status="committed", updated_at=timezone.now())
+            if not claimed:
+                continue
+            if reservation.status == "released" and not _take_stock(
+                reservation.product_id, reservation.quantity
+            ):
+                logger.warning(
+                    f"Order {order.order_number} was paid after its reservation "
+                    f"expired and product {reservation.product_id} is out of stock"
+                )
+            Product.objects.filter(pk=reservation.product_id).update(
+                total_sold=F("total_sold") + reservation.quantity
+            )
+
+
+def release_order_stock(order, product_ids=None, status="cancelled"):
+    """
+    Return the stock of an order's held reservations, or only of those for
+    ``product_ids`` when the order's items change.
+
+    With the default ``status`` the reservations are cancelled: the order
+    was cancelled or its items replaced, so a later payment must not take
+    the stock again (released reservations are cancelled as well). Pass
+    "released" when the order may still be paid (expiry, failed payment).
+    """
+    reservations = order.stock_reservations.all()
+    if product_ids is not None:
+        reservations = reservations.filter(product_id__in=product_ids)
+    if status == "cancelled":
+        reservations.filter(status="released").update(
+            status="cancelled", updated_at=timezone.now()
+        )
+    released = 0
+    for reservation in reservations.filter(status="held"):
+        with transaction.atomic():
+            claimed = StockReservation.objects.filter(
+                pk=reservation.pk, status="held"
+            ).update(status=status, updated_at=timezone.now())
+            if claimed:
+                _return_stock(reservation.product_id, reservation.quantity)
+                released += 1
+    return released
+
+
+def release_expired_reservations(now=None):
+    """Release held reservations past their expiry, except for open COD orders."""
+    from payments.models import Payment
+
+    now = now or timezone.now()
+    # Cash on delivery orders stay unpaid until delivery; keep their stock.
+    open_cod_orders = Payment.objects.filter(
+        payment_method="cod", status__in=["pending", "processing"]
+    ).values("order_id")
+    expired = (
+        StockReservation.objects.filter(status="held", expires_at__lte=now)
+        .exclude(order_id__in=open_cod_orders)
+        .select_related("order")
+    )
+    released = 0
+    for order in {reservation.order for reservation in expired}:
+        released += release_order_stock(order, status="released")
+    return released
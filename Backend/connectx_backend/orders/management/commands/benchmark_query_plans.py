@@ -0,0 +1,238 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from categories.models import Category
+from orders.models import Order, OrderProductItem
+from payments.models import Payment
+from products.models import Product
+from reviews.models import Review
+from tenants.models import Tenant
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+# Models whose composite Meta.indexes are compared
+INDEXED_MODELS = [Order, OrderProductItem, Product, Review, Payment]
+
+
+def hot_queries(tenant, user, product, order):
+    """The tenant-scoped queries the views run most, as (label, queryset)."""
+    return [
+        (
+            "tenant orders, newest first",
+            Order.objects.filter(tenant=tenant).order_by("-created_at")[:20],
+        ),
+        (
+            "tenant orders by status",
+            Order.objects.filter(tenant=tenant, status="pending")
+            .order_by()
+            .values("id"),
+        ),
+        (
+            "listing tenant orders",
+            Order.objects.filter(listing_tenant=tenant).order_by("-created_at")[:20],
+        ),
+        (
+            "customer orders",
+            Order.objects.filter(user=user).order_by("-created_at")[:20],
+        ),
+        (
+            "orders with tenant's products",
+            OrderProductItem.objects.filter(product_owner=tenant).values("order_id"),
+        ),
+        (
+            "tenant catalogue",
+            Product.objects.filter(owner=tenant, is_public=True).order_by(
+                "-created_at"
+            )[:20],
+        ),
+        (
+            "product reviews",
+            Review.objects.filter(product=product).order_by("-created_at")[:20],
+        ),
+        (
+            "order payment by status",
+            Payment.objects.filter(order=order, status="completed"),
+        ),
+    ]
+
+
+def composite_indexes():
+    return [
+        index
+        for model in INDEXED_MODELS
+        for index in model._meta.indexes
+        if len(index.fields) > 1
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic tenant dataset and print the query plan and "
+        "timing of the hot tenant-scoped queries with and without the "
+        "composite indexes. Data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenants", type=int, default=50)
+        parser.add_argument("--orders", type=int, default=200000)
+        parser.add_argument("--products", type=int, default=20000)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated data."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write("Benchmark data rolled back.")
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        suffix = uuid.uuid4().hex[:8]
+
+        self.stdout.write("Generating data...")
+        tenants = Tenant.objects.bulk_create(
+            Tenant(
+                name=f"bench-{suffix}-{i}",
+                email=f"bench-{suffix}-{i}@example.com",
+                password="bench",
+            )
+            for i in range(options["tenants"])
+        )
+        users = User.objects.bulk_create(
+            User(
+                email=f"bench-{suffix}-{i}@example.com",
+                name=f"Customer {i}",
+                tenant=tenants[i % len(tenants)],
+            )
+            for i in range(options["tenants"] * 20)
+        )
+        categories = Category.objects.bulk_create(
+            Category(tenant=tenant, name=f"bench-{suffix}") for tenant in tenants
+        )
+        products = []
+        for i in range(options["products"]):
+            owner = rng.randrange(len(tenants))
+            products.append(
+                Product(
+                    owner=tenants[owner],
+                    category=categories[owner],
+                    name=f"bench-{i}",
+                    sku=f"BENCH-{suffix}-{i}",
+                    base_price=10,
+                    is_public=rng.random() < 0.5,
+                )
+            )
+        Product.objects.bulk_create(products, batch_size=batch_size)
+
+        statuses = [status_code for status_code, _ in Order.STATUS_CHOICES]
+        created = 0
+        while created < options["orders"]:
+            size = min(batch_size, options["orders"] - created)
+            orders = Order.objects.bulk_create(
+                Order(
+                    tenant=rng.choice(tenants),
+                    listing_tenant=rng.choice(tenants),
+                    user=rng.choice(users),
+                    order_number=f"BENCH-{suffix}-{i}",
+                    status=rng.choice(statuses),
+                    subtotal=10,
+                    total_amount=10,
+                )
+                for i in range(created, created + size)
+            )
+            items, payments = [], []
+            for order in orders:
+                product = rng.choice(products)
+                items.append(
+                    OrderProductItem(
+                        order=order,
+                        product=product,
+                        product_owner_id=product.owner_id,
+                        quantity=1,
+                        price=10,
+                    )
+                )
+                payments.append(
+                    Payment(
+                        order=order,
+                        amount=10,
+                        payment_method="chapa",
+                        status=rng.choice(["pending", "completed", "failed"]),
+                        transaction_id=order.order_number,
+                    )
+                )
+            OrderProductItem.objects.bulk_create(items)
+            Payment.objects.bulk_create(payments)
+            created += size
+
+        product = products[0]
+        Review.objects.bulk_create(
+            Review(
+                tenant=product.owner,
+                product=product if i % 2 else rng.choice(products),
+                user=user,
+                rating=rng.randint(1, 5),
+                comment="Benchmark",
+                is_purchased=True,
+            )
+            for i, user in enumerate(users)
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        queries = hot_queries(
+            tenants[0], users[0], product, Order.objects.filter(user=users[0]).first()
+        )
+        with_indexes = self.measure(queries, options["repeat"])
+        # Plain DROP INDEX: SQLite's schema editor refuses to run in the
+        # transaction that rolls the indexes back afterwards.
+        with connection.cursor() as cursor:
+            for index in composite_indexes():
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+            cursor.execute("ANALYZE")
+        without_indexes = self.measure(queries, options["repeat"])
+
+        for label, _ in queries:
+            after_ms, after_plan = with_indexes[label]
+            before_ms, before_plan = without_indexes[label]
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{label}: {before_ms:.2f} ms -> {after_ms:.2f} ms"
+                )
+            )
+            self.stdout.write("  without composite indexes:")
+            self.write_plan(before_plan)
+            self.stdout.write("  with composite indexes:")
+            self.write_plan(after_plan)
+
+    def measure(self, queries, repeat):
+        results = {}
+        for label, queryset in queries:
+            plan = queryset.explain()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) / repeat
+            results[label] = (elapsed * 1000, plan)
+        return results
+
+    def write_plan(self, plan):
+        for line in plan.splitlines():
+            self.stdout.write(f"    {line}")
@@ -0,0 +1,141 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.test.utils import CaptureQueriesContext
+
+from categories.models import Category
+from orders.models import Order, OrderProductItem
+from orders.statistics import tenant_order_statistics
+from products.models import Product
+from tenants.models import Tenant
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_statistics(tenant, orders):
+    """The previous one-query-per-figure implementation, for comparison."""
+    stats = {
+        "total_selling_orders": orders.filter(tenant=tenant).count(),
+        "total_listing_orders": orders.filter(listing_tenant=tenant).count(),
+        "total_product_orders": orders.filter(items__product_owner=tenant)
+        .distinct()
+        .count(),
+        "owned_and_sold": orders.filter(tenant=tenant, items__product_owner=tenant)
+        .distinct()
+        .count(),
+        "owned_not_sold": orders.filter(~Q(tenant=tenant), items__product_owner=tenant)
+        .distinct()
+        .count(),
+        "sold_not_owned": orders.filter(tenant=tenant)
+        .filter(~Q(items__product_owner=tenant))
+        .distinct()
+        .count(),
+        "revenue_owned_products": orders.filter(
+            tenant=tenant, items__product_owner=tenant
+        ).aggregate(total=Sum("total_amount"))["total"],
+        "revenue_resold_products": orders.filter(tenant=tenant)
+        .filter(~Q(items__product_owner=tenant))
+        .aggregate(total=Sum("total_amount"))["total"],
+    }
+    for status_code, _ in Order.STATUS_CHOICES:
+        stats[f"status_{status_code}"] = orders.filter(
+            tenant=tenant, status=status_code
+        ).count()
+    return stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic orders and time tenant order statistics against the "
+        "previous per-figure queries. Data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1000000)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated data."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write("Benchmark data rolled back.")
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        suffix = uuid.uuid4().hex[:8]
+        tenants = [
+            Tenant.objects.create(
+                name=f"bench-{suffix}-{i}",
+                email=f"bench-{suffix}-{i}@example.com",
+                password="bench",
+            )
+            for i in range(5)
+        ]
+        tenant = tenants[0]
+        category = Category.objects.create(tenant=tenant, name=f"bench-{suffix}")
+        products = [
+            Product.objects.create(
+                name=f"bench-{i}", owner=owner, category=category, base_price=10
+            )
+            for i, owner in enumerate(tenants)
+        ]
+        statuses = [status_code for status_code, _ in Order.STATUS_CHOICES]
+
+        self.stdout.write(f"Generating {options['orders']} orders...")
+        created = 0
+        while created < options["orders"]:
+            size = min(options["batch_size"], options["orders"] - created)
+            orders = []
+            for i in range(created, created + size):
+                amount = rng.randint(10, 1000)
+                orders.append(
+                    Order(
+                        tenant=rng.choice(tenants),
+                        listing_tenant=rng.choice(tenants),
+                        order_number=f"BENCH-{suffix}-{i}",
+                        status=rng.choice(statuses),
+                        subtotal=amount,
+                        total_amount=amount,
+                    )
+                )
+            Order.objects.bulk_create(orders)
+            items = []
+            for order in orders:
+                product = rng.choice(products)
+                items.append(
+                    OrderProductItem(
+                        order=order,
+                        product=product,
+                        product_owner_id=product.owner_id,
+                        quantity=1,
+                        price=order.total_amount,
+                    )
+                )
+            OrderProductItem.objects.bulk_create(items)
+            created += size
+
+        for label, func in [
+            ("previous", legacy_statistics),
+            ("conditional aggregates", tenant_order_statistics),
+        ]:
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                func(tenant, Order.objects.all())
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label}: {elapsed * 1000:.1f} ms, "
+                f"{len(context.captured_queries)} queries"
+            )
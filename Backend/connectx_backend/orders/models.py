@@ -5,9 +5,10 @@ from tenants.models import Tenant
 from users.models import User
 from products.models import Product
 from shipping.models import ShippingAddress
+from core.tracking import TrackedFieldsMixin
 
 
-class Order(models.Model):
+class Order(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("processing", "Processing"),
@@ -51,21 +52,37 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._original_status = self.status
+        indexes = [
+            # Tenant and customer order lists, newest first
+            models.Index(fields=["tenant", "created_at"]),
+            models.Index(fields=["listing_tenant", "created_at"]),
+            models.Index(fields=["user", "created_at"]),
+            # Per-status order counts in tenant statistics
+            models.Index(fields=["tenant", "status"]),
+        ]
+
+    # Loaded values for status change tracking (analytics, rollups)
+    tracked_fields = ("status", "total_amount")
 
     def save(self, *args, **kwargs):
-        """Automatically calculate total amount and track status changes."""
+        """Automatically calculate total amount."""
         self.total_amount = self.subtotal + self.taxes + self.shipping - self.discount
         super().save(*args, **kwargs)
-        self._original_status = self.status
 
     def __str__(self):
         return f"Order {self.order_number} ({self.tenant.name})"
 
 
+class OrderNumberCounter(models.Model):
+    """Last order sequence number handed out for a day (see orders.numbering)."""
+
+    day = models.DateField(primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+
 class OrderProductItem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
@@ -86,8 +103,12 @@ class OrderProductItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        """Calculate custom selling price if a custom profit is set."""
+    class Meta:
+        # Orders containing a tenant's products (statistics, analytics)
+        indexes = [models.Index(fields=["product_owner", "order"])]
+
+    def set_derived_fields(self):
+        """Fill in custom selling price and product owner from the product."""
         if self.custom_profit_percentage is not None:
             self.custom_selling_price = self.product.base_price * (
                 1 + self.custom_profit_percentage / 100
@@ -96,9 +117,12 @@ class OrderProductItem(models.Model):
             self.custom_selling_price = self.product.selling_price
 
         # Set product owner from product
-        if not self.pk and not self.product_owner_id:
-            self.product_owner = self.product.owner
+        if not self.product_owner_id:
+            self.product_owner_id = self.product.owner_id
 
+    def save(self, *args, **kwargs):
+        """Calculate custom selling price if a custom profit is set."""
+        self.set_derived_fields()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -107,6 +131,39 @@ class OrderProductItem(models.Model):
         )
 
 
+class StockReservation(models.Model):
+    """Stock taken from a product for an order (see orders.inventory)."""
+
+    STATUS_CHOICES = [
+        ("held", "Held"),
+        ("committed", "Committed"),
+        # Stock given back while the order may still be paid (expiry,
+        # failed payment); a later payment takes it again if it can
+        ("released", "Released"),
+        # Stock given back for good (order cancelled, items edited)
+        ("cancelled", "Cancelled"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="stock_reservations"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_reservations"
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="held")
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "expires_at"])]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for {self.order_id} ({self.status})"
+
+
 class OrderHistory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="history")
@@ -0,0 +1,107 @@
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Order, OrderNumberCounter
+
+
+class OrderNumberAllocator:
+    """
+    Hand out ``ORD-YYYYMMDD-XXXX`` order numbers from a per-day counter row.
+
+    Each reservation atomically increments the day's counter by
+    ``block_size`` and keeps the reserved range in memory, so a worker only
+    touches the counter once per block. Numbers never collide across
+    workers; with a block size above 1 they are unique but not handed out
+    in strict creation order, and unused numbers are skipped on restart.
+    """
+
+    def __init__(self, block_size=1):
+        self.block_size = max(1, int(block_size))
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self._pid = os.getpid()
+
+    def allocate(self, day=None):
+        """Return the next unused order number for ``day`` (default: today)."""
+        day = day or timezone.localdate()
+        with self._lock:
+            # A forked worker must not reuse its parent's reserved block.
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._blocks = {}
+
+            next_value, last_value = self._blocks.get(day, (1, 0))
+            if next_value > last_value:
+                next_value, last_value = self._reserve_block(day, self.block_size)
+            self._blocks = {day: (next_value + 1, last_value)}
+
+        return self.format(day, next_value)
+
+    @staticmethod
+    def format(day, value):
+        return f"ORD-{day.strftime('%Y%m%d')}-{value:04d}"
+
+    def _reserve_block(self, day, size):
+        """Atomically claim ``size`` numbers for ``day``; return (first, last)."""
+        with transaction.atomic():
+            last_value = self._increment(day, size)
+            if last_value is None:
+                OrderNumberCounter.objects.get_or_create(
+                    day=day, defaults={"last_value": self._existing_max(day)}
+                )
+                last_value = self._increment(day, size)
+        return last_value - size + 1, last_value
+
+    def _increment(self, day, size):
+        """Increment the day's counter; return the new value, or None if missing."""
+        if connection.vendor == "postgresql":
+            # Single round trip; the row lock is held only until commit.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {OrderNumberCounter._meta.db_table} "
+                    "SET last_value = last_value + %s WHERE day = %s "
+                    "RETURNING last_value",
+                    [size, day],
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        updated = OrderNumberCounter.objects.filter(day=day).update(
+            last_value=F("last_value") + size
+        )
+        if not updated:
+            return None
+        return OrderNumberCounter.objects.values_list("last_value", flat=True).get(
+            day=day
+        )
+
+    @staticmethod
+    def _existing_max(day):
+        """Highest sequence already used for ``day`` before its counter existed."""
+        prefix = f"ORD-{day.strftime('%Y%m%d')}-"
+        numbers = Order.objects.filter(order_number__startswith=prefix).values_list(
+            "order_number", flat=True
+        )
+        suffixes = [n[len(prefix):] for n in numbers]
+        return max((int(s) for s in suffixes if s.isdigit()), default=0)
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_order_number_allocator():
+    """Return the process-wide order number allocator."""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = OrderNumberAllocator(
+                    block_size=getattr(settings, "ORDER_NUMBER_BLOCK_SIZE", 1)
+                )
+    return _allocator
@@ -1,5 +1,11 @@
+import uuid
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Order, OrderProductItem, OrderHistory, RefundRequest, Refund
+from .inventory import InsufficientStock, adjust_order_stock, reserve_order_stock
+from products.models import Product
 from products.serializers import ProductSerializer
 from tenants.serializers import TenantSerializer
 from users.serializers import UserSerializer
@@ -70,8 +76,139 @@ class SimpleOrderProductItemSerializer(serializers.ModelSerializer):
         ]
 
 
+def bulk_create_order_items(order, items_data):
+    """Insert all order items with one query and hold their stock."""
+    items = []
+    for item_data in items_data:
+        item = OrderProductItem(order=order, **item_data)
+        item.set_derived_fields()
+        items.append(item)
+    items = OrderProductItem.objects.bulk_create(items)
+
+    try:
+        reserve_order_stock(order, items)
+    except InsufficientStock as e:
+        raise serializers.ValidationError(
+            {"items": [f"Not enough stock for product {e.product_id}."]}
+        )
+    return items
+
+
+# Item fields an order update can change (the product is the match key)
+ITEM_UPDATE_FIELDS = [
+    "quantity",
+    "price",
+    "custom_profit_percentage",
+    "custom_selling_price",
+]
+
+
+def sync_order_items(order, items_data):
+    """
+    Bring an order's items in line with ``items_data``, matched by product.
+
+    Items whose values changed are updated, new products inserted and
+    missing ones deleted, one query each; untouched items are not written.
+    The stock held is only adjusted for products whose ordered quantity
+    changed.
+    """
+    existing = defaultdict(list)
+    for item in order.items.select_related("product").order_by("created_at", "pk"):
+        existing[item.product_id].append(item)
+    old_quantities = defaultdict(int)
+    for product_id, matches in existing.items():
+        old_quantities[product_id] = sum(item.quantity for item in matches)
+
+    now = timezone.now()
+    items, to_create, to_update = [], [], []
+    for item_data in items_data:
+        # Omitted optional values reset, as a recreated item would
+        item_data = {"custom_profit_percentage": None, **item_data}
+        matches = existing.get(item_data["product"].pk)
+        if matches:
+            item = matches.pop(0)
+            before = [getattr(item, field) for field in ITEM_UPDATE_FIELDS]
+            for attr, value in item_data.items():
+                setattr(item, attr, value)
+            item.set_derived_fields()
+            if [getattr(item, field) for field in ITEM_UPDATE_FIELDS] != before:
+                item.updated_at = now
+                to_update.append(item)
+        else:
+            item = OrderProductItem(order=order, **item_data)
+            item.set_derived_fields()
+            to_create.append(item)
+        items.append(item)
+    to_delete = [item.pk for matches in existing.values() for item in matches]
+
+    if to_delete:
+        OrderProductItem.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        OrderProductItem.objects.bulk_update(
+            to_update, ITEM_UPDATE_FIELDS + ["updated_at"]
+        )
+    if to_create:
+        OrderProductItem.objects.bulk_create(to_create)
+
+    new_quantities = defaultdict(int)
+    for item in items:
+        new_quantities[item.product_id] += item.quantity
+    changed = {
+        product_id
+        for product_id in old_quantities.keys() | new_quantities.keys()
+        if old_quantities[product_id] != new_quantities[product_id]
+    }
+    if changed:
+        try:
+            adjust_order_stock(
+                order,
+                {product_id: new_quantities[product_id] for product_id in changed},
+            )
+        except InsufficientStock as e:
+            raise serializers.ValidationError(
+                {"items": [f"Not enough stock for product {e.product_id}."]}
+            )
+    return items
+
+
+class OrderItemProductField(serializers.PrimaryKeyRelatedField):
+    """Product field that resolves from the products preloaded by the list."""
+
+    def to_internal_value(self, data):
+        products = getattr(self.parent, "preloaded_products", None)
+        if products and str(data) in products:
+            return products[str(data)]
+        return super().to_internal_value(data)
+
+
+class OrderItemListSerializer(serializers.ListSerializer):
+    """Validate order items against products loaded in a single query."""
+
+    def to_internal_value(self, data):
+        product_ids = set()
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict) and item.get("product"):
+                    try:
+                        product_ids.add(uuid.UUID(str(item["product"])))
+                    except ValueError:
+                        continue
+
+        self.child.preloaded_products = {
+            str(pk): product
+            for pk, product in Product.objects.select_related("owner")
+            .in_bulk(product_ids)
+            .items()
+        }
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.child.preloaded_products = None
+
+
 # Main serializers for detail views (one record at a time)
 class OrderProductItemSerializer(serializers.ModelSerializer):
+    product = OrderItemProductField(queryset=Product.objects.all())
     product_details = MinimalProductSerializer(source="product", read_only=True)
     product_owner_tenant_name = serializers.CharField(
         source="product.owner.name", read_only=True
@@ -99,6 +236,7 @@ class OrderProductItemSerializer(serializers.ModelSerializer):
             "product_owner_tenant_id",
             "product_owner_tenant_name",
         )
+        list_serializer_class = OrderItemListSerializer
         swagger_schema_fields = {
             "example": {
                 "product": "product-uuid",
@@ -189,6 +327,7 @@ class OrderSerializer(serializers.ModelSerializer):
             }
         }
 
+    @transaction.atomic
     def create(self, validated_data):
         """Handle nested product items when creating an order."""
         # Extract nested data
@@ -199,12 +338,8 @@ class OrderSerializer(serializers.ModelSerializer):
         # Create the order
         order = Order.objects.create(**validated_data)
 
-        # Create items and set product_owner
-        for item_data in items_data:
-            product = item_data.get("product")
-            OrderProductItem.objects.create(
-                order=order, product_owner=product.owner, **item_data
-            )
+        # Create all items in one insert
+        bulk_create_order_items(order, items_data)
 
         # Create initial order history entry
         OrderHistory.objects.create(
@@ -219,6 +354,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
         return order
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Handle nested product items when updating an order."""
         items_data = validated_data.pop("items", None)
@@ -246,15 +382,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
         # Handle items if provided
         if items_data is not None:
-            # Clear existing items
-            instance.items.all().delete()
-
-            # Create new items
-            for item_data in items_data:
-                product = item_data.get("product")
-                OrderProductItem.objects.create(
-                    order=instance, product_owner=product.owner, **item_data
-                )
+            sync_order_items(instance, items_data)
 
         return instance
 
@@ -284,16 +412,27 @@ class OrderListSerializer(serializers.ModelSerializer):
             "payment_status",
         ]
 
+    # The order list views annotate items_count/total_quantity and prefetch
+    # first_items/latest_payments (OrderViewSet._with_list_data); the
+    # queries below are the fallback for orders loaded without them.
+
     def get_items_count(self, obj):
+        if hasattr(obj, "items_count"):
+            return obj.items_count
         return obj.items.count()
 
     def get_total_quantity(self, obj):
         """Calculate the total quantity of all items in the order."""
+        if hasattr(obj, "total_quantity"):
+            return obj.total_quantity
         return sum(item.quantity for item in obj.items.all())
 
     def get_first_item(self, obj):
         """Get simplified details of the first item in the order for display purposes."""
-        first_item = obj.items.first()
+        if hasattr(obj, "first_items"):
+            first_item = obj.first_items[0] if obj.first_items else None
+        else:
+            first_item = obj.items.select_related("product").first()
         if not first_item:
             return None
 
@@ -312,8 +451,17 @@ class OrderListSerializer(serializers.ModelSerializer):
         """Get simplified payment status information."""
         # Safer approach that doesn't rely on the OrderPayment model's structure
         try:
-            # Use values() to control exactly which fields are fetched
-            payment = obj.payments.values("status", "payment_method").first()
+            if hasattr(obj, "latest_payments"):
+                payment = next(
+                    (
+                        {"status": p.status, "payment_method": p.payment_method}
+                        for p in obj.latest_payments
+                    ),
+                    None,
+                )
+            else:
+                # Use values() to control exactly which fields are fetched
+                payment = obj.payments.values("status", "payment_method").first()
             if not payment:
                 return {"display_status": "Not Initiated", "method": None}
 
@@ -385,6 +533,7 @@ class WriteOrderSerializer(serializers.ModelSerializer):
             }
         }
 
+    @transaction.atomic
     def create(self, validated_data):
         """Handle nested product items when creating an order."""
         # Extract nested data
@@ -393,12 +542,8 @@ class WriteOrderSerializer(serializers.ModelSerializer):
         # Create the order
         order = Order.objects.create(**validated_data)
 
-        # Create items and set product_owner
-        for item_data in items_data:
-            product = item_data.get("product")
-            OrderProductItem.objects.create(
-                order=order, product_owner=product.owner, **item_data
-            )
+        # Create all items in one insert
+        bulk_create_order_items(order, items_data)
 
         # Create initial order history entry
         OrderHistory.objects.create(
@@ -413,6 +558,7 @@ class WriteOrderSerializer(serializers.ModelSerializer):
 
         return order
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Handle nested product items when updating an order."""
         items_data = validated_data.pop("items", None)
@@ -440,15 +586,7 @@ class WriteOrderSerializer(serializers.ModelSerializer):
 
         # Handle items if provided
         if items_data is not None:
-            # Clear existing items
-            instance.items.all().delete()
-
-            # Create new items
-            for item_data in items_data:
-                product = item_data.get("product")
-                OrderProductItem.objects.create(
-                    order=instance, product_owner=product.owner, **item_data
-                )
+            sync_order_items(instance, items_data)
 
         return instance
 
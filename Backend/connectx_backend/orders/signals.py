@@ -1,24 +1,22 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Order
-from analytics.models import ActivityLog
+from analytics.utils import record_activity
 
 
 @receiver(post_save, sender=Order)
 def track_order_status_change(sender, instance, **kwargs):
     """Track order status changes for analytics."""
-    if (
-        hasattr(instance, "_original_status")
-        and instance._original_status != instance.status
-    ):
-        ActivityLog.objects.create(
+    if instance.has_changed("status"):
+        record_activity(
+            "order_status_change",
+            getattr(instance.user, "role", None) or "admin",
+            user=instance.user,
             tenant=instance.tenant,
-            activity_type="order_status_change",
-            description=f"Order {instance.order_number} status changed from {instance._original_status} to {instance.status}",
-            metadata={
+            details={
                 "order_id": str(instance.id),
                 "order_number": instance.order_number,
-                "old_status": instance._original_status,
+                "old_status": instance.get_original("status"),
                 "new_status": instance.status,
                 "total_amount": float(instance.total_amount),
             },
@@ -0,0 +1,50 @@
+from django.db.models import Count, Q, Sum
+
+from .models import Order, OrderProductItem
+
+
+def tenant_order_statistics(tenant, orders):
+    """
+    Aggregate a tenant's order statistics over ``orders`` in two queries.
+
+    The first query covers orders the tenant sold or listed, using
+    conditional aggregates for every count, status and revenue figure. The
+    second counts orders containing the tenant's own products from the
+    item side. ``orders`` is an Order queryset, typically date filtered.
+    """
+    # Uncorrelated, so the database evaluates it once rather than per order
+    owned_order_ids = OrderProductItem.objects.filter(
+        product_owner=tenant
+    ).values("order_id")
+    sold = Q(tenant=tenant)
+    owned = Q(pk__in=owned_order_ids)
+
+    stats = (
+        orders.filter(Q(tenant=tenant) | Q(listing_tenant=tenant))
+        .aggregate(
+            total_selling_orders=Count("pk", filter=sold),
+            total_listing_orders=Count("pk", filter=Q(listing_tenant=tenant)),
+            owned_and_sold=Count("pk", filter=sold & owned),
+            sold_not_owned=Count("pk", filter=sold & ~owned),
+            revenue_owned_products=Sum("total_amount", filter=sold & owned),
+            revenue_resold_products=Sum("total_amount", filter=sold & ~owned),
+            **{
+                f"status_{status_code}": Count(
+                    "pk", filter=sold & Q(status=status_code)
+                )
+                for status_code, _ in Order.STATUS_CHOICES
+            },
+        )
+    )
+
+    stats.update(
+        OrderProductItem.objects.filter(
+            product_owner=tenant, order__in=orders.values("pk")
+        ).aggregate(
+            total_product_orders=Count("order", distinct=True),
+            owned_not_sold=Count(
+                "order", distinct=True, filter=~Q(order__tenant=tenant)
+            ),
+        )
+    )
+    return stats
@@ -1,10 +1,40 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from unittest.mock import patch
-from orders.models import Order, OrderProductItem
-from orders.serializers import OrderListSerializer, MinimalProductSerializer
+import datetime
+import json
+from io import StringIO
+from django.core.management import call_command
+import uuid
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from orders.models import (
+    Order,
+    OrderNumberCounter,
+    OrderProductItem,
+    RefundRequest,
+    StockReservation,
+)
+from orders.inventory import (
+    InsufficientStock,
+    commit_order_stock,
+    release_expired_reservations,
+    release_order_stock,
+    reserve_order_stock,
+)
+from orders.numbering import OrderNumberAllocator
+from orders.statistics import tenant_order_statistics
+from orders.serializers import (
+    OrderListSerializer,
+    MinimalProductSerializer,
+    WriteOrderSerializer,
+)
+from payments.models import Payment
+from payments.views import chapa_webhook_standalone
 from products.models import Product
 from categories.models import Category
 from tenants.models import Tenant
@@ -138,3 +168,547 @@ class OrderImageURLTestCase(TestCase):
         
         # Verify that generate_image_url was not called
         mock_generate_url.assert_not_called()
+
+
+class OrderNumberAllocatorTestCase(TestCase):
+    """Test case for the per-day order number counter."""
+
+    def setUp(self):
+        self.day = datetime.date(2025, 5, 1)
+        self.tenant = Tenant.objects.create(
+            name="Test Tenant",
+            email="test@tenant.com",
+            password="testpass123"
+        )
+
+    def test_allocates_sequential_numbers(self):
+        allocator = OrderNumberAllocator()
+        numbers = [allocator.allocate(self.day) for _ in range(3)]
+        self.assertEqual(
+            numbers,
+            ["ORD-20250501-0001", "ORD-20250501-0002", "ORD-20250501-0003"],
+        )
+
+    def test_allocators_never_collide(self):
+        first = OrderNumberAllocator(block_size=5)
+        second = OrderNumberAllocator(block_size=5)
+        numbers = [
+            allocator.allocate(self.day)
+            for _ in range(6)
+            for allocator in (first, second)
+        ]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(OrderNumberCounter.objects.get(day=self.day).last_value, 20)
+
+    def test_block_is_reserved_with_one_counter_update(self):
+        allocator = OrderNumberAllocator(block_size=10)
+        allocator.allocate(self.day)
+        with self.assertNumQueries(0):
+            for _ in range(9):
+                allocator.allocate(self.day)
+
+    def test_counter_starts_after_existing_orders(self):
+        Order.objects.create(
+            tenant=self.tenant,
+            order_number="ORD-20250501-0007",
+            subtotal=10,
+            total_amount=10,
+        )
+        allocator = OrderNumberAllocator()
+        self.assertEqual(allocator.allocate(self.day), "ORD-20250501-0008")
+
+
+class BulkOrderItemCreateTestCase(TestCase):
+    """Test case for creating orders with many items."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Test Tenant",
+            email="test@tenant.com",
+            password="testpass123"
+        )
+        self.category = Category.objects.create(
+            tenant=self.tenant,
+            name="Test Category",
+        )
+        self.products = [
+            Product.objects.create(
+                name=f"Product {i}",
+                base_price=100,
+                selling_price=120,
+                quantity=10,
+                category=self.category,
+                owner=self.tenant,
+            )
+            for i in range(20)
+        ]
+
+    def create_order(self, products):
+        serializer = WriteOrderSerializer(
+            data={
+                "subtotal": "100.00",
+                "taxes": "0.00",
+                "shipping": "0.00",
+                "discount": "0.00",
+                "items": [
+                    {"product": str(product.id), "quantity": 1, "price": "100.00"}
+                    for product in products
+                ],
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as context:
+            order = serializer.save(tenant=self.tenant, order_number=f"ORD-{len(products)}")
+        return order, len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_items(self):
+        # The day's first order also creates its analytics rollup row
+        self.create_order(self.products[:1])
+        _, small_order_queries = self.create_order(self.products[:2])
+        _, large_order_queries = self.create_order(self.products)
+        self.assertEqual(small_order_queries, large_order_queries)
+
+    def test_validation_loads_products_in_one_query(self):
+        serializer = WriteOrderSerializer(
+            data={
+                "subtotal": "100.00",
+                "taxes": "0.00",
+                "shipping": "0.00",
+                "discount": "0.00",
+                "items": [
+                    {"product": str(product.id), "quantity": 1, "price": "100.00"}
+                    for product in self.products
+                ],
+            }
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+    def test_items_get_owner_and_selling_price(self):
+        order, _ = self.create_order(self.products[:1])
+        item = order.items.get()
+        self.assertEqual(item.product_owner, self.tenant)
+        self.assertEqual(item.custom_selling_price, 120)
+        self.assertEqual(order.history.count(), 1)
+
+    def test_unknown_product_is_rejected(self):
+        serializer = WriteOrderSerializer(
+            data={
+                "subtotal": "100.00",
+                "taxes": "0.00",
+                "shipping": "0.00",
+                "discount": "0.00",
+                "items": [
+                    {"product": str(uuid.uuid4()), "quantity": 1, "price": "100.00"}
+                ],
+            }
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("items", serializer.errors)
+
+
+    def update_items(self, order, items):
+        serializer = WriteOrderSerializer(
+            order,
+            data={
+                "items": [
+                    {"product": str(product.id), "quantity": count, "price": "100.00"}
+                    for product, count in items
+                ]
+            },
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as context:
+            serializer.save()
+        return context.captured_queries
+
+    def test_update_diffs_items_by_product(self):
+        order, _ = self.create_order(self.products[:3])
+        kept, changed, removed = order.items.order_by("product__name")
+        added = self.products[3]
+
+        self.update_items(
+            order, [(kept.product, 1), (changed.product, 4), (added, 2)]
+        )
+
+        items = {item.product_id: item for item in order.items.all()}
+        self.assertEqual(set(items), {kept.product_id, changed.product_id, added.id})
+        # Matched items keep their rows; only the changed one is written
+        self.assertEqual(items[kept.product_id].pk, kept.pk)
+        self.assertEqual(items[kept.product_id].updated_at, kept.updated_at)
+        self.assertEqual(items[changed.product_id].pk, changed.pk)
+        self.assertEqual(items[changed.product_id].quantity, 4)
+
+        # Stock follows the new quantities
+        quantities = dict(Product.objects.values_list("pk", "quantity"))
+        self.assertEqual(quantities[kept.product_id], 9)
+        self.assertEqual(quantities[changed.product_id], 6)
+        self.assertEqual(quantities[removed.product_id], 10)
+        self.assertEqual(quantities[added.id], 8)
+
+    def test_unchanged_items_are_not_written(self):
+        order, _ = self.create_order(self.products)
+        queries = self.update_items(order, [(product, 1) for product in self.products])
+        writes = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+            and "orders_orderproductitem" in query["sql"]
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(order.stock_reservations.filter(status="released").count(), 0)
+
+    def test_update_rejects_missing_stock(self):
+        order, _ = self.create_order(self.products[:1])
+        with self.assertRaises(ValidationError):
+            self.update_items(order, [(self.products[0], 11)])
+
+    def test_edited_chapa_order_commits_its_new_quantities(self):
+        order, _ = self.create_order(self.products[:2])
+        edited, dropped = order.items.order_by("product__name")
+        self.update_items(order, [(edited.product, 3)])
+        self.update_items(order, [(edited.product, 2)])
+        # The held reservation was resized, not replaced
+        self.assertCountEqual(
+            order.stock_reservations.values_list("product_id", "quantity", "status"),
+            [(edited.product_id, 2, "held"), (dropped.product_id, 1, "cancelled")],
+        )
+
+        payment = Payment.objects.create(
+            order=order,
+            amount=order.total_amount,
+            payment_method="chapa",
+            transaction_id=f"TX-{uuid.uuid4()}",
+        )
+        request = RequestFactory().post(
+            "/api/payments/chapa_webhook_standalone/",
+            json.dumps({"tx_ref": payment.transaction_id, "status": "success"}),
+            content_type="application/json",
+        )
+        chapa_webhook_standalone(request)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "completed")
+        edited.product.refresh_from_db()
+        self.assertEqual(edited.product.quantity, 8)
+        self.assertEqual(edited.product.total_sold, 2)
+        dropped.product.refresh_from_db()
+        self.assertEqual(dropped.product.quantity, 10)
+        self.assertEqual(dropped.product.total_sold, 0)
+
+
+class InventoryReservationTestCase(TestCase):
+    """Test case for holding, committing and releasing order stock."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Test Tenant",
+            email="test@tenant.com",
+            password="testpass123"
+        )
+        self.category = Category.objects.create(
+            tenant=self.tenant,
+            name="Test Category",
+        )
+        self.product = Product.objects.create(
+            name="Hot Product",
+            base_price=100,
+            quantity=3,
+            category=self.category,
+            owner=self.tenant,
+        )
+
+    def place_order(self, quantity, number):
+        order = Order.objects.create(
+            tenant=self.tenant,
+            order_number=number,
+            subtotal=100,
+            taxes=0,
+            shipping=0,
+            discount=0,
+        )
+        item = OrderProductItem.objects.create(
+            order=order, product=self.product, quantity=quantity, price=100
+        )
+        reserve_order_stock(order, [item])
+        return order
+
+    def test_reservation_never_oversells(self):
+        self.place_order(2, "ORD-1")
+        with self.assertRaises(InsufficientStock):
+            self.place_order(2, "ORD-2")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+
+    def test_commit_is_idempotent(self):
+        order = self.place_order(2, "ORD-1")
+        commit_order_stock(order)
+        commit_order_stock(order)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+        self.assertEqual(self.product.total_sold, 2)
+        self.assertEqual(order.stock_reservations.get().status, "committed")
+
+    def test_release_returns_stock_once(self):
+        order = self.place_order(2, "ORD-1")
+        release_order_stock(order)
+        release_order_stock(order)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+
+    def test_expired_reservations_are_released(self):
+        order = self.place_order(2, "ORD-1")
+        StockReservation.objects.filter(order=order).update(
+            expires_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+        self.assertEqual(release_expired_reservations(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+
+        # A late payment takes the stock again
+        commit_order_stock(order)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+        self.assertEqual(self.product.total_sold, 2)
+
+    def test_replaced_reservation_is_not_committed(self):
+        Product.objects.filter(pk=self.product.pk).update(quantity=10)
+        order = self.place_order(2, "ORD-1")
+        # Edited to 3: the hold for 2 is replaced by one for 3
+        item = order.items.get()
+        item.quantity = 3
+        item.save()
+        release_order_stock(order, product_ids=[self.product.pk])
+        reserve_order_stock(order, [item])
+
+        commit_order_stock(order)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 7)
+        self.assertEqual(self.product.total_sold, 3)
+
+
+class TenantOrderStatisticsTestCase(TestCase):
+    """Test case for the conditional-aggregate tenant order statistics."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Seller", email="seller@tenant.com", password="testpass123"
+        )
+        self.other = Tenant.objects.create(
+            name="Other", email="other@tenant.com", password="testpass123"
+        )
+        category = Category.objects.create(tenant=self.tenant, name="Test Category")
+        self.own_product = Product.objects.create(
+            name="Own", base_price=10, category=category, owner=self.tenant
+        )
+        self.other_product = Product.objects.create(
+            name="Resold", base_price=10, category=category, owner=self.other
+        )
+
+    def create_order(self, tenant, products, total, status="pending", listing_tenant=None):
+        order = Order.objects.create(
+            tenant=tenant,
+            listing_tenant=listing_tenant,
+            order_number=f"ORD-{uuid.uuid4()}",
+            status=status,
+            subtotal=total,
+            taxes=0,
+            shipping=0,
+            discount=0,
+        )
+        for product in products:
+            OrderProductItem.objects.create(
+                order=order, product=product, quantity=1, price=10
+            )
+        return order
+
+    def test_statistics(self):
+        # Two own items in one order must only count its revenue once
+        self.create_order(self.tenant, [self.own_product, self.own_product], 100)
+        self.create_order(self.tenant, [self.other_product], 40, status="delivered")
+        self.create_order(self.other, [self.own_product], 70, listing_tenant=self.tenant)
+        self.create_order(self.other, [self.other_product], 500)
+
+        with self.assertNumQueries(2):
+            stats = tenant_order_statistics(self.tenant, Order.objects.all())
+
+        self.assertEqual(stats["total_selling_orders"], 2)
+        self.assertEqual(stats["total_listing_orders"], 1)
+        self.assertEqual(stats["total_product_orders"], 2)
+        self.assertEqual(stats["owned_and_sold"], 1)
+        self.assertEqual(stats["owned_not_sold"], 1)
+        self.assertEqual(stats["sold_not_owned"], 1)
+        self.assertEqual(stats["revenue_owned_products"], 100)
+        self.assertEqual(stats["revenue_resold_products"], 40)
+        self.assertEqual(stats["status_pending"], 1)
+        self.assertEqual(stats["status_delivered"], 1)
+        self.assertEqual(stats["status_cancelled"], 0)
+
+    def test_benchmark_command_runs_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_tenant_statistics", "--orders", "50", stdout=out)
+        self.assertIn("conditional aggregates", out.getvalue())
+        self.assertFalse(Order.objects.filter(order_number__startswith="BENCH-").exists())
+
+
+class OrderListQueryCountTestCase(APITestCase):
+    """Order list endpoints render in a fixed number of queries."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Seller", email="seller@tenant.com", password="testpass123"
+        )
+        self.owner = User.objects.create_user(
+            email="owner@tenant.com",
+            password="testpass123",
+            name="Owner",
+            tenant=self.tenant,
+            role=User.OWNER,
+        )
+        category = Category.objects.create(tenant=self.tenant, name="Test Category")
+        self.products = [
+            Product.objects.create(
+                name=f"Product {i}",
+                base_price=10,
+                category=category,
+                owner=self.tenant,
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.owner)
+
+    def create_orders(self, count):
+        from payments.models import Payment
+
+        for _ in range(count):
+            order = Order.objects.create(
+                tenant=self.tenant,
+                user=self.owner,
+                order_number=f"ORD-{uuid.uuid4()}",
+                subtotal=30,
+            )
+            for quantity, product in enumerate(self.products, start=1):
+                OrderProductItem.objects.create(
+                    order=order, product=product, quantity=quantity, price=10
+                )
+            for status_value in ["failed", "completed"]:
+                Payment.objects.create(
+                    order=order,
+                    amount=30,
+                    payment_method="chapa",
+                    status=status_value,
+                    transaction_id=f"TX-{uuid.uuid4()}",
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Leave out the API usage logging middleware's writes
+        order_queries = [
+            query
+            for query in queries.captured_queries
+            if "analytics_" not in query["sql"] and "SAVEPOINT" not in query["sql"]
+        ]
+        return len(order_queries), response.data["results"]
+
+    def test_query_count_does_not_grow_with_page(self):
+        urls = ["/api/orders/", "/api/orders/tenant-sales/", "/api/orders/my-orders/"]
+        for url in urls:
+            Order.objects.all().delete()
+            self.create_orders(2)
+            small, _ = self.count_queries(url)
+            self.create_orders(8)
+            large, results = self.count_queries(url)
+            self.assertEqual(small, large, url)
+            # Count, page, first items, latest payments
+            self.assertEqual(large, 4, url)
+            self.assertEqual(len(results), 10)
+
+    def test_list_data(self):
+        self.create_orders(1)
+        order = Order.objects.get()
+        first = OrderProductItem.objects.filter(order=order).order_by("pk").first()
+        latest = order.payments.order_by("-created_at").first()
+
+        _, results = self.count_queries("/api/orders/tenant-sales/")
+        expected = OrderListSerializer(order).data
+        self.assertEqual(results[0], expected)
+        self.assertEqual(results[0]["items_count"], 3)
+        self.assertEqual(results[0]["total_quantity"], 6)
+        self.assertEqual(results[0]["seller_tenant_name"], "Seller")
+        self.assertEqual(results[0]["first_item"]["product_id"], str(first.product_id))
+        self.assertEqual(
+            results[0]["payment_status"]["display_status"], latest.status.title()
+        )
+
+
+class RefundApprovalTestCase(APITestCase):
+    """Refund approval moves the payment, request and order together."""
+
+    def setUp(self):
+        from payments.models import Payment
+
+        self.tenant = Tenant.objects.create(
+            name="Seller", email="seller@tenant.com", password="testpass123"
+        )
+        owner = User.objects.create_user(
+            email="owner@tenant.com",
+            password="testpass123",
+            name="Owner",
+            tenant=self.tenant,
+            role=User.OWNER,
+        )
+        self.order = Order.objects.create(
+            tenant=self.tenant,
+            user=owner,
+            order_number=f"ORD-{uuid.uuid4()}",
+            status="delivered",
+            subtotal=30,
+        )
+        self.payment = Payment.objects.create(
+            order=self.order,
+            amount=30,
+            payment_method="chapa",
+            status="completed",
+            transaction_id=f"TX-{uuid.uuid4()}",
+        )
+        self.refund_request = RefundRequest.objects.create(
+            order=self.order, user=owner, reason="Broken"
+        )
+        self.client.force_authenticate(user=owner)
+
+    def approve(self):
+        return self.client.post(
+            f"/api/refund-requests/{self.refund_request.pk}/approve/"
+        )
+
+    def test_approve_refunds_payment_and_order(self):
+        response = self.approve()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.refund_request.refresh_from_db()
+        self.assertEqual(self.payment.status, "refunded")
+        self.assertEqual(self.order.status, "refunded")
+        self.assertEqual(self.refund_request.status, "approved")
+
+    def test_concurrent_payment_change_is_a_conflict(self):
+        from payments.models import Payment
+
+        # A refund webhook lands between loading the payment and updating it
+        transition = Payment.transition
+
+        def refunded_underneath(payment, *args, **kwargs):
+            Payment.objects.filter(pk=payment.pk).update(status="refunded")
+            return transition(payment, *args, **kwargs)
+
+        with patch.object(Payment, "transition", refunded_underneath):
+            response = self.approve()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.refund_request.refresh_from_db()
+        self.assertEqual(self.refund_request.status, "pending")
@@ -2,7 +2,9 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 import datetime
 import uuid
@@ -13,6 +15,9 @@ from rest_framework.exceptions import ValidationError
 from django_filters import FilterSet, CharFilter, ModelChoiceFilter
 
 from .models import Order, OrderHistory, OrderProductItem, RefundRequest, Refund
+from .numbering import get_order_number_allocator
+from .inventory import release_order_stock
+from .statistics import tenant_order_statistics
 from .serializers import (
     OrderSerializer,
     OrderListSerializer,
@@ -24,6 +29,7 @@ from users.permissions import IsTenantMember
 from rest_framework.permissions import IsAuthenticated
 
 from core.pagination import CustomPagination
+from payments.models import Payment
 from users.models import User
 
 from drf_yasg.utils import swagger_auto_schema
@@ -50,6 +56,8 @@ class OrderViewSet(viewsets.ModelViewSet):
     search_fields = ["order_number", "user__name", "user__email"]
     ordering_fields = ["created_at", "updated_at", "total_amount"]
     ordering = ["-created_at"]
+    # Keyset order for ?cursor= pages; replaces ?ordering on those pages
+    keyset_fields = ("-created_at", "-id")
 
     def get_serializer_class(self):
         """Use different serializers for different actions."""
@@ -127,10 +135,53 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         tenant_owner_permission = IsTenantMember()
         if tenant_owner_permission.has_permission(self.request, self):
-            return queryset.filter(
+            queryset = queryset.filter(
                 Q(tenant=tenant) | Q(items__product_owner=tenant)
             ).distinct()
-        return queryset.filter(user=user)
+        else:
+            queryset = queryset.filter(user=user)
+
+        if self.action == "list":
+            queryset = self._with_list_data(queryset)
+        return queryset
+
+    def _with_list_data(self, queryset):
+        """Load what OrderListSerializer renders in a fixed number of queries."""
+        # Subqueries rather than Count/Sum over a join: several of the
+        # list querysets already filter on items, and aggregating over
+        # that join would only see the matching items.
+        items = (
+            OrderProductItem.objects.filter(order=OuterRef("pk"))
+            .order_by()
+            .values("order")
+        )
+        return queryset.select_related("tenant").annotate(
+            items_count=Coalesce(
+                Subquery(items.annotate(count=Count("pk")).values("count")),
+                0,
+                output_field=IntegerField(),
+            ),
+            total_quantity=Coalesce(
+                Subquery(items.annotate(total=Sum("quantity")).values("total")),
+                0,
+                output_field=IntegerField(),
+            ),
+        ).prefetch_related(
+            Prefetch(
+                "items",
+                queryset=OrderProductItem.objects.select_related("product").order_by(
+                    "pk"
+                )[:1],
+                to_attr="first_items",
+            ),
+            Prefetch(
+                "payments",
+                queryset=Payment.objects.only(
+                    "order", "status", "payment_method", "created_at"
+                ).order_by("-created_at")[:1],
+                to_attr="latest_payments",
+            ),
+        )
 
     @swagger_auto_schema(
         operation_summary="Create a new order",
@@ -160,18 +211,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         """Set tenant and user automatically on order creation."""
         user = self.request.user
 
-        # Generate a unique order number
-        today = datetime.datetime.now()
-        date_str = today.strftime("%Y%m%d")
-
-        # Get the count of orders today + 1
-        today_start = datetime.datetime.combine(today.date(), datetime.time.min)
-        today_orders_count = (
-            Order.objects.filter(created_at__gte=today_start).count() + 1
-        )
-
-        # Format: ORD-YYYYMMDD-XXXX (XXXX is sequential number)
-        order_number = f"ORD-{date_str}-{today_orders_count:04d}"
+        # Format: ORD-YYYYMMDD-XXXX, allocated from a per-day counter
+        order_number = get_order_number_allocator().allocate()
 
         # Get selling tenant from request if provided, otherwise use user's tenant
         selling_tenant_id = serializer.validated_data.pop("selling_tenant_id", None)
@@ -227,6 +268,20 @@ class OrderViewSet(viewsets.ModelViewSet):
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Keyset page cursor from next/previous; empty for the first page",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "count",
+                openapi.IN_QUERY,
+                description="Set to false to skip the total count",
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+            ),
         ],
         responses={
             200: OrderSerializer(many=True),
@@ -297,6 +352,10 @@ class OrderViewSet(viewsets.ModelViewSet):
         order.status = status
         order.save()
 
+        # Give back held stock when the order will not be paid
+        if status in ["cancelled", "failed"]:
+            release_order_stock(order)
+
         # Create history entry
         OrderHistory.objects.create(
             order=order,
@@ -358,6 +417,7 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
             .distinct()
         )
+        queryset = self._with_list_data(queryset)
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -410,6 +470,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
+        queryset = self._with_list_data(queryset)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -461,6 +522,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
+        queryset = self._with_list_data(queryset)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -512,6 +574,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
+        queryset = self._with_list_data(queryset)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -549,6 +612,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
+        queryset = self._with_list_data(queryset)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -684,77 +748,27 @@ class OrderViewSet(viewsets.ModelViewSet):
             except ValueError:
                 pass
 
-        # Count orders by type
-        total_selling_orders = all_orders_queryset.filter(tenant=tenant).count()
-        total_listing_orders = all_orders_queryset.filter(listing_tenant=tenant).count()
-
-        # Count orders containing products owned by the tenant
-        total_product_orders = (
-            all_orders_queryset.filter(items__product_owner=tenant).distinct().count()
-        )
-
-        # Get counts by status for orders where tenant is seller
-        status_counts = {}
-        for status_choice in Order.STATUS_CHOICES:
-            status_code = status_choice[0]
-            status_counts[status_code] = all_orders_queryset.filter(
-                tenant=tenant, status=status_code
-            ).count()
-
-        # Get stats on product orders
-        # Count of orders with products owned and sold by tenant
-        owned_and_sold = (
-            all_orders_queryset.filter(tenant=tenant, items__product_owner=tenant)
-            .distinct()
-            .count()
-        )
-
-        # Count of orders with products owned by tenant but sold by others
-        owned_not_sold = (
-            all_orders_queryset.filter(~Q(tenant=tenant), items__product_owner=tenant)
-            .distinct()
-            .count()
-        )
-
-        # Count of orders with products not owned by tenant but sold by tenant
-        sold_not_owned = (
-            all_orders_queryset.filter(tenant=tenant)
-            .filter(~Q(items__product_owner=tenant))
-            .distinct()
-            .count()
-        )
-
-        # Calculate revenue from different sources
-        from django.db.models import Sum
-
-        # Revenue from products owned and sold by tenant
-        revenue_owned_products = (
-            all_orders_queryset.filter(
-                tenant=tenant, items__product_owner=tenant
-            ).aggregate(total=Sum("total_amount"))["total"]
-            or 0
-        )
-
-        # Revenue from reselling other tenants' products
-        revenue_resold_products = (
-            all_orders_queryset.filter(tenant=tenant)
-            .filter(~Q(items__product_owner=tenant))
-            .aggregate(total=Sum("total_amount"))["total"]
-            or 0
-        )
+        # All counts and sums in two conditional aggregates
+        stats = tenant_order_statistics(tenant, all_orders_queryset)
+        status_counts = {
+            status_code: stats[f"status_{status_code}"]
+            for status_code, _ in Order.STATUS_CHOICES
+        }
+        revenue_owned_products = stats["revenue_owned_products"] or 0
+        revenue_resold_products = stats["revenue_resold_products"] or 0
 
         # Combine all statistics
         statistics = {
             "order_counts": {
-                "total_selling_orders": total_selling_orders,
-                "total_listing_orders": total_listing_orders,
-                "total_product_orders": total_product_orders,
+                "total_selling_orders": stats["total_selling_orders"],
+                "total_listing_orders": stats["total_listing_orders"],
+                "total_product_orders": stats["total_product_orders"],
                 "status_breakdown": status_counts,
             },
             "product_order_types": {
-                "owned_and_sold": owned_and_sold,
-                "owned_but_sold_by_others": owned_not_sold,
-                "sold_but_owned_by_others": sold_not_owned,
+                "owned_and_sold": stats["owned_and_sold"],
+                "owned_but_sold_by_others": stats["owned_not_sold"],
+                "sold_but_owned_by_others": stats["sold_not_owned"],
             },
             "revenue": {
                 "from_owned_products": float(revenue_owned_products),
@@ -1005,40 +1019,47 @@ class RefundRequestViewSet(viewsets.ViewSet):
             )
 
         try:
-            refund_request = RefundRequest.objects.get(pk=pk)
-
-            # Check if refund request is in pending state
-            if refund_request.status != "pending":
-                return Response(
-                    {
-                        "error": f"Cannot approve refund request in '{refund_request.status}' status"
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            # The payment, request and order change together or not at all
+            with transaction.atomic():
+                refund_request = RefundRequest.objects.select_for_update().get(pk=pk)
+
+                # Check if refund request is in pending state
+                if refund_request.status != "pending":
+                    return Response(
+                        {
+                            "error": f"Cannot approve refund request in '{refund_request.status}' status"
+                        },
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
 
-            # Get the payment
-            payment = refund_request.order.payments.filter(status="completed").first()
-            if not payment:
-                return Response(
-                    {"error": "No completed payment found for this order"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+                # Get the payment
+                payment = refund_request.order.payments.filter(
+                    status="completed"
+                ).first()
+                if not payment:
+                    return Response(
+                        {"error": "No completed payment found for this order"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
 
-            # Update refund request status
-            refund_request.status = "approved"
-            refund_request.admin_notes = request.data.get("admin_notes", "")
-            refund_request.save()
+                # Update payment status; fails if e.g. a refund webhook got there first
+                if not payment.transition("refunded"):
+                    return Response(
+                        {"error": "Payment status changed, please retry"},
+                        status=status.HTTP_409_CONFLICT,
+                    )
 
-            # Update payment status
-            payment.status = "refunded"
-            payment.save()
+                # Update refund request status
+                refund_request.status = "approved"
+                refund_request.admin_notes = request.data.get("admin_notes", "")
+                refund_request.save()
 
-            # Update order status
-            refund_request.order.status = "refunded"
-            refund_request.order.save()
+                # Update order status
+                refund_request.order.status = "refunded"
+                refund_request.order.save()
 
-            serializer = RefundRequestSerializer(refund_request)
-            return Response(serializer.data)
+                serializer = RefundRequestSerializer(refund_request)
+                return Response(serializer.data)
 
         except RefundRequest.DoesNotExist:
             return Response(
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, PaymentHistory
+from .models import Payment, PaymentHistory, WebhookEvent
 
 
 class PaymentHistoryInline(admin.TabularInline):
@@ -40,3 +40,11 @@ class PaymentHistoryAdmin(admin.ModelAdmin):
     search_fields = ['payment__transaction_id']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tx_ref', 'received_at', 'processed_at', 'attempts']
+    list_filter = ['received_at', 'attempts']
+    search_fields = ['tx_ref', 'event_key']
+    readonly_fields = ['event_key', 'tx_ref', 'payload', 'received_at', 'last_error']
@@ -0,0 +1,195 @@
+import json
+import random
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from analytics.models import OutboxEvent
+from categories.models import Category
+from orders.models import Order, OrderProductItem, StockReservation
+from payments.models import Payment, WebhookEvent
+from payments.views import chapa_webhook_standalone
+from payments.webhooks import WebhookQueue, get_webhook_config, webhook_event_key
+from products.models import Product
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Post synthetic Chapa webhooks (with retried duplicates) to the webhook "
+        "endpoint from several threads, then apply them with the webhook queue. "
+        "Meant for PostgreSQL; the data is removed unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--webhooks", type=int, default=10000)
+        parser.add_argument("--payments", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument(
+            "--duplicates",
+            type=float,
+            default=0.2,
+            help="Share of deliveries that repeat an earlier one.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated data."
+        )
+
+    def handle(self, *args, **options):
+        if get_webhook_config()["INLINE"]:
+            raise CommandError("Set CHAPA_WEBHOOKS_INLINE=False to benchmark intake.")
+        tenant = self.setup(options)
+        try:
+            self.run(options, tenant)
+        finally:
+            if not options["keep"]:
+                self.cleanup(tenant)
+
+    def setup(self, options):
+        suffix = uuid.uuid4().hex[:8]
+        tenant = Tenant.objects.create(
+            name=f"bench-{suffix}",
+            email=f"bench-{suffix}@example.com",
+            password="bench",
+        )
+        category = Category.objects.create(tenant=tenant, name=f"bench-{suffix}")
+        product = Product.objects.create(
+            name=f"bench-{suffix}",
+            owner=tenant,
+            category=category,
+            base_price=10,
+            quantity=0,
+        )
+        orders = Order.objects.bulk_create(
+            [
+                Order(
+                    tenant=tenant,
+                    order_number=f"BENCH-{suffix}-{i}",
+                    subtotal=10,
+                    total_amount=10,
+                )
+                for i in range(options["payments"])
+            ]
+        )
+        OrderProductItem.objects.bulk_create(
+            [
+                OrderProductItem(
+                    order=order,
+                    product=product,
+                    product_owner_id=tenant.pk,
+                    quantity=1,
+                    price=10,
+                )
+                for order in orders
+            ]
+        )
+        StockReservation.objects.bulk_create(
+            [
+                StockReservation(order=order, product=product, quantity=1)
+                for order in orders
+            ]
+        )
+        Payment.objects.bulk_create(
+            [
+                Payment(
+                    order=order,
+                    amount=10,
+                    payment_method="chapa",
+                    transaction_id=f"BENCH-{suffix}-{i}",
+                )
+                for i, order in enumerate(orders)
+            ]
+        )
+        return tenant
+
+    def run(self, options, tenant):
+        rng = random.Random(options["seed"])
+        tx_refs = list(
+            Payment.objects.filter(order__tenant=tenant).values_list(
+                "transaction_id", flat=True
+            )
+        )
+        deliveries = []
+        for i in range(options["webhooks"]):
+            if deliveries and rng.random() < options["duplicates"]:
+                deliveries.append(rng.choice(deliveries))
+                continue
+            tx_ref = rng.choice(tx_refs)
+            deliveries.append(
+                json.dumps(
+                    {
+                        "event": "charge.success",
+                        "status": "success",
+                        "tx_ref": tx_ref,
+                        "reference": f"AP{tx_ref}-{i}",
+                        "amount": "10.00",
+                        "currency": "ETB",
+                    }
+                )
+            )
+        unique = {webhook_event_key(json.loads(body)) for body in deliveries}
+
+        factory = RequestFactory()
+        statuses = []
+
+        def post(bodies):
+            try:
+                for body in bodies:
+                    request = factory.post(
+                        "/api/payments/chapa_webhook_standalone/",
+                        body,
+                        content_type="application/json",
+                    )
+                    statuses.append(chapa_webhook_standalone(request).status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=post, args=(deliveries[i :: options["threads"]],))
+            for i in range(options["threads"])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        stored = WebhookEvent.objects.filter(tx_ref__in=tx_refs).count()
+        errors = sum(1 for code in statuses if code != 200)
+        self.stdout.write(
+            f"Intake: {len(deliveries)} webhooks in {elapsed:.2f} s "
+            f"({len(deliveries) / elapsed:.0f}/s, {options['threads']} threads), "
+            f"{errors} errors; {stored} stored of {len(unique)} unique."
+        )
+
+        queue = WebhookQueue(batch_size=get_webhook_config()["BATCH_SIZE"])
+        start = time.perf_counter()
+        applied = queue.drain()
+        elapsed = time.perf_counter() - start
+        sold = Product.objects.get(owner=tenant).total_sold
+        paid = Payment.objects.filter(
+            order__tenant=tenant, status="completed"
+        ).count()
+        self.stdout.write(
+            f"Processing: {applied} events in {elapsed:.2f} s "
+            f"({applied / max(elapsed, 1e-9):.0f}/s); {paid} payments completed, "
+            f"total_sold {sold}."
+        )
+
+    def cleanup(self, tenant):
+        tx_refs = Payment.objects.filter(order__tenant=tenant).values(
+            "transaction_id"
+        )
+        WebhookEvent.objects.filter(tx_ref__in=tx_refs).delete()
+        tenant_id = str(tenant.pk)
+        tenant.delete()
+        # Analytics events the run (and the delete) queued would only fail
+        # on the deleted tenant
+        OutboxEvent.objects.filter(payload__tenant_id=tenant_id).delete()
+        self.stdout.write("Benchmark data removed.")
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments.webhooks import WebhookQueue, get_webhook_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply stored Chapa webhooks to their payments. Runs until stopped "
+        "unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Apply the pending webhooks once and exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when there is nothing to apply.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Webhooks to apply per transaction (default: CHAPA_WEBHOOKS).",
+        )
+
+    def handle(self, *args, **options):
+        config = get_webhook_config()
+        # Always queue-draining here, whatever INLINE says for this process
+        queue = WebhookQueue(
+            batch_size=options["batch_size"] or config["BATCH_SIZE"],
+            max_attempts=config["MAX_ATTEMPTS"],
+        )
+        if options["once"]:
+            applied = queue.drain()
+            self.stdout.write(
+                f"Applied {applied} webhooks; {queue.pending()} pending."
+            )
+            return
+
+        try:
+            while True:
+                close_old_connections()
+                if not queue.drain(limit=queue.batch_size):
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -1,13 +1,17 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from tenants.models import Tenant
 from orders.models import Order
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 from users.models import User
 from django.utils import timezone
+from core.tracking import TrackedFieldsMixin
 
-class Payment(models.Model):
+
+class PaymentStatusConflict(Exception):
+    """The payment's status was changed by someone else since it was loaded."""
+
+
+class Payment(TrackedFieldsMixin, models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('processing', 'Processing'),
@@ -35,24 +39,112 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
-        
+        # An order's payment in a given status (refunds, COD checks)
+        indexes = [models.Index(fields=['order', 'status'])]
+
     def __str__(self):
         return f"{self.payment_method} payment for order {self.order.order_number}"
         
+    # Order status a payment moves its order to, from a pending order
+    ORDER_STATUS_ON_PAYMENT = {
+        'completed': 'processing',
+    }
+
+    tracked_fields = (
+        'status',
+        'amount',
+        'payment_method',
+        'transaction_id',
+        'verification_data',
+        'webhook_data',
+    )
+
     def save(self, *args, **kwargs):
-        # Create payment history entry on status change
-        if self.pk:  # Only check for status change if payment already exists
-            try:
-                old_payment = Payment.objects.get(pk=self.pk)
-                if old_payment.status != self.status:
-                    PaymentHistory.objects.create(
-                        payment=self,
-                        old_status=old_payment.status,
-                        new_status=self.status
-                    )
-            except Payment.DoesNotExist:
-                pass  # This is a new payment
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        # Status changes go through the conditional transition
+        if (
+            self._state.adding
+            or (update_fields is not None and 'status' not in update_fields)
+            or not (
+                self.has_changed('status') or self._status_assigned_while_deferred()
+            )
+        ):
+            super().save(*args, **kwargs)
+            return
+        fields = {
+            field: getattr(self, field)
+            for field in self.get_dirty_fields()
+            if field != 'status' and (update_fields is None or field in update_fields)
+        }
+        # The rest of the loaded fields (untracked ones, JSON changed in
+        # place) are saved once the transition has won
+        deferred = self.get_deferred_fields()
+        rest = [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname not in deferred
+            and field.name != 'status'
+            and field.name not in fields
+            and (
+                update_fields is None
+                or field.name in update_fields
+                or field.attname in update_fields
+            )
+        ]
+        with transaction.atomic():
+            if not self.transition(self.status, **fields):
+                raise PaymentStatusConflict(
+                    f"Payment {self.pk} is no longer '{self.get_original('status')}'"
+                )
+            if rest:
+                kwargs['update_fields'] = rest
+                super().save(*args, **kwargs)
+
+    def _status_assigned_while_deferred(self):
+        return 'status' in self.__dict__ and self.get_original('status') is None
+
+    @transaction.atomic
+    def transition(self, status, **fields):
+        """
+        Move the payment from its loaded status to ``status``, also writing
+        ``fields``, with a single UPDATE ... WHERE status = <loaded status>.
+        The history row and the order's status follow in the same
+        transaction. Returns False, writing nothing, when the payment is
+        already in ``status`` or another writer changed it first (e.g. a
+        repeated webhook).
+        """
+        old_status = self.get_original('status')
+        if old_status is None:
+            raise ValueError(
+                f"Payment {self.pk} was loaded without its status; load it "
+                "before changing the status"
+            )
+        if old_status == status:
+            return False
+        now = timezone.now()
+        updated = Payment.objects.filter(pk=self.pk, status=old_status).update(
+            status=status, updated_at=now, **fields
+        )
+        if not updated:
+            return False
+
+        self.status = status
+        self.updated_at = now
+        for field, value in fields.items():
+            setattr(self, field, value)
+        self.mark_clean()
+        PaymentHistory.objects.create(
+            payment=self, old_status=old_status, new_status=status
+        )
+
+        order_status = self.ORDER_STATUS_ON_PAYMENT.get(status)
+        if order_status:
+            order = self.order
+            if order.status == 'pending':
+                order.status = order_status
+                order.save()
+        return True
 
 
 class PaymentHistory(models.Model):
@@ -70,8 +162,31 @@ class PaymentHistory(models.Model):
         return f"Payment {self.payment.transaction_id} status changed from {self.old_status} to {self.new_status}"
 
 
-@receiver(post_save, sender=Payment)
-def update_order_status(sender, instance, **kwargs):
-    if instance.status == 'completed':
-        instance.order.status = 'completed'
-        instance.order.save()
\ No newline at end of file
+class WebhookEvent(models.Model):
+    """
+    Chapa webhook as received (payments.webhooks). Deliveries with the same
+    ``event_key`` (retries) are stored once; the webhook worker applies
+    events to their payment in the order they arrived per ``tx_ref``.
+    """
+    event_key = models.CharField(max_length=64, unique=True)
+    tx_ref = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['tx_ref', 'id']),
+            # The worker only ever scans unprocessed events
+            models.Index(
+                fields=['id'],
+                name='payments_webhook_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Webhook {self.pk} for {self.tx_ref} ({self.attempts} attempts)"
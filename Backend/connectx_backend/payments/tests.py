@@ -1,3 +1,289 @@
-from django.test import TestCase
+import json
+import uuid
+from unittest.mock import patch
 
-# Create your tests here.
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from categories.models import Category
+from orders.models import Order, OrderProductItem
+from orders.inventory import reserve_order_stock
+from payments.models import (
+    Payment,
+    PaymentHistory,
+    PaymentStatusConflict,
+    WebhookEvent,
+)
+from payments.views import chapa_webhook_standalone
+from payments.webhooks import WebhookQueue
+from products.models import Product
+from tenants.models import Tenant
+
+
+class PaymentTransitionTestCase(TestCase):
+    """Test case for conditional payment status transitions."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Test Tenant", email="test@tenant.com", password="testpass123"
+        )
+        category = Category.objects.create(tenant=self.tenant, name="Test Category")
+        self.product = Product.objects.create(
+            name="Product",
+            base_price=10,
+            quantity=5,
+            category=category,
+            owner=self.tenant,
+        )
+        self.order = Order.objects.create(
+            tenant=self.tenant,
+            order_number=f"ORD-{uuid.uuid4()}",
+            subtotal=20,
+        )
+        item = OrderProductItem.objects.create(
+            order=self.order, product=self.product, quantity=2, price=10
+        )
+        reserve_order_stock(self.order, [item])
+        self.payment = Payment.objects.create(
+            order=self.order,
+            amount=20,
+            payment_method="chapa",
+            transaction_id=f"TX-{uuid.uuid4()}",
+        )
+
+    def test_save_does_not_reread_the_payment(self):
+        payment = Payment.objects.get(pk=self.payment.pk)
+        payment.status = "completed"
+        with CaptureQueriesContext(connection) as context:
+            payment.save()
+        payment_selects = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and 'FROM "payments_payment"' in query["sql"]
+        ]
+        self.assertEqual(payment_selects, [])
+
+        history = PaymentHistory.objects.get(payment=payment)
+        self.assertEqual(history.old_status, "pending")
+        self.assertEqual(history.new_status, "completed")
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "processing")
+
+    def test_status_save_keeps_the_other_changes(self):
+        other_order = Order.objects.create(
+            tenant=self.tenant, order_number=f"ORD-{uuid.uuid4()}", subtotal=20
+        )
+        Payment.objects.filter(pk=self.payment.pk).update(verification_data={"n": 1})
+        payment = Payment.objects.get(pk=self.payment.pk)
+        payment.status = "completed"
+        payment.order = other_order
+        payment.verification_data["n"] = 2
+        payment.save()
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "completed")
+        self.assertEqual(payment.order_id, other_order.pk)
+        self.assertEqual(payment.verification_data, {"n": 2})
+
+    def test_status_save_respects_update_fields(self):
+        payment = Payment.objects.get(pk=self.payment.pk)
+        payment.status = "completed"
+        payment.amount = 99
+        payment.webhook_data = {"n": 1}
+        payment.save(update_fields=["status", "webhook_data"])
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "completed")
+        self.assertEqual(payment.webhook_data, {"n": 1})
+        self.assertEqual(payment.amount, 20)
+
+        payment.status = "refunded"
+        payment.save(update_fields=["amount"])
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "completed")
+        self.assertEqual(PaymentHistory.objects.filter(payment=payment).count(), 1)
+
+    def test_transition_is_conditional_on_loaded_status(self):
+        first = Payment.objects.get(pk=self.payment.pk)
+        second = Payment.objects.get(pk=self.payment.pk)
+
+        self.assertTrue(first.transition("completed", webhook_data={"n": 1}))
+        self.assertFalse(second.transition("completed", webhook_data={"n": 2}))
+        self.assertFalse(first.transition("completed"))
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.webhook_data, {"n": 1})
+        self.assertEqual(PaymentHistory.objects.filter(payment=self.payment).count(), 1)
+
+        second.status = "failed"
+        with self.assertRaises(PaymentStatusConflict):
+            second.save()
+
+    def test_status_change_needs_the_loaded_status(self):
+        payment = Payment.objects.defer("status").get(pk=self.payment.pk)
+        payment.status = "completed"
+        with self.assertRaisesMessage(ValueError, "loaded without its status"):
+            payment.save()
+
+        payment = Payment.objects.defer("status").get(pk=self.payment.pk)
+        self.assertEqual(payment.status, "pending")
+        self.assertTrue(payment.transition("completed"))
+
+    def test_order_status_only_moves_from_pending(self):
+        self.order.status = "delivered"
+        self.order.save()
+        self.payment.transition("completed")
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "delivered")
+
+    def test_repeated_webhook_commits_stock_once(self):
+        body = json.dumps({"tx_ref": self.payment.transaction_id, "status": "success"})
+        for _ in range(2):
+            request = RequestFactory().post(
+                "/api/payments/chapa_webhook_standalone/",
+                body,
+                content_type="application/json",
+            )
+            response = chapa_webhook_standalone(request)
+            self.assertEqual(json.loads(response.content)["status"], "success")
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+        self.assertEqual(self.product.total_sold, 2)
+        self.assertEqual(PaymentHistory.objects.filter(payment=self.payment).count(), 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "processing")
+
+
+class WebhookQueueTestCase(TestCase):
+    """Test case for the Chapa webhook intake queue."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Test Tenant", email="test@tenant.com", password="testpass123"
+        )
+        category = Category.objects.create(tenant=self.tenant, name="Test Category")
+        self.product = Product.objects.create(
+            name="Product",
+            base_price=10,
+            quantity=5,
+            category=category,
+            owner=self.tenant,
+        )
+        self.payments = [self.create_payment() for _ in range(2)]
+        self.queue = WebhookQueue(batch_size=10, max_attempts=2)
+        patcher = patch("payments.views.get_webhook_queue", return_value=self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_payment(self):
+        order = Order.objects.create(
+            tenant=self.tenant, order_number=f"ORD-{uuid.uuid4()}", subtotal=10
+        )
+        item = OrderProductItem.objects.create(
+            order=order, product=self.product, quantity=1, price=10
+        )
+        reserve_order_stock(order, [item])
+        return Payment.objects.create(
+            order=order,
+            amount=10,
+            payment_method="chapa",
+            transaction_id=f"TX-{uuid.uuid4()}",
+        )
+
+    def post(self, payment, webhook_status, **extra):
+        return self.client.post(
+            reverse("chapa-webhook-standalone"),
+            json.dumps(
+                {"tx_ref": payment.transaction_id, "status": webhook_status, **extra}
+            ),
+            content_type="application/json",
+        )
+
+    def test_webhooks_are_stored_once_and_applied_later(self):
+        for _ in range(3):
+            response = self.post(self.payments[0], "success")
+            self.assertEqual(response.status_code, 200)
+        self.post(self.payments[1], "failed")
+
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+        self.payments[0].refresh_from_db()
+        self.assertEqual(self.payments[0].status, "pending")
+
+        self.assertEqual(self.queue.drain(), 2)
+        self.assertEqual(self.queue.pending(), 0)
+
+        for payment in self.payments:
+            payment.refresh_from_db()
+        self.assertEqual(self.payments[0].status, "completed")
+        self.assertEqual(self.payments[1].status, "failed")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_sold, 1)
+        self.assertEqual(self.product.quantity, 4)
+
+    def test_events_are_applied_in_order_per_tx_ref(self):
+        payment = self.payments[0]
+        self.post(payment, "success")
+        self.post(payment, "refunded")
+
+        self.assertEqual(self.queue.drain(), 2)
+        statuses = list(
+            PaymentHistory.objects.filter(payment=payment)
+            .order_by("created_at")
+            .values_list("new_status", flat=True)
+        )
+        self.assertEqual(statuses, ["completed", "refunded"])
+
+    def test_later_events_wait_for_a_failed_one(self):
+        payment = self.payments[0]
+        self.post(payment, "success")
+        self.post(payment, "refunded")
+        self.post(self.payments[1], "failed")
+
+        with patch(
+            "payments.webhooks.commit_order_stock", side_effect=RuntimeError("boom")
+        ):
+            self.assertEqual(self.queue.drain(), 1)
+        first, second, other = WebhookEvent.objects.order_by("id")
+        self.assertEqual((first.attempts, first.last_error), (1, "boom"))
+        self.assertIsNone(second.processed_at)
+        self.assertEqual(second.attempts, 0)
+        self.assertIsNotNone(other.processed_at)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "pending")
+
+        self.assertEqual(self.queue.drain(), 2)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "refunded")
+
+    def test_unknown_tx_ref_is_retried_then_dropped(self):
+        response = self.client.post(
+            reverse("chapa-webhook-standalone"),
+            json.dumps({"tx_ref": "unknown", "status": "success"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.queue.drain()
+        self.queue.drain()
+        self.assertEqual(self.queue.pending(), 0)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.attempts, 2)
+        self.assertIsNone(event.processed_at)
+
+    def test_events_wait_for_an_earlier_event_outside_the_batch(self):
+        self.queue.batch_size = 1
+        payment = self.payments[0]
+        self.post(payment, "success")
+        self.post(payment, "refunded")
+
+        with patch(
+            "payments.webhooks.commit_order_stock", side_effect=RuntimeError("boom")
+        ):
+            self.assertEqual(self.queue.drain(), 0)
+        self.assertEqual(self.queue.pending(), 2)
+        self.assertEqual(self.queue.drain(), 2)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "refunded")
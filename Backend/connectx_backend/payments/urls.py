@@ -6,7 +6,8 @@ router = DefaultRouter()
 router.register(r'payments', PaymentViewSet, basename='payment')
 
 urlpatterns = [
-    path('', include(router.urls)),
-    # Standalone webhook endpoint that bypasses authentication
+    # Standalone webhook endpoint that bypasses authentication. Listed before
+    # the router, whose payments/<pk>/ route would otherwise match it.
     path('payments/chapa_webhook_standalone/', chapa_webhook_standalone, name='chapa-webhook-standalone'),
+    path('', include(router.urls)),
 ]
@@ -10,9 +10,11 @@ import requests
 import json
 import uuid
 import datetime
+import logging
 from django.urls import reverse
 
 from .models import Payment, PaymentHistory
+from .webhooks import get_webhook_queue
 from .serializers import (
     PaymentSerializer,
     PaymentHistorySerializer,
@@ -21,6 +23,7 @@ from .serializers import (
     CashOnDeliveryConfirmationSerializer
 )
 from orders.models import Order
+from orders.inventory import commit_order_stock, release_order_stock
 from users.permissions import IsTenantOwner,IsTenantMember
 from core.pagination import CustomPagination
 
@@ -29,6 +32,8 @@ from drf_yasg import openapi
 
 from .chapa import ChapaPayment, ChapaError
 
+logger = logging.getLogger(__name__)
+
 # Chapa payment gateway constants
 CHAPA_BASE_URL = "https://api.chapa.co"
 CHAPA_INITIATE_URL = f"{CHAPA_BASE_URL}/v1/transaction/initialize"
@@ -486,14 +491,10 @@ class PaymentViewSet(viewsets.ModelViewSet):
             
             # Update payment status based on verification
             if verification['status'] == 'success':
-                payment.status = 'completed'
-                payment.verification_data = verification
-                payment.save()
-                
-                # Update order status
-                order = payment.order
-                order.status = 'processing'
-                order.save()
+                # Moves a pending order to processing; a repeated
+                # verification finds the payment completed and stops here
+                if payment.transition('completed', verification_data=verification):
+                    commit_order_stock(payment.order)
                 
                 return Response({
                     'status': 'success',
@@ -501,9 +502,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
                     'payment': PaymentSerializer(payment).data
                 })
             else:
-                payment.status = 'failed'
-                payment.verification_data = verification
-                payment.save()
+                if payment.transition('failed', verification_data=verification):
+                    release_order_stock(payment.order, status="released")
                 
                 return Response({
                     'status': 'failed',
@@ -526,22 +526,6 @@ class PaymentViewSet(viewsets.ModelViewSet):
     # /api/payments/chapa_webhook_standalone/
     pass
     
-    def _update_product_statistics(self, order):
-        """Update product statistics when payment is successful."""
-        try:
-            from products.models import Product
-            
-            for item in order.items.all():
-                product = item.product
-                # Update total sold quantity
-                product.total_sold += item.quantity
-                product.save()
-                
-                print(f"Updated product {product.name} - Total sold: {product.total_sold}")
-                
-        except Exception as e:
-            print(f"Error updating product statistics: {str(e)}")
-            
     @swagger_auto_schema(
         operation_summary="Confirm Cash on Delivery payment",
         operation_description="Confirm receipt of payment for Cash on Delivery orders. Only accessible by tenant owners.",
@@ -609,14 +593,13 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Update payment status
-        payment.status = 'completed'
-        payment.save()
-        
-        # Update order status
-        order = payment.order
-        order.status = 'processing'
-        order.save()
+        # Update payment status; a pending order moves to processing
+        if not payment.transition('completed'):
+            return Response(
+                {"error": "Payment status changed, please retry"},
+                status=status.HTTP_409_CONFLICT
+            )
+        commit_order_stock(payment.order)
         
         return Response(PaymentSerializer(payment).data)
 
@@ -681,6 +664,9 @@ def chapa_webhook_standalone(request):
     """
     Standalone Chapa webhook handler that bypasses all authentication.
     This is a separate function to ensure no authentication middleware interferes.
+
+    The event is stored and acknowledged; payments.webhooks applies it to the
+    payment asynchronously, once per delivery.
     """
     try:
         # Parse JSON body manually for webhook
@@ -688,114 +674,32 @@ def chapa_webhook_standalone(request):
             webhook_data = json.loads(request.body.decode('utf-8'))
         else:
             webhook_data = request.data
-            
-        print(f"🔔 Standalone Webhook received: {webhook_data}")
-        print(f"📋 Webhook headers: {dict(request.META)}")
-        
-        # Verify webhook signature for security using hardcoded secret
-        from .chapa import CHAPA_WEBHOOK_SECRET_DEMO
-        webhook_secret = CHAPA_WEBHOOK_SECRET_DEMO
-        
-        # Get signature from headers
-        chapa_signature = request.META.get('HTTP_CHAPA_SIGNATURE')
-        x_chapa_signature = request.META.get('HTTP_X_CHAPA_SIGNATURE')
-        
-        print(f"🔐 Chapa-Signature: {chapa_signature}")
-        print(f"🔐 x-chapa-signature: {x_chapa_signature}")
-        
+
         # Get transaction reference from webhook data
         tx_ref = webhook_data.get('tx_ref')
         if not tx_ref:
-            print(f"❌ No tx_ref found in webhook data: {webhook_data}")
+            logger.warning("Chapa webhook without tx_ref")
             return JsonResponse({
                 "error": "tx_ref not found in webhook data",
                 "status": "error"
             }, status=400)
-            
-        # Get the payment
-        try:
-            payment = Payment.objects.get(transaction_id=tx_ref)
-        except Payment.DoesNotExist:
-            print(f"❌ Payment not found for tx_ref: {tx_ref}")
-            return JsonResponse({
-                "error": f"Payment not found for tx_ref: {tx_ref}",
-                "status": "error"
-            }, status=404)
-        
-        # Process webhook based on event and status
+
         event_type = webhook_data.get('event', '')
-        webhook_status = webhook_data.get('status', '').lower()
-        payment_method = webhook_data.get('payment_method', '')
-        amount = webhook_data.get('amount', '')
-        
-        print(f"🔄 Processing webhook - Event: {event_type}, Status: {webhook_status}, TX Ref: {tx_ref}, Method: {payment_method}, Amount: {amount}")
-        
-        # Handle successful payment
-        if event_type == 'charge.success' or webhook_status == 'success':
-            payment.status = 'completed'
-            payment.webhook_data = webhook_data
-            payment.save()
-            
-            # Update order status
-            order = payment.order
-            order.status = 'processing'
-            order.save()
-            
-            # Update product statistics for successful payment
-            _update_product_statistics_standalone(order)
-            
-            print(f"✅ Payment {tx_ref} marked as completed - Amount: {amount} ETB via {payment_method}")
-            
-        # Handle failed payment
-        elif event_type in ['charge.failed', 'charge.cancelled'] or webhook_status in ['failed', 'cancelled']:
-            payment.status = 'failed'
-            payment.webhook_data = webhook_data
-            payment.save()
-            
-            print(f"❌ Payment {tx_ref} marked as failed")
-            
-        # Handle refunded payment
-        elif event_type == 'charge.refunded' or webhook_status == 'refunded':
-            payment.status = 'refunded'
-            payment.webhook_data = webhook_data
-            payment.save()
-            
-            print(f"🔄 Payment {tx_ref} marked as refunded")
-            
-        else:
-            print(f"⚠️ Unhandled webhook event: {event_type} with status: {webhook_status}")
-        
+        webhook_status = str(webhook_data.get('status', '')).lower()
+        get_webhook_queue().receive(webhook_data)
+
         # Always return 200 OK to acknowledge receipt
         return JsonResponse({
             'status': 'success',
-            'message': f'Webhook processed for {tx_ref}',
+            'message': f'Webhook received for {tx_ref}',
             'event': event_type,
             'payment_status': webhook_status
         }, status=200)
-        
+
     except json.JSONDecodeError as e:
-        print(f"❌ JSON decode error: {str(e)}")
+        logger.warning(f"Chapa webhook with invalid JSON: {str(e)}")
         return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=200)
     except Exception as e:
-        print(f"❌ Webhook processing error: {str(e)}")
-        import traceback
-        print(f"📋 Traceback: {traceback.format_exc()}")
-        # Still return 200 to prevent Chapa from retrying
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=200)
-
-
-def _update_product_statistics_standalone(order):
-    """Update product statistics when payment is successful (standalone version)."""
-    try:
-        from products.models import Product
-        
-        for item in order.items.all():
-            product = item.product
-            # Update total sold quantity
-            product.total_sold += item.quantity
-            product.save()
-            
-            print(f"📈 Updated product {product.name} - Total sold: {product.total_sold}")
-            
-    except Exception as e:
-        print(f"❌ Error updating product statistics: {str(e)}")
+        logger.exception(f"Error storing Chapa webhook: {str(e)}")
+        # Not acknowledged, so Chapa retries the delivery
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
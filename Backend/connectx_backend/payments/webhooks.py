@@ -0,0 +1,219 @@
+"""
+Chapa webhook intake queue.
+
+The webhook endpoint only stores the raw event (one INSERT ... ON CONFLICT
+DO NOTHING, keyed by a hash of the payload so that retried deliveries are
+stored once) and acknowledges it. ``drain`` applies stored events to their
+payments in batches:
+
+- Events of one ``tx_ref`` are applied in the order they arrived. An event
+  waits while an earlier one for the same ``tx_ref`` is still unprocessed,
+  including one another worker is handling or one that failed and will be
+  retried.
+- Applying an event goes through Payment.transition, so an event that
+  repeats a status the payment already has changes nothing.
+
+``drain`` runs on the API usage log writer's flush cycle and from the
+process_webhooks command.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from orders.inventory import commit_order_stock, release_order_stock
+from .models import Payment, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WEBHOOK_CONFIG = {
+    # Apply webhooks during the request instead of queueing them (tests)
+    "INLINE": False,
+    "BATCH_SIZE": 200,
+    "MAX_ATTEMPTS": 5,
+    # Drain on the API usage log writer's flush cycle (analytics.log_writer)
+    "DRAIN_IN_LOG_WRITER": True,
+}
+
+
+def get_webhook_config():
+    """Return the Chapa webhook queue config merged over the defaults."""
+    config = dict(DEFAULT_WEBHOOK_CONFIG)
+    config.update(getattr(settings, "CHAPA_WEBHOOKS", {}))
+    return config
+
+
+def webhook_event_key(payload):
+    """Identify a delivery by its content; Chapa retries send the same body."""
+    body = json.dumps(
+        payload, cls=DjangoJSONEncoder, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def apply_webhook(payment, payload):
+    """Apply a Chapa webhook payload to ``payment``. Returns True if it changed."""
+    event_type = payload.get("event", "")
+    webhook_status = str(payload.get("status", "")).lower()
+
+    if event_type == "charge.success" or webhook_status == "success":
+        # Moves a pending order to processing
+        if payment.transition("completed", webhook_data=payload):
+            commit_order_stock(payment.order)
+            return True
+    elif event_type in ["charge.failed", "charge.cancelled"] or webhook_status in [
+        "failed",
+        "cancelled",
+    ]:
+        if payment.transition("failed", webhook_data=payload):
+            release_order_stock(payment.order, status="released")
+            return True
+    elif event_type == "charge.refunded" or webhook_status == "refunded":
+        return payment.transition("refunded", webhook_data=payload)
+    else:
+        logger.info(
+            f"Unhandled webhook event {event_type!r} with status "
+            f"{webhook_status!r} for {payment.transaction_id}"
+        )
+    return False
+
+
+class WebhookQueue:
+    """Store incoming Chapa webhooks and apply them to their payments."""
+
+    def __init__(self, inline=False, batch_size=200, max_attempts=5):
+        self.inline = inline
+        self.batch_size = max(1, int(batch_size))
+        self.max_attempts = max(1, int(max_attempts))
+
+    @classmethod
+    def from_settings(cls):
+        config = get_webhook_config()
+        return cls(
+            inline=config["INLINE"],
+            batch_size=config["BATCH_SIZE"],
+            max_attempts=config["MAX_ATTEMPTS"],
+        )
+
+    def receive(self, payload):
+        """
+        Store a webhook payload (which must have a ``tx_ref``) unless the
+        same delivery was stored before. Returns the event key.
+        """
+        payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+        event_key = webhook_event_key(payload)
+        # No lookup and no row locks: concurrent deliveries do not contend
+        WebhookEvent.objects.bulk_create(
+            [
+                WebhookEvent(
+                    event_key=event_key, tx_ref=payload["tx_ref"], payload=payload
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        if self.inline:
+            self.drain()
+        return event_key
+
+    def drain(self, limit=None):
+        """Apply pending events, oldest first. Returns how many were applied."""
+        applied = 0
+        seen = 0
+        skipped = set()
+        while limit is None or seen < limit:
+            size = self.batch_size
+            if limit is not None:
+                size = min(size, limit - seen)
+            # Concurrent drainers skip each other's rows (PostgreSQL)
+            with transaction.atomic():
+                events = list(
+                    self._pending()
+                    .select_for_update(skip_locked=True)
+                    .exclude(pk__in=skipped)
+                    .order_by("id")[:size]
+                )
+                if not events:
+                    break
+                handled, not_handled = self._process(events)
+            applied += handled
+            seen += len(events)
+            skipped.update(not_handled)
+        return applied
+
+    def pending(self):
+        return self._pending().count()
+
+    def _pending(self):
+        return WebhookEvent.objects.filter(
+            processed_at__isnull=True, attempts__lt=self.max_attempts
+        )
+
+    def _process(self, events):
+        """
+        Apply ``events`` and mark them processed. Returns how many were
+        applied and the ids of those left pending (failed or waiting on an
+        earlier event of their ``tx_ref``).
+        """
+        tx_refs = {event.tx_ref for event in events}
+        # Earlier events still pending outside this batch come first
+        blocked = set(
+            self._pending()
+            .filter(tx_ref__in=tx_refs, id__lt=events[-1].pk)
+            .exclude(pk__in=[event.pk for event in events])
+            .values_list("tx_ref", flat=True)
+        )
+        payments = Payment.objects.select_related("order").in_bulk(
+            tx_refs - blocked, field_name="transaction_id"
+        )
+
+        handled, failed, waiting = [], [], []
+        for event in events:
+            if event.tx_ref in blocked:
+                waiting.append(event)
+                continue
+            try:
+                payment = payments.get(event.tx_ref)
+                if payment is None:
+                    # The payment may not be committed yet; retry later
+                    raise Payment.DoesNotExist(
+                        f"Payment not found for tx_ref: {event.tx_ref}"
+                    )
+                with transaction.atomic():
+                    apply_webhook(payment, event.payload)
+                handled.append(event)
+            except Exception as e:
+                logger.error(f"Error applying webhook event {event.pk}: {e}")
+                event.attempts += 1
+                event.last_error = str(e)
+                failed.append(event)
+                # Later events of this tx_ref wait for the retry, and the
+                # in-memory payment may no longer match the database
+                blocked.add(event.tx_ref)
+
+        WebhookEvent.objects.filter(pk__in=[event.pk for event in handled]).update(
+            processed_at=timezone.now()
+        )
+        if failed:
+            WebhookEvent.objects.bulk_update(failed, ["attempts", "last_error"])
+        return len(handled), [event.pk for event in failed + waiting]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_webhook_queue():
+    """Return the process-wide Chapa webhook queue."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = WebhookQueue.from_settings()
+    return _queue
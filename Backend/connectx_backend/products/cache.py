@@ -0,0 +1,221 @@
+import functools
+import hashlib
+import json
+import threading
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+DEFAULT_STOREFRONT_CACHE_CONFIG = {
+    "ENABLED": True,
+    "TTL": 300,
+    "CACHE_ALIAS": "default",
+}
+
+# Query parameters that never change the response
+IGNORED_PARAMS = {"api_key"}
+
+# Pagination links, stored without host or ignored parameters and rebuilt
+# for each request: they would otherwise hand the first caller's api_key
+# (and Host) to everyone served the entry.
+LINK_FIELDS = ("next", "previous")
+
+
+def get_storefront_cache_config():
+    """Return the storefront cache config merged over the defaults."""
+    config = dict(DEFAULT_STOREFRONT_CACHE_CONFIG)
+    config.update(getattr(settings, "STOREFRONT_CACHE", {}))
+    return config
+
+
+class StorefrontCache:
+    """
+    Cache of API key (storefront) product responses, per tenant.
+
+    Entries are keyed on the tenant, the tenant's catalog version, the view
+    action and the normalized query string. Signal handlers bump a tenant's
+    version when anything it serves changes, which orphans its old entries
+    (they expire after ``ttl``). The backend is any Django cache: local
+    memory by default, a shared one in production via ``cache_alias``.
+    """
+
+    def __init__(self, enabled=True, ttl=300, cache_alias="default"):
+        self.enabled = enabled
+        self.ttl = int(ttl)
+        self.cache_alias = cache_alias
+
+    @classmethod
+    def from_settings(cls):
+        config = get_storefront_cache_config()
+        return cls(
+            enabled=config["ENABLED"],
+            ttl=config["TTL"],
+            cache_alias=config["CACHE_ALIAS"],
+        )
+
+    @property
+    def backend(self):
+        return caches[self.cache_alias]
+
+    def version(self, tenant_id):
+        return self.backend.get(self._version_key(tenant_id), 0)
+
+    def bump(self, tenant_ids):
+        """Invalidate every cached response of ``tenant_ids``."""
+        for tenant_id in set(tenant_ids):
+            if tenant_id is None:
+                continue
+            key = self._version_key(tenant_id)
+            # Version keys never expire; incr keeps concurrent bumps apart.
+            if not self.backend.add(key, 1, timeout=None):
+                try:
+                    self.backend.incr(key)
+                except ValueError:
+                    # Evicted between add and incr
+                    self.backend.set(key, 1, timeout=None)
+
+    def key_for(self, request, action, view_kwargs):
+        """Return the cache key for ``request``, or None if it is not cacheable."""
+        tenant = getattr(request, "tenant", None)
+        if (
+            not self.enabled
+            or request.method != "GET"
+            or tenant is None
+            or request.user.is_authenticated
+        ):
+            return None
+        params = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            if name not in IGNORED_PARAMS
+            for value in values
+        )
+        fingerprint = hashlib.sha256(
+            "|".join(
+                [action, urlencode(sorted(view_kwargs.items())), urlencode(params)]
+            ).encode()
+        ).hexdigest()
+        return f"storefront:{tenant.pk}:{self.version(tenant.pk)}:{fingerprint}"
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, etag, data):
+        self.backend.set(key, (etag, data), self.ttl)
+
+    def _version_key(self, tenant_id):
+        return f"storefront:version:{tenant_id}"
+
+
+def compute_etag(data):
+    encoded = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(encoded.encode()).hexdigest()
+
+
+def strip_links(data):
+    """Reduce ``data``'s pagination links to path and query, minus IGNORED_PARAMS."""
+    if not isinstance(data, dict):
+        return data
+    for field in LINK_FIELDS:
+        link = data.get(field)
+        if not link:
+            continue
+        for name in IGNORED_PARAMS:
+            link = remove_query_param(link, name)
+        parts = urlsplit(link)
+        data[field] = urlunsplit(("", "", parts.path, parts.query, ""))
+    return data
+
+
+def localize_links(request, etag, data):
+    """
+    Return (etag, data) with ``data``'s pagination links made absolute for
+    ``request``, carrying its own ignored parameters (e.g. its api_key).
+    """
+    if not isinstance(data, dict) or not any(data.get(f) for f in LINK_FIELDS):
+        return etag, data
+    params = [
+        (name, request.query_params[name])
+        for name in sorted(IGNORED_PARAMS)
+        if name in request.query_params
+    ]
+    data = dict(data)
+    for field in LINK_FIELDS:
+        if data.get(field):
+            link = request.build_absolute_uri(data[field])
+            for name, value in params:
+                link = replace_query_param(link, name, value)
+            data[field] = link
+    # The body now depends on the host and parameters too
+    etag = compute_etag([etag, request.build_absolute_uri("/"), params])
+    return etag, data
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def etag_response(request, etag, data):
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response["ETag"] = etag
+    return response
+
+
+def cache_storefront_response(view_method):
+    """
+    Serve a viewset action from the storefront cache when the request comes
+    in through an API key, answering If-None-Match with 304.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        cache = get_storefront_cache()
+        key = cache.key_for(request, self.action, kwargs)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+
+        entry = cache.get(key)
+        if entry is not None:
+            etag, data = entry
+        else:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            # Plain containers; ReturnList/ReturnDict hold their serializer
+            data = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+            data = strip_links(data)
+            etag = compute_etag(data)
+            cache.set(key, etag, data)
+        response = etag_response(request, *localize_links(request, etag, data))
+        patch_vary_headers(response, ["X-API-KEY"])
+        return response
+
+    return wrapper
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_storefront_cache():
+    """Return the process-wide storefront response cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StorefrontCache.from_settings()
+    return _cache
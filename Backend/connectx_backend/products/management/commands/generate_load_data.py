@@ -0,0 +1,521 @@
+import csv
+import io
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import AutoField, JSONField
+from django.utils import timezone
+
+from analytics.models import APIUsageLog
+from categories.models import Category
+from orders.models import Order, OrderProductItem
+from payments.models import Payment
+from products.models import Product, ProductListing
+from reviews.models import Review
+from tenants.models import Tenant
+from users.models import User
+
+ORDER_STATUSES = [
+    ("delivered", 55),
+    ("shipped", 10),
+    ("confirmed", 8),
+    ("processing", 7),
+    ("pending", 10),
+    ("cancelled", 6),
+    ("refunded", 2),
+    ("failed", 2),
+]
+
+PAYMENT_STATUS = {
+    "pending": "pending",
+    "processing": "processing",
+    "cancelled": "cancelled",
+    "refunded": "refunded",
+    "failed": "failed",
+}
+
+# (method, route, URL name, share of traffic)
+API_ROUTES = [
+    ("GET", "/api/products/", "product-list", 40),
+    ("GET", "/api/products/<pk>/", "product-detail", 25),
+    ("GET", "/api/products/listed-categories/", "product-listed-categories", 8),
+    ("POST", "/api/orders/", "order-list", 6),
+    ("GET", "/api/orders/", "order-list", 6),
+    ("GET", "/api/orders/<pk>/", "order-detail", 5),
+    ("POST", "/api/payments/", "payment-list", 4),
+    ("GET", "/api/reviews/", "review-list", 4),
+    ("GET", "/api/tenant/sales_overview/", "tenant-analytics-sales-overview", 2),
+]
+
+STATUS_CODES = [(200, 90), (201, 3), (400, 3), (404, 3), (500, 1)]
+
+
+def zipf_cum_weights(count, exponent):
+    """Cumulative weights making item i 1/(i+1)**exponent as likely as item 0."""
+    return list(
+        itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count))
+    )
+
+
+def weighted(choices):
+    values, weights = zip(*choices)
+    return list(values), list(itertools.accumulate(weights))
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values it is given."""
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False)
+        or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_value(field, value):
+    """Render ``value`` for a COPY ... CSV row; None becomes the NULL marker."""
+    if value is None:
+        return r"\N"
+    if isinstance(field, JSONField):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def copy_rows(model, objects):
+    """
+    Insert ``objects`` with PostgreSQL COPY. Skips bulk_create's per-value
+    preparation and parameter binding, the bulk of its cost at this scale.
+    Generated ids must be set on the objects; serial ids are left to the
+    database.
+    """
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if not isinstance(field, AutoField)
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objects:
+        writer.writerow(
+            [copy_value(field, getattr(obj, field.attname)) for field in fields]
+        )
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote(model._meta.db_table)} ({columns}) "
+            r"FROM STDIN WITH (FORMAT csv, NULL '\N')",
+            buffer,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a large, skewed, reproducible dataset (tenants, users, "
+        "categories, products, listings, orders with items, payments, reviews "
+        "and API usage logs) for load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenants", type=int, default=100)
+        parser.add_argument("--users", type=int, default=20000)
+        parser.add_argument(
+            "--categories", type=int, default=10, help="Categories per tenant."
+        )
+        parser.add_argument("--products", type=int, default=100000)
+        parser.add_argument(
+            "--listings",
+            type=int,
+            default=200,
+            help="Public products each tenant lists.",
+        )
+        parser.add_argument("--orders", type=int, default=1000000)
+        parser.add_argument("--max-items", type=int, default=4)
+        parser.add_argument("--reviews", type=int, default=200000)
+        parser.add_argument("--api-logs", type=int, default=2000000)
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Spread timestamps over this many days.",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.1,
+            help="Zipf exponent for tenant size and product popularity "
+            "(0 = uniform).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk_create on PostgreSQL too instead of COPY.",
+        )
+        parser.add_argument(
+            "--skip-derived",
+            action="store_true",
+            help="Don't rebuild rating summaries, analytics rollups and the "
+            "search index afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.days = options["days"]
+        self.skew = options["skew"]
+        self.use_copy = connection.vendor == "postgresql" and not options["no_copy"]
+        # Seeded too, so reruns with a seed produce the same names
+        self.run_id = uuid.UUID(int=self.rng.getrandbits(128)).hex[:8]
+
+        started = time.perf_counter()
+        with explicit_timestamps(
+            Tenant, User, Category, Product, Order, OrderProductItem, Payment, Review
+        ):
+            self.create_tenants(options["tenants"])
+            self.create_users(options["users"])
+            self.create_categories(options["categories"])
+            self.create_products(options["products"])
+            self.create_listings(options["listings"])
+            self.create_orders(options["orders"], options["max_items"])
+            self.create_reviews(options["reviews"])
+        self.create_api_logs(options["api_logs"])
+
+        if not options["skip_derived"]:
+            self.stdout.write("Rebuilding derived data...")
+            for name in (
+                "rebuild_rating_summaries",
+                "backfill_analytics_rollups",
+                "rebuild_search_index",
+            ):
+                # Only their summary line; the rating rebuild reports every
+                # product it touches as drift.
+                output = io.StringIO()
+                call_command(name, stdout=output)
+                lines = output.getvalue().strip().splitlines()
+                self.stdout.write(f"  {name}: {lines[-1] if lines else 'done'}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated load data '{self.run_id}' in "
+                f"{time.perf_counter() - started:.1f} s."
+            )
+        )
+
+    # Helpers
+
+    def timestamp(self, after=None):
+        """A random time in the last ``days`` days, later than ``after``."""
+        start = after or self.now - timedelta(days=self.days)
+        span = (self.now - start).total_seconds()
+        return start + timedelta(seconds=self.rng.random() * span)
+
+    def uuid(self):
+        """A seeded uuid4, so reruns with the same seed produce the same ids."""
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def insert(self, model, batch):
+        if self.use_copy:
+            copy_rows(model, batch)
+        else:
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+
+    def bulk_create(self, model, objects):
+        """Insert ``objects`` (any iterable) in batches; returns the count."""
+        created = 0
+        objects = iter(objects)
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                break
+            self.insert(model, batch)
+            created += len(batch)
+        self.stdout.write(f"  {model.__name__}: {created} rows")
+        return created
+
+    def pick_tenant(self):
+        return self.rng.choices(self.tenants, cum_weights=self.tenant_weights)[0]
+
+    # Generators
+
+    def create_tenants(self, count):
+        password = make_password("loadtest")
+        self.tenants = [
+            Tenant(
+                id=self.uuid(),
+                name=f"load-{self.run_id}-{i}",
+                email=f"tenant{i}-{self.run_id}@load.example.com",
+                password=password,
+                created_at=self.timestamp(),
+                updated_at=self.now,
+            )
+            for i in range(count)
+        ]
+        self.bulk_create(Tenant, self.tenants)
+        # Large tenants first: tenant i gets 1/(i+1)**skew of the traffic
+        self.tenant_weights = zipf_cum_weights(count, self.skew)
+
+    def create_users(self, count):
+        password = make_password("loadtest")
+        genders = ["male", "female", "none"]
+        self.customers = {tenant.pk: [] for tenant in self.tenants}
+        users = []
+        for i in range(count):
+            tenant = self.pick_tenant()
+            user = User(
+                id=self.uuid(),
+                email=f"user{i}-{self.run_id}@load.example.com",
+                name=f"Load User {i}",
+                password=password,
+                tenant=tenant,
+                role=User.CUSTOMER,
+                age=self.rng.randint(18, 70),
+                gender=self.rng.choice(genders),
+                created_at=self.timestamp(),
+                updated_at=self.now,
+            )
+            self.customers[tenant.pk].append(user)
+            users.append(user)
+        self.bulk_create(User, users)
+
+    def create_categories(self, per_tenant):
+        self.categories = {
+            tenant.pk: [
+                Category(
+                    id=self.uuid(),
+                    tenant=tenant,
+                    name=f"Category {i}",
+                    created_at=tenant.created_at,
+                    updated_at=self.now,
+                )
+                for i in range(per_tenant)
+            ]
+            for tenant in self.tenants
+        }
+        self.bulk_create(
+            Category, itertools.chain.from_iterable(self.categories.values())
+        )
+
+    def create_products(self, count):
+        brands = [f"Brand {i}" for i in range(50)]
+        words = ["wireless", "steel", "cotton", "smart", "mini", "pro", "eco", "max"]
+        self.products = []
+        for i in range(count):
+            owner = self.pick_tenant()
+            base_price = Decimal(
+                round(math.exp(self.rng.gauss(3.5, 1.0)), 2)
+            ).quantize(Decimal("0.01"))
+            self.products.append(
+                Product(
+                    id=self.uuid(),
+                    owner=owner,
+                    category=self.rng.choice(self.categories[owner.pk]),
+                    sku=f"LOAD-{self.run_id}-{i}",
+                    name=f"{self.rng.choice(words).title()} Product {i}",
+                    brand=self.rng.choice(brands),
+                    tag=self.rng.sample(words, 2),
+                    description=" ".join(self.rng.choices(words, k=12)),
+                    base_price=min(base_price, Decimal("99999.99")),
+                    selling_price=min(base_price, Decimal("99999.99")),
+                    quantity=self.rng.randint(0, 500),
+                    is_public=self.rng.random() < 0.6,
+                    created_at=self.timestamp(owner.created_at),
+                    updated_at=self.now,
+                )
+            )
+        self.bulk_create(Product, self.products)
+        # Hot products: shuffle so popularity doesn't follow creation order
+        self.hot_products = self.products[:]
+        self.rng.shuffle(self.hot_products)
+        self.product_weights = zipf_cum_weights(len(self.hot_products), self.skew)
+
+    def create_listings(self, per_tenant):
+        public = [product for product in self.products if product.is_public]
+        owned = {tenant.pk: set() for tenant in self.tenants}
+        for product in self.products:
+            owned[product.owner_id].add(product.pk)
+        listings = []
+        for tenant in self.tenants:
+            listed = owned[tenant.pk]
+            for product in self.rng.sample(public, min(per_tenant, len(public))):
+                if product.pk in listed:
+                    continue
+                listed.add(product.pk)
+                profit = Decimal(self.rng.randint(5, 40))
+                listings.append(
+                    ProductListing(
+                        tenant=tenant,
+                        product=product,
+                        profit_percentage=profit,
+                        selling_price=min(
+                            (product.base_price * (1 + profit / 100)).quantize(
+                                Decimal("0.01")
+                            ),
+                            Decimal("99999.99"),
+                        ),
+                    )
+                )
+        self.bulk_create(ProductListing, listings)
+
+    def create_orders(self, count, max_items):
+        statuses, status_weights = weighted(ORDER_STATUSES)
+        totals = {"orders": 0, "items": 0, "payments": 0}
+        for start in range(0, count, self.batch_size):
+            orders, items, payments = [], [], []
+            for i in range(start, min(start + self.batch_size, count)):
+                tenant = self.pick_tenant()
+                customers = self.customers[tenant.pk]
+                user = self.rng.choice(customers) if customers else None
+                created_at = self.timestamp()
+                status = self.rng.choices(statuses, cum_weights=status_weights)[0]
+                order = Order(
+                    id=self.uuid(),
+                    tenant=tenant,
+                    listing_tenant=tenant,
+                    user=user,
+                    email=user.email if user else None,
+                    order_number=f"LOAD-{self.run_id}-{i}",
+                    status=status,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                subtotal = Decimal("0")
+                for product in self.rng.choices(
+                    self.hot_products,
+                    cum_weights=self.product_weights,
+                    k=self.rng.randint(1, max_items),
+                ):
+                    quantity = self.rng.randint(1, 3)
+                    subtotal += product.selling_price * quantity
+                    items.append(
+                        OrderProductItem(
+                            id=self.uuid(),
+                            order=order,
+                            product=product,
+                            product_owner_id=product.owner_id,
+                            quantity=quantity,
+                            price=product.selling_price,
+                            created_at=created_at,
+                            updated_at=created_at,
+                        )
+                    )
+                order.subtotal = order.total_amount = min(
+                    subtotal, Decimal("999999.99")
+                )
+                orders.append(order)
+                payments.append(
+                    Payment(
+                        id=self.uuid(),
+                        order=order,
+                        amount=order.total_amount,
+                        payment_method=self.rng.choice(["chapa", "cod"]),
+                        status=PAYMENT_STATUS.get(status, "completed"),
+                        transaction_id=f"LOAD-{self.run_id}-{i}",
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                )
+            self.insert(Order, orders)
+            self.insert(OrderProductItem, items)
+            self.insert(Payment, payments)
+            totals["orders"] += len(orders)
+            totals["items"] += len(items)
+            totals["payments"] += len(payments)
+        self.stdout.write(
+            f"  Order: {totals['orders']} rows, OrderProductItem: "
+            f"{totals['items']} rows, Payment: {totals['payments']} rows"
+        )
+
+    def create_reviews(self, count):
+        users = list(itertools.chain.from_iterable(self.customers.values()))
+        if not users:
+            return
+        seen = set()
+        reviews = []
+        # Bounded so a small dataset can't loop forever on duplicates
+        for _ in range(count * 2):
+            if len(reviews) >= count:
+                break
+            user = self.rng.choice(users)
+            product = self.rng.choices(
+                self.hot_products, cum_weights=self.product_weights
+            )[0]
+            key = (user.pk, product.pk)
+            if key in seen:
+                continue
+            seen.add(key)
+            created_at = self.timestamp(max(user.created_at, product.created_at))
+            reviews.append(
+                Review(
+                    id=self.uuid(),
+                    tenant_id=user.tenant_id,
+                    product=product,
+                    user=user,
+                    rating=self.rng.choices([1, 2, 3, 4, 5], [5, 5, 10, 30, 50])[0],
+                    comment="Load test review",
+                    is_purchased=True,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+            )
+        self.bulk_create(Review, reviews)
+
+    def create_api_logs(self, count):
+        routes, route_weights = weighted(
+            [(route[:3], route[3]) for route in API_ROUTES]
+        )
+        codes, code_weights = weighted(STATUS_CODES)
+        rng = self.rng
+
+        def logs():
+            for _ in range(count):
+                method, route, view_name = rng.choices(
+                    routes, cum_weights=route_weights
+                )[0]
+                yield APIUsageLog(
+                    id=self.uuid(),
+                    tenant=self.pick_tenant(),
+                    endpoint=route.replace(
+                        "<pk>", str(uuid.UUID(int=rng.getrandbits(128)))
+                    ),
+                    route=route,
+                    view_name=view_name,
+                    method=method,
+                    status_code=rng.choices(codes, cum_weights=code_weights)[0],
+                    # Log-normal latency in seconds, median ~60 ms
+                    response_time=rng.lognormvariate(math.log(0.06), 0.8),
+                    timestamp=self.timestamp(),
+                    ip_address=f"10.{rng.randrange(256)}.{rng.randrange(256)}."
+                    f"{rng.randrange(1, 255)}",
+                )
+
+        self.bulk_create(APIUsageLog, logs())
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index for every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of products to index per query.",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        products = Product.objects.order_by("pk")
+        indexed = 0
+        last_pk = None
+        while True:
+            batch = products if last_pk is None else products.filter(pk__gt=last_pk)
+            ids = list(batch.values_list("pk", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            backend.index(Product.objects.filter(pk__in=ids))
+            indexed += len(ids)
+            last_pk = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} products."))
@@ -1,4 +1,6 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from tenants.models import Tenant
 from users.models import User
@@ -40,14 +42,27 @@ class Product(models.Model):
     colors = models.JSONField(default=list, blank=True)  # List of colors
     sizes = models.JSONField(default=list, blank=True)  # List of sizes
     total_sold = models.IntegerField(default=0)
-    total_ratings = models.IntegerField(default=0)
+    # Review summary, kept up to date by reviews.signals
+    total_ratings = models.IntegerField(default=0)  # Sum of review ratings
     total_reviews = models.IntegerField(default=0)
+    rating_1_count = models.IntegerField(default=0)
+    rating_2_count = models.IntegerField(default=0)
+    rating_3_count = models.IntegerField(default=0)
+    rating_4_count = models.IntegerField(default=0)
+    rating_5_count = models.IntegerField(default=0)
+    # Full-text search document, maintained by products.search
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
         db_table = "products"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="products_search_gin"),
+            # A tenant's own / public catalogue, newest first
+            models.Index(fields=["owner", "is_public", "created_at"]),
+        ]
 
     def save(self, *args, **kwargs):
         """Automatically calculate selling price and generate SKU if not set."""
@@ -55,6 +70,22 @@ class Product(models.Model):
             self.sku = generate_sku(self.owner.name, self.category.name)
         super().save(*args, **kwargs)
 
+    @property
+    def average_rating(self):
+        if not self.total_reviews:
+            return 0
+        return round(self.total_ratings / self.total_reviews, 2)
+
+    def rating_summary(self):
+        """Return the stored review summary in the API response shape."""
+        return {
+            "total_reviews": self.total_reviews,
+            "average_rating": self.average_rating,
+            "rating_distribution": {
+                str(i): getattr(self, f"rating_{i}_count") for i in range(1, 6)
+            },
+        }
+
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
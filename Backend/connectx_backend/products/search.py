@@ -0,0 +1,263 @@
+"""
+Product search.
+
+Products are indexed over name, SKU, brand, tags, category name, short
+description and description (in falling order of weight) and searched
+with ranking and prefix matching: "wire head" finds "Wireless Headphones".
+
+The backend is chosen by the PRODUCT_SEARCH setting:
+
+- ``PostgresSearchBackend`` keeps ``Product.search_vector`` (a tsvector
+  with a GIN index) up to date and matches with to_tsquery prefixes.
+- ``InMemorySearchBackend`` keeps an inverted index in the process, for
+  SQLite and tests.
+
+Signal handlers in products.signals reindex products as they are saved;
+the rebuild_search_index command (re)builds everything.
+"""
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import (
+    Case,
+    FloatField,
+    OuterRef,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+DEFAULT_PRODUCT_SEARCH_CONFIG = {
+    "BACKEND": "products.search.PostgresSearchBackend",
+    # Text search configuration for PostgreSQL (stemming and stop words)
+    "CONFIG": "english",
+}
+
+# Indexed fields and their weights (PostgreSQL weight classes A-D)
+SEARCH_FIELDS = [
+    ("name", "A"),
+    ("sku", "A"),
+    ("brand", "B"),
+    ("tag", "B"),
+    ("category__name", "B"),
+    ("short_description", "C"),
+    ("description", "D"),
+]
+
+# Model fields whose changes need a product reindexed
+INDEXED_FIELDS = {
+    "name",
+    "sku",
+    "brand",
+    "tag",
+    "category",
+    "short_description",
+    "description",
+}
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def get_product_search_config():
+    """Return the product search config merged over the defaults."""
+    config = dict(DEFAULT_PRODUCT_SEARCH_CONFIG)
+    config.update(getattr(settings, "PRODUCT_SEARCH", {}))
+    return config
+
+
+def tokenize(text):
+    return TOKEN.findall(str(text).lower())
+
+
+class PostgresSearchBackend:
+    """Full-text search on the GIN-indexed ``Product.search_vector`` column."""
+
+    def __init__(self, config="english"):
+        self.config = config
+
+    def search_vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        from categories.models import Category
+
+        category_name = Subquery(
+            Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1]
+        )
+        columns = {
+            "tag": Cast("tag", TextField()),
+            "category__name": Coalesce(category_name, Value("")),
+        }
+        vector = None
+        for field, weight in SEARCH_FIELDS:
+            part = SearchVector(
+                columns.get(field, field), weight=weight, config=self.config
+            )
+            vector = part if vector is None else vector + part
+        return vector
+
+    def index(self, products):
+        """Refresh the search vector of ``products`` (a queryset)."""
+        # UPDATE ... FROM can't follow joins, hence the category subquery
+        products.update(search_vector=self.search_vector())
+
+    def remove(self, product_ids):
+        # The vector is a column of the deleted row
+        pass
+
+    def search(self, queryset, text):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        terms = tokenize(text)
+        if not terms:
+            return queryset
+        # Every term, each as a prefix
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms),
+            search_type="raw",
+            config=self.config,
+        )
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank("search_vector", query))
+            .order_by("-search_rank", "-created_at")
+        )
+
+
+class InMemorySearchBackend:
+    """
+    Process-local inverted index: term -> {product id: weight}. Prefix
+    lookups bisect a sorted term list. The index is built from the database
+    on first search and kept current by ``index``/``remove``.
+    """
+
+    WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+    def __init__(self, **kwargs):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._terms = []
+        self._loaded = False
+
+    def index(self, products):
+        from .models import Product
+
+        rows = Product.objects.filter(pk__in=products.values("pk")).values(
+            "pk", *(field for field, _ in SEARCH_FIELDS)
+        )
+        with self._lock:
+            for row in rows:
+                self._remove(row["pk"])
+                weights = defaultdict(float)
+                for field, weight in SEARCH_FIELDS:
+                    value = row[field]
+                    if isinstance(value, list):
+                        value = " ".join(str(item) for item in value)
+                    for term in tokenize(value or ""):
+                        weights[term] += self.WEIGHTS[weight]
+                for term, weight in weights.items():
+                    if term not in self._postings:
+                        bisect.insort(self._terms, term)
+                    self._postings[term][row["pk"]] = weight
+                self._documents[row["pk"]] = set(weights)
+
+    def remove(self, product_ids):
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+
+    def search(self, queryset, text):
+        terms = tokenize(text)
+        if not terms:
+            return queryset
+        self._ensure_loaded()
+
+        scores = None
+        with self._lock:
+            for term in terms:
+                matches = defaultdict(float)
+                start = bisect.bisect_left(self._terms, term)
+                for indexed in self._terms[start:]:
+                    if not indexed.startswith(term):
+                        break
+                    for product_id, weight in self._postings[indexed].items():
+                        matches[product_id] += weight
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {
+                        product_id: score + matches[product_id]
+                        for product_id, score in scores.items()
+                        if product_id in matches
+                    }
+
+        if not scores:
+            return queryset.none()
+        rank = Case(
+            *(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(pk__in=list(scores))
+            .annotate(search_rank=rank)
+            .order_by("-search_rank", "-created_at")
+        )
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._terms = []
+            self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        from .models import Product
+
+        self._loaded = True
+        self.index(Product.objects.all())
+
+    def _remove(self, product_id):
+        for term in self._documents.pop(product_id, ()):
+            postings = self._postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """Filter and rank products by the ``search`` query parameter."""
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        return get_search_backend().search(queryset, text)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Return the process-wide product search backend."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = get_product_search_config()
+                _backend = import_string(config["BACKEND"])(config=config["CONFIG"])
+    return _backend
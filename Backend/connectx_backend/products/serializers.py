@@ -63,64 +63,34 @@ class ProductSerializer(serializers.ModelSerializer):
             )
         return data
 
-    def get_profit_percentage(self, obj):
+    def _get_tenant_listing(self, obj):
         request = self.context.get("request")
         if not request or not hasattr(request.user, "tenant"):
             return None
 
-        listing = ProductListing.objects.filter(
+        # ProductViewSet prefetches the current tenant's listing for reads.
+        if hasattr(obj, "current_tenant_listings"):
+            listings = obj.current_tenant_listings
+            return listings[0] if listings else None
+
+        return ProductListing.objects.filter(
             product=obj, tenant=request.user.tenant
         ).first()
+
+    def get_profit_percentage(self, obj):
+        listing = self._get_tenant_listing(obj)
         return listing.profit_percentage if listing else None
 
     def get_selling_price(self, obj):
-        request = self.context.get("request")
-        if not request or not hasattr(request.user, "tenant"):
-            return None
-
-        listing = ProductListing.objects.filter(
-            product=obj, tenant=request.user.tenant
-        ).first()
+        listing = self._get_tenant_listing(obj)
         return listing.selling_price if listing else None
 
     def get_review(self, obj):
         """Get review summary for the product."""
-        from django.db.models import Avg
-        from reviews.models import Review
-        
-        reviews = Review.objects.filter(product=obj)
-        total_reviews = reviews.count()
-        
-        if total_reviews == 0:
-            return {
-                "total_reviews": 0,
-                "average_rating": 0,
-                "rating_distribution": {
-                    "1": 0,
-                    "2": 0,
-                    "3": 0,
-                    "4": 0,
-                    "5": 0
-                }
-            }
-        
-        avg_rating = reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-        
-        # Get rating distribution
-        rating_distribution = {}
-        for i in range(1, 6):
-            count = reviews.filter(rating=i).count()
-            rating_distribution[str(i)] = count
-
-        return {
-            "total_reviews": total_reviews,
-            "average_rating": round(avg_rating, 2) if avg_rating else 0,
-            "rating_distribution": rating_distribution
-        }
+        return obj.rating_summary()
 
     def to_representation(self, instance):
         ret = super().to_representation(instance)
-        ret["category"] = CategorySerializer(instance.category).data
 
         # Generate Cloudinary URLs for output
         if instance.cover_url:
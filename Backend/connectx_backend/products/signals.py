@@ -0,0 +1,62 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from categories.models import Category
+from reviews.models import Review
+from .cache import get_storefront_cache
+from .models import Product, ProductListing
+from .search import INDEXED_FIELDS, get_search_backend
+
+
+def listing_tenants(**filters):
+    return ProductListing.objects.filter(**filters).values_list(
+        "tenant_id", flat=True
+    )
+
+
+@receiver(post_save, sender=ProductListing)
+@receiver(post_delete, sender=ProductListing)
+def invalidate_listing_tenant(sender, instance, **kwargs):
+    get_storefront_cache().bump([instance.tenant_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_tenants(sender, instance, **kwargs):
+    # A deleted product's listings are removed (and signalled) first
+    get_storefront_cache().bump(
+        [instance.owner_id, *listing_tenants(product_id=instance.pk)]
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tenants(sender, instance, **kwargs):
+    get_storefront_cache().bump(
+        [instance.tenant_id, *listing_tenants(product__category_id=instance.pk)]
+    )
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_tenants(sender, instance, **kwargs):
+    # Listings render the product's review summary
+    get_storefront_cache().bump(listing_tenants(product_id=instance.product_id))
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields and not INDEXED_FIELDS & set(update_fields)):
+        return
+    get_search_backend().index(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, **kwargs):
+    # Products carry their category's name in the search document
+    if not created and not raw:
+        get_search_backend().index(Product.objects.filter(category=instance))
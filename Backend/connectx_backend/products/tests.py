@@ -1,3 +1,453 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from categories.models import Category
+from api_keys.models import ApiKey
+from products.models import Product, ProductListing
+from reviews.models import Review
+from tenants.models import Tenant
+from users.models import User
 
-# Create your tests here.
+
+class ProductListQueryTestCase(APITestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.owner = User.objects.create_user(
+            email="owner@example.com",
+            password="ownerpass",
+            name="Owner",
+            tenant=self.tenant,
+            role=User.OWNER,
+        )
+        self.category = Category.objects.create(tenant=self.tenant, name="Electronics")
+        self.list_url = reverse("product-list")
+        self.client.force_authenticate(user=self.owner)
+
+    def create_products(self, count):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                owner=self.tenant,
+                category=self.category,
+                name=f"Product {i}",
+                base_price=100,
+                is_public=True,
+            )
+            ProductListing.objects.create(
+                tenant=self.tenant, product=product, profit_percentage=10
+            )
+            customer = User.objects.create_user(
+                email=f"customer{i}@example.com",
+                password="customerpass",
+                name="Customer",
+                tenant=self.tenant,
+                role=User.CUSTOMER,
+            )
+            Review.objects.create(
+                tenant=self.tenant,
+                product=product,
+                user=customer,
+                rating=i % 5 + 1,
+                comment="Good",
+                is_purchased=True,
+            )
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.list_url, {"size": 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Leave out the usage logging middleware's writes and their savepoints
+        queries = [
+            q["sql"]
+            for q in context.captured_queries
+            if "analytics_" not in q["sql"] and "SAVEPOINT" not in q["sql"]
+        ]
+        return len(queries), response
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self.create_products(2)
+        small_page_queries, _ = self.count_list_queries()
+
+        self.create_products(10)
+        large_page_queries, response = self.count_list_queries()
+
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(small_page_queries, large_page_queries)
+
+    def test_list_renders_listing_and_review_summary(self):
+        self.create_products(1)
+        _, response = self.count_list_queries()
+
+        product = response.data["results"][0]
+        self.assertEqual(product["category"]["name"], "Electronics")
+        self.assertEqual(float(product["selling_price"]), 110.0)
+        self.assertEqual(product["review"]["total_reviews"], 1)
+        self.assertEqual(product["review"]["average_rating"], 1)
+        self.assertEqual(product["review"]["rating_distribution"]["1"], 1)
+
+
+class ProductKeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        owner = User.objects.create_user(
+            email="owner@example.com",
+            password="ownerpass",
+            name="Owner",
+            tenant=tenant,
+            role=User.OWNER,
+        )
+        category = Category.objects.create(tenant=tenant, name="Electronics")
+        for i in range(5):
+            Product.objects.create(
+                owner=tenant,
+                category=category,
+                name=f"Product {i}",
+                base_price=100,
+                is_public=True,
+            )
+        # Equal timestamps make the id tie-breaker decide the order
+        first = Product.objects.order_by("created_at").first()
+        Product.objects.update(created_at=first.created_at)
+        self.expected = list(
+            Product.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        self.list_url = reverse("product-list")
+        self.client.force_authenticate(user=owner)
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        response = self.client.get(self.list_url, {"size": 2, "cursor": ""})
+        self.assertIsNone(response.data["count"])
+        self.assertIsNone(response.data["previous"])
+
+        seen, pages = [], []
+        while True:
+            ids = [product["id"] for product in response.data["results"]]
+            seen += ids
+            pages.append(ids)
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual([str(pk) for pk in self.expected], seen)
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [product["id"] for product in response.data["results"]], pages[-2]
+        )
+
+    def test_count_can_be_suppressed_or_requested(self):
+        response = self.client.get(self.list_url, {"size": 2, "count": "false"})
+        self.assertIsNone(response.data["count"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIn("page=2", response.data["next"])
+
+        response = self.client.get(
+            self.list_url, {"page": 3, "size": 2, "count": "false"}
+        )
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(
+            self.list_url, {"size": 2, "cursor": "", "count": "true"}
+        )
+        self.assertEqual(response.data["count"], 5)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(self.list_url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StorefrontCacheTestCase(APITestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.category = Category.objects.create(tenant=self.tenant, name="Phones")
+        self.product = Product.objects.create(
+            owner=self.tenant,
+            category=self.category,
+            name="Phone",
+            base_price=100,
+            is_public=True,
+        )
+        ProductListing.objects.create(tenant=self.tenant, product=self.product)
+        api_key = ApiKey.objects.create(tenant=self.tenant, name="Storefront")
+        self.client.credentials(HTTP_X_API_KEY=api_key.key)
+        self.list_url = reverse("product-list")
+
+    def count_product_queries(self, **extra):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.list_url, {"size": 10}, **extra)
+        queries = [
+            q for q in context.captured_queries if "products_product" in q["sql"]
+        ]
+        return len(queries), response
+
+    def test_repeated_requests_are_served_from_cache(self):
+        first_queries, first = self.count_product_queries()
+        cached_queries, cached = self.count_product_queries()
+
+        self.assertGreater(first_queries, 0)
+        self.assertEqual(cached_queries, 0)
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(cached["ETag"], first["ETag"])
+
+        _, response = self.count_product_queries(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_query_string_is_normalized(self):
+        self.client.get(self.list_url, {"size": 10, "filter_type": "listed"})
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(f"{self.list_url}?filter_type=listed&size=10")
+        self.assertFalse(
+            [q for q in context.captured_queries if "products_product" in q["sql"]]
+        )
+
+    def test_model_changes_invalidate_tenant_responses(self):
+        _, before = self.count_product_queries()
+
+        self.product.name = "Phone 2"
+        self.product.save()
+        _, after = self.count_product_queries()
+        self.assertEqual(after.data["results"][0]["name"], "Phone 2")
+        self.assertNotEqual(after["ETag"], before["ETag"])
+
+        customer = User.objects.create_user(
+            email="customer@example.com",
+            password="customerpass",
+            name="Customer",
+            tenant=self.tenant,
+            role=User.CUSTOMER,
+        )
+        Review.objects.create(
+            tenant=self.tenant,
+            product=self.product,
+            user=customer,
+            rating=5,
+            comment="Good",
+            is_purchased=True,
+        )
+        _, response = self.count_product_queries()
+        self.assertEqual(response.data["results"][0]["review"]["total_reviews"], 1)
+
+
+    def test_cached_links_do_not_carry_another_callers_key(self):
+        tablet = Product.objects.create(
+            owner=self.tenant,
+            category=self.category,
+            name="Tablet",
+            base_price=100,
+            is_public=True,
+        )
+        ProductListing.objects.create(tenant=self.tenant, product=tablet)
+        first_key = ApiKey.objects.create(tenant=self.tenant, name="First")
+        self.client.credentials()
+        response = self.client.get(
+            self.list_url,
+            {"size": 1, "api_key": first_key.key},
+            HTTP_HOST="shop.example.com",
+        )
+        self.assertEqual(
+            response.data["next"],
+            f"http://shop.example.com/api/products/?api_key={first_key.key}"
+            "&page=2&size=1",
+        )
+
+        second_key = ApiKey.objects.create(tenant=self.tenant, name="Second")
+        with CaptureQueriesContext(connection) as context:
+            cached = self.client.get(
+                self.list_url, {"size": 1}, HTTP_X_API_KEY=second_key.key
+            )
+        self.assertFalse(
+            [q for q in context.captured_queries if "products_product" in q["sql"]]
+        )
+        self.assertEqual(
+            cached.data["next"], "http://testserver/api/products/?page=2&size=1"
+        )
+        self.assertNotEqual(cached["ETag"], response["ETag"])
+
+
+class ProductSearchTestCase(APITestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        owner = User.objects.create_user(
+            email="owner@example.com",
+            password="ownerpass",
+            name="Owner",
+            tenant=self.tenant,
+            role=User.OWNER,
+        )
+        self.audio = Category.objects.create(tenant=self.tenant, name="Audio")
+        kitchen = Category.objects.create(tenant=self.tenant, name="Kitchen")
+        self.headphones = self.create_product("Wireless Headphones", self.audio)
+        self.cable = self.create_product(
+            "USB Cable", self.audio, description="Charges wireless headphones too"
+        )
+        self.kettle = self.create_product("Kettle", kitchen, tag=["steel"])
+        self.list_url = reverse("product-list")
+        self.client.force_authenticate(user=owner)
+
+    def create_product(self, name, category, **fields):
+        return Product.objects.create(
+            owner=self.tenant, category=category, name=name, is_public=True, **fields
+        )
+
+    def search(self, text):
+        response = self.client.get(self.list_url, {"search": text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product["name"] for product in response.data["results"]]
+
+    def test_prefix_terms_are_ranked(self):
+        self.assertEqual(self.search("wire head"), ["Wireless Headphones", "USB Cable"])
+        self.assertEqual(self.search("kitch"), ["Kettle"])
+        self.assertEqual(self.search("steel"), ["Kettle"])
+        self.assertEqual(self.search("wireless kettle"), [])
+
+    def test_search_ignores_cursor_to_keep_ranking(self):
+        response = self.client.get(self.list_url, {"search": "wire head", "cursor": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [product["name"] for product in response.data["results"]],
+            ["Wireless Headphones", "USB Cable"],
+        )
+        self.assertEqual(response.data["count"], 2)
+
+    def test_index_follows_saves(self):
+        self.kettle.name = "Electric Kettle"
+        self.kettle.save()
+        self.assertEqual(self.search("electric"), ["Electric Kettle"])
+
+        self.audio.name = "Sound"
+        self.audio.save()
+        self.assertCountEqual(
+            self.search("sound"), ["Wireless Headphones", "USB Cable"]
+        )
+        self.assertEqual(self.search("audio"), [])
+
+        self.cable.delete()
+        self.assertEqual(self.search("usb"), [])
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command("rebuild_search_index", "--batch-size", "2", stdout=out)
+        self.assertIn("Indexed 3 products", out.getvalue())
+        self.assertEqual(
+            self.search("headphones"), ["Wireless Headphones", "USB Cable"]
+        )
+
+
+class ProductRatingSummaryTestCase(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            name="Tenant1", email="owner@example.com", password="ownerpass"
+        )
+        self.category = Category.objects.create(tenant=self.tenant, name="Electronics")
+        self.product = Product.objects.create(
+            owner=self.tenant, category=self.category, name="Phone", base_price=100
+        )
+        self.other_product = Product.objects.create(
+            owner=self.tenant, category=self.category, name="Tablet", base_price=100
+        )
+        self.customers = [
+            User.objects.create_user(
+                email=f"customer{i}@example.com",
+                password="customerpass",
+                name="Customer",
+                tenant=self.tenant,
+                role=User.CUSTOMER,
+            )
+            for i in range(3)
+        ]
+
+    def create_review(self, user, rating, product=None):
+        return Review.objects.create(
+            tenant=self.tenant,
+            product=product or self.product,
+            user=user,
+            rating=rating,
+            comment="Good",
+            is_purchased=True,
+        )
+
+    def test_summary_tracks_create_update_and_delete(self):
+        first = self.create_review(self.customers[0], 5)
+        self.create_review(self.customers[1], 3)
+
+        first.rating = 4
+        first.save()
+        self.product.refresh_from_db()
+        self.assertEqual(
+            self.product.rating_summary(),
+            {
+                "total_reviews": 2,
+                "average_rating": 3.5,
+                "rating_distribution": {"1": 0, "2": 0, "3": 1, "4": 1, "5": 0},
+            },
+        )
+
+        first.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_reviews, 1)
+        self.assertEqual(self.product.total_ratings, 3)
+        self.assertEqual(self.product.rating_4_count, 0)
+
+    def test_moving_review_to_another_product(self):
+        review = self.create_review(self.customers[0], 2)
+        review.product = self.other_product
+        review.save()
+
+        self.product.refresh_from_db()
+        self.other_product.refresh_from_db()
+        self.assertEqual(self.product.total_reviews, 0)
+        self.assertEqual(self.other_product.rating_2_count, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.create_review(self.customers[0], 5)
+        self.create_review(self.customers[1], 1)
+        Product.objects.filter(pk=self.product.pk).update(
+            total_reviews=7, rating_5_count=0
+        )
+
+        out = StringIO()
+        call_command("rebuild_rating_summaries", "--verify", stdout=out)
+        self.assertIn("1 product summaries have drifted", out.getvalue())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_reviews, 7)
+
+        call_command("rebuild_rating_summaries", stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_reviews, 2)
+        self.assertEqual(self.product.total_ratings, 6)
+        self.assertEqual(self.product.rating_5_count, 1)
+
+    def test_deferred_reviews_load_and_update_the_summary(self):
+        self.create_review(self.customers[0], 2)
+
+        review = Review.objects.only("id").get()
+        review.rating = 5
+        review.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_reviews, 1)
+        self.assertEqual(self.product.rating_2_count, 0)
+        self.assertEqual(self.product.rating_5_count, 1)
+
+    def test_deferred_review_delete_updates_the_summary(self):
+        self.create_review(self.customers[0], 4)
+
+        Review.objects.only("id").get().delete()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_reviews, 0)
+        self.assertEqual(self.product.total_ratings, 0)
+        self.assertEqual(self.product.rating_4_count, 0)
@@ -4,16 +4,17 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
+from .cache import cache_storefront_response
 from .models import Product, ProductListing
+from .search import ProductSearchFilter
 from .serializers import ProductSerializer
 from users.permissions import IsTenantOwner, IsTenantMember
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from categories.models import Category
-from django.db.models import Q
+from django.db.models import Q, Prefetch
 from rest_framework.exceptions import PermissionDenied
 from core.pagination import CustomPagination
-from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from api_keys.permissions import HasValidAPIKey
 from users.models import User
@@ -26,10 +27,18 @@ from drf_yasg import openapi
 class ProductViewSet(viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, SearchFilter]
-    search_fields = ["name", "sku", "description"]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
     filterset_fields = ["category__name", "owner", "is_public"]
     authentication_classes = [JWTAuthentication]
+    @property
+    def keyset_fields(self):
+        """Keyset order for ?cursor= pages."""
+        # Keyset pages would replace the search ranking; searches use page
+        # numbers instead.
+        search = self.request.query_params.get(ProductSearchFilter.search_param, "")
+        if search.strip():
+            return None
+        return ("-created_at", "-id")
 
     def get_permissions(self):
         """Allow all authenticated users to read, but only tenant owners can write."""
@@ -207,8 +216,25 @@ class ProductViewSet(viewsets.ModelViewSet):
         elif category_name:
             queryset = queryset.filter(category__name__icontains=category_name)
 
+        if self.action in ["list", "retrieve", "by_category"]:
+            queryset = self._with_serializer_data(queryset)
+
         return queryset.distinct()
 
+    def _with_serializer_data(self, queryset):
+        """Load what ProductSerializer renders in a fixed number of queries."""
+        queryset = queryset.select_related("category").prefetch_related("tenant")
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "productlisting_set",
+                    queryset=ProductListing.objects.filter(tenant=user.tenant),
+                    to_attr="current_tenant_listings",
+                )
+            )
+        return queryset
+
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter(
@@ -221,13 +247,37 @@ class ProductViewSet(viewsets.ModelViewSet):
             openapi.Parameter("min_price", openapi.IN_QUERY, type=openapi.TYPE_NUMBER),
             openapi.Parameter("max_price", openapi.IN_QUERY, type=openapi.TYPE_NUMBER),
             openapi.Parameter("category", openapi.IN_QUERY, type=openapi.TYPE_STRING),
-            openapi.Parameter("search", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter(
+                "search",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Full-text search; each word also matches as a prefix. "
+                "Results are ranked by relevance and paginated by page number; "
+                "cursor is ignored.",
+            ),
             openapi.Parameter("size", openapi.IN_QUERY, type=openapi.TYPE_NUMBER),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="Keyset page cursor from next/previous; empty for the first page.",
+            ),
+            openapi.Parameter(
+                "count",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description="Set to false to skip the total count.",
+            ),
         ]
     )
+    @cache_storefront_response
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @cache_storefront_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_summary="Create a new product",
         request_body=ProductSerializer,
@@ -300,6 +350,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(
         detail=False, methods=["GET"], url_path="by-category/(?P<category_id>[^/.]+)"
     )
+    @cache_storefront_response
     def by_category(self, request, category_id=None):
         """Get products filtered by category ID."""
         category = get_object_or_404(Category, id=category_id)
@@ -319,6 +370,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         },
     )
     @action(detail=False, methods=["GET"], url_path="listed-categories")
+    @cache_storefront_response
     def listed_categories(self, request):
         """Get categories of listed products without duplicates."""
         categories = Category.objects.filter(
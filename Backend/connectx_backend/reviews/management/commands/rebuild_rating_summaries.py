@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from products.models import Product
+from reviews.models import Review
+
+SUMMARY_FIELDS = [
+    "total_reviews",
+    "total_ratings",
+    "rating_1_count",
+    "rating_2_count",
+    "rating_3_count",
+    "rating_4_count",
+    "rating_5_count",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every product's stored review summary from the reviews table "
+        "and report drift. Use --verify to report without writing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report products whose stored summary has drifted.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of products to update per query.",
+        )
+
+    def handle(self, *args, **options):
+        verify_only = options["verify"]
+        batch_size = options["batch_size"]
+
+        # One grouped query over all reviews
+        expected = {}
+        rows = Review.objects.values("product_id", "rating").annotate(count=Count("id"))
+        for row in rows:
+            summary = expected.setdefault(
+                row["product_id"], dict.fromkeys(SUMMARY_FIELDS, 0)
+            )
+            summary["total_reviews"] += row["count"]
+            summary["total_ratings"] += row["rating"] * row["count"]
+            summary[f"rating_{row['rating']}_count"] = row["count"]
+
+        empty = dict.fromkeys(SUMMARY_FIELDS, 0)
+        drifted = []
+        products = Product.objects.only("id", *SUMMARY_FIELDS).order_by()
+        for product in products.iterator(chunk_size=batch_size):
+            summary = expected.get(product.id, empty)
+            if any(getattr(product, f) != summary[f] for f in SUMMARY_FIELDS):
+                for field, value in summary.items():
+                    setattr(product, field, value)
+                drifted.append(product)
+
+        for product in drifted:
+            self.stdout.write(f"Drift: product {product.id}")
+
+        if verify_only:
+            style = self.style.WARNING if drifted else self.style.SUCCESS
+            self.stdout.write(style(f"{len(drifted)} product summaries have drifted."))
+            return
+
+        with transaction.atomic():
+            Product.objects.bulk_update(drifted, SUMMARY_FIELDS, batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {len(drifted)} product review summaries.")
+        )
@@ -5,9 +5,10 @@ from users.models import User
 from products.models import Product
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from core.tracking import TrackedFieldsMixin
 
 
-class Review(models.Model):
+class Review(TrackedFieldsMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="reviews")
     product = models.ForeignKey(
@@ -32,6 +33,11 @@ class Review(models.Model):
             "product",
         )  # One review per user per product
         ordering = ["-created_at"]
+        # A product's reviews, newest first
+        indexes = [models.Index(fields=["product", "created_at"])]
+
+    # The rating summary signals move a changed rating between products
+    tracked_fields = ("rating", "product_id")
 
     def clean(self):
         """Validate the review data."""
@@ -43,6 +49,7 @@ class Review(models.Model):
     def save(self, *args, **kwargs):
         """Ensure validation is called before saving."""
         self.clean()
+        self.load_originals()
         super().save(*args, **kwargs)
 
     def __str__(self):
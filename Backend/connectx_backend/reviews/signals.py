@@ -0,0 +1,50 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from products.models import Product
+from .models import Review
+
+
+def apply_rating_delta(product_id, rating, delta):
+    """Add (delta=1) or remove (delta=-1) one rating from a product's summary."""
+    count_field = f"rating_{rating}_count"
+    Product.objects.filter(pk=product_id).update(
+        total_reviews=F("total_reviews") + delta,
+        total_ratings=F("total_ratings") + delta * rating,
+        **{count_field: F(count_field) + delta},
+    )
+
+
+def original_rating(instance):
+    """The (product_id, rating) the review was loaded with."""
+    # Fields that were not loaded (deferred) cannot have changed
+    return (
+        instance.get_original("product_id") or instance.product_id,
+        instance.get_original("rating") or instance.rating,
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_summary_on_save(sender, instance, created, **kwargs):
+    if created:
+        apply_rating_delta(instance.product_id, instance.rating, 1)
+        return
+
+    if instance.has_changed("rating") or instance.has_changed("product_id"):
+        apply_rating_delta(*original_rating(instance), -1)
+        apply_rating_delta(instance.product_id, instance.rating, 1)
+
+
+@receiver(pre_delete, sender=Review)
+def load_rating_before_delete(sender, instance, **kwargs):
+    # Deferred fields cannot be read once the row is gone, here or in the
+    # other post_delete receivers
+    deferred = instance.get_deferred_fields()
+    fields = [field for field in Review.tracked_fields if field in deferred]
+    if fields:
+        instance.refresh_from_db(fields=fields)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_summary_on_delete(sender, instance, **kwargs):
+    apply_rating_delta(*original_rating(instance), -1)
@@ -3,7 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Count, Q
+from django.db.models import Count, Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Review
@@ -108,9 +108,6 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if Review.objects.filter(tenant=tenant, user=user, product=product).exists():
             raise PermissionDenied("You have already reviewed this product.")
 
-        # Update product review stats
-        self._update_product_review_stats(product)
-        
         serializer.save(tenant=tenant, user=user, is_purchased=True)
 
     def perform_update(self, serializer):
@@ -118,38 +115,18 @@ class ReviewViewSet(viewsets.ModelViewSet):
         # Only allow users to update their own reviews
         if serializer.instance.user != self.request.user:
             raise PermissionDenied("You can only update your own reviews.")
-        
-        # Update product review stats after saving
-        product = serializer.instance.product
+
+        # Product review stats are updated by reviews.signals
         serializer.save()
-        self._update_product_review_stats(product)
 
     def perform_destroy(self, instance):
         """Delete a review."""
         # Only allow users to delete their own reviews
         if instance.user != self.request.user:
             raise PermissionDenied("You can only delete your own reviews.")
-        
-        product = instance.product
-        instance.delete()
-        
-        # Update product review stats after deletion
-        self._update_product_review_stats(product)
 
-    def _update_product_review_stats(self, product):
-        """Update product review statistics"""
-        reviews = Review.objects.filter(product=product)
-        total_reviews = reviews.count()
-        
-        if total_reviews > 0:
-            avg_rating = reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-            product.total_reviews = total_reviews
-            product.total_ratings = round(avg_rating, 2)
-        else:
-            product.total_reviews = 0
-            product.total_ratings = 0
-            
-        product.save(update_fields=['total_reviews', 'total_ratings'])
+        # Product review stats are updated by reviews.signals
+        instance.delete()
 
     @swagger_auto_schema(
         operation_summary="Get current user's reviews",
@@ -275,25 +252,8 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        reviews = Review.objects.filter(product_id=product_id)
-        
-        # Calculate statistics
-        total_reviews = reviews.count()
-        avg_rating = reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-        
-        # Get rating distribution
-        rating_distribution = {}
-        for i in range(1, 6):
-            count = reviews.filter(rating=i).count()
-            rating_distribution[str(i)] = count
-
-        stats_data = {
-            "total_reviews": total_reviews,
-            "average_rating": round(avg_rating, 2) if avg_rating else 0,
-            "rating_distribution": rating_distribution
-        }
-
-        serializer = ReviewStatsSerializer(data=stats_data)
+        # Read the stored summary instead of recounting reviews
+        serializer = ReviewStatsSerializer(data=product.rating_summary())
         serializer.is_valid(raise_exception=True)
         return Response(serializer.data)
 
@@ -348,27 +308,11 @@ class ReviewViewSet(viewsets.ModelViewSet):
         # Get recent reviews
         recent_reviews = reviews_queryset[:limit]
         
-        # Calculate statistics
-        total_reviews = reviews_queryset.count()
-        avg_rating = reviews_queryset.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-        
-        # Get rating distribution
-        rating_distribution = {}
-        for i in range(1, 6):
-            count = reviews_queryset.filter(rating=i).count()
-            rating_distribution[str(i)] = count
-
         # Prepare response data
         reviews_data = ReviewSerializer(recent_reviews, many=True).data
-        stats_data = {
-            "total_reviews": total_reviews,
-            "average_rating": round(avg_rating, 2) if avg_rating else 0,
-            "rating_distribution": rating_distribution
-        }
-
         response_data = {
             "reviews": reviews_data,
-            "stats": stats_data
+            "stats": product.rating_summary()
         }
 
         return Response(response_data)
@@ -392,15 +336,19 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
         # Filter by tenant if user is authenticated
         reviews = Review.objects.filter(tenant=request.user.tenant)
-        
-        total_reviews = reviews.count()
-        avg_rating = reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-        
-        # Get rating distribution
-        rating_distribution = {}
-        for i in range(1, 6):
-            count = reviews.filter(rating=i).count()
-            rating_distribution[str(i)] = count
+
+        # Count every rating in a single grouped query
+        counts = {
+            row["rating"]: row["count"]
+            for row in reviews.values("rating").annotate(count=Count("id"))
+        }
+        rating_distribution = {str(i): counts.get(i, 0) for i in range(1, 6)}
+        total_reviews = sum(counts.values())
+        avg_rating = (
+            sum(rating * count for rating, count in counts.items()) / total_reviews
+            if total_reviews
+            else 0
+        )
 
         stats_data = {
             "total_reviews": total_reviews,